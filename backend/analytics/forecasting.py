@@ -5,57 +5,40 @@ Runs on CPU to preserve GPU for LLM inference.
 """
 import logging
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.db.session import AsyncSessionLocal
+from backend.analytics.monthly_totals import month_start, totals_by_month
 
 logger = logging.getLogger(__name__)
 
 
-async def get_monthly_cashflow(user_phone: str, months: int = 6) -> list[dict]:
+async def get_monthly_cashflow(session: AsyncSession, user_phone: str, months: int = 6) -> list[dict]:
     """
-    Returns monthly income/expense totals for the last N months.
+    Returns monthly income/expense totals for the last N calendar months (current included),
+    read from the monthly rollup. The session must be bound to the user (get_user_db / user_session).
     """
-    async with AsyncSessionLocal() as session:
-        await session.execute(
-            text("SELECT set_config('app.current_user_phone', :phone, false)"),
-            {"phone": user_phone}
-        )
+    now = datetime.now()
+    start = month_start(now) - relativedelta(months=months - 1)
 
-        start_date = datetime.now() - timedelta(days=months * 30)
-
-        result = await session.execute(
-            text("""
-                SELECT
-                    TO_CHAR(date, 'YYYY-MM') as month,
-                    SUM(CASE WHEN type = 'INCOME' THEN amount ELSE 0 END) as income,
-                    SUM(CASE WHEN type = 'EXPENSE' THEN amount ELSE 0 END) as expenses
-                FROM transactions
-                WHERE user_phone = :phone AND date >= :start
-                GROUP BY TO_CHAR(date, 'YYYY-MM')
-                ORDER BY month
-            """),
-            {"phone": user_phone, "start": start_date}
-        )
-
-        rows = result.fetchall()
-        return [
-            {
-                "month": row.month,
-                "income": float(row.income or 0),
-                "expenses": float(row.expenses or 0),
-                "net": float((row.income or 0) - (row.expenses or 0)),
-            }
-            for row in rows
-        ]
+    rows = await totals_by_month(session, user_phone, start)
+    return [
+        {
+            "month": row["month"],
+            "income": row["income"],
+            "expenses": row["expenses"],
+            "net": row["income"] - row["expenses"],
+        }
+        for row in rows
+    ]
 
 
-async def project_balance(user_phone: str, months_ahead: int = 3) -> dict:
+async def project_balance(session: AsyncSession, user_phone: str, months_ahead: int = 3) -> dict:
     """
     Projects the future balance using simple linear extrapolation.
     Uses average monthly net (Income - Expenses) to project forward.
     """
-    cashflow = await get_monthly_cashflow(user_phone, months=6)
+    cashflow = await get_monthly_cashflow(session, user_phone, months=6)
 
     if len(cashflow) < 2:
         return {
@@ -71,16 +54,11 @@ async def project_balance(user_phone: str, months_ahead: int = 3) -> dict:
     avg_net = sum(nets) / len(nets)
 
     # Get current balance from accounts
-    async with AsyncSessionLocal() as session:
-        await session.execute(
-            text("SELECT set_config('app.current_user_phone', :phone, false)"),
-            {"phone": user_phone}
-        )
-        result = await session.execute(
-            text("SELECT COALESCE(SUM(current_balance), 0) FROM accounts WHERE user_phone = :phone"),
-            {"phone": user_phone}
-        )
-        current_balance = float(result.scalar() or 0)
+    result = await session.execute(
+        text("SELECT COALESCE(SUM(current_balance), 0) FROM accounts WHERE user_phone = :phone"),
+        {"phone": user_phone}
+    )
+    current_balance = float(result.scalar() or 0)
 
     # Project forward
     projections = []
@@ -0,0 +1,79 @@
+"""
+Monthly Totals
+Readers over monthly_category_totals (migration 018), the trigger-maintained rollup of
+transactions by user/month/type/category/account type. Aggregates cost O(months) rows.
+The session must be bound to the user (get_user_db / user_session).
+"""
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+async def sum_since(session: AsyncSession, user_phone: str, start: datetime,
+                    tx_type: str = None, account_type: str = None) -> float:
+    """SUM(amount) of transactions dated in start's month or later (start must be a month start)."""
+    result = await session.execute(
+        text("""
+            SELECT COALESCE(SUM(total), 0)
+            FROM monthly_category_totals
+            WHERE user_phone = :phone
+              AND month >= :start
+              AND (CAST(:tx_type AS VARCHAR) IS NULL OR type = :tx_type)
+              AND (CAST(:account_type AS VARCHAR) IS NULL OR account_type = :account_type)
+        """),
+        {"phone": user_phone, "start": month_start(start), "tx_type": tx_type, "account_type": account_type}
+    )
+    return float(result.scalar() or 0)
+
+
+async def totals_by_month(session: AsyncSession, user_phone: str, start: datetime,
+                          end: datetime = None) -> list[dict]:
+    """
+    Per-month income/expense/transfer totals for months in [start, end), oldest first.
+    Only months that still have transactions are returned.
+    """
+    result = await session.execute(
+        text("""
+            SELECT TO_CHAR(month, 'YYYY-MM') AS month,
+                   SUM(CASE WHEN type = 'INCOME' THEN total ELSE 0 END) AS income,
+                   SUM(CASE WHEN type = 'EXPENSE' THEN total ELSE 0 END) AS expenses,
+                   SUM(CASE WHEN type = 'TRANSFER' THEN total ELSE 0 END) AS transfers
+            FROM monthly_category_totals
+            WHERE user_phone = :phone
+              AND month >= :start
+              AND (CAST(:end AS DATE) IS NULL OR month < :end)
+            GROUP BY month
+            HAVING SUM(tx_count) > 0
+            ORDER BY month
+        """),
+        {"phone": user_phone, "start": month_start(start), "end": month_start(end) if end else None}
+    )
+    return [
+        {
+            "month": row.month,
+            "income": float(row.income or 0),
+            "expenses": float(row.expenses or 0),
+            "transfers": float(row.transfers or 0),
+        }
+        for row in result.fetchall()
+    ]
+
+
+async def totals_by_category(session: AsyncSession, user_phone: str, month: datetime,
+                             tx_type: str = "EXPENSE") -> dict[str, float]:
+    """{category: total} for one month ('' holds uncategorized transactions)."""
+    result = await session.execute(
+        text("""
+            SELECT category, SUM(total) AS total
+            FROM monthly_category_totals
+            WHERE user_phone = :phone AND month = :month AND type = :tx_type
+            GROUP BY category
+            HAVING SUM(tx_count) > 0
+        """),
+        {"phone": user_phone, "month": month_start(month), "tx_type": tx_type}
+    )
+    return {row.category: float(row.total) for row in result.fetchall()}
@@ -3,16 +3,18 @@ from sqlalchemy import text, insert, select, func
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, Field
 from typing import Optional
+from backend.api.responses import FastJSONRoute
 from backend.core.auth import get_current_user
-from backend.db.session import get_db
+from backend.db.session import get_user_db
 from backend.core.ledger import LedgerService
+from backend.core.account_directory import invalidate_directory
 from backend.db.models import Transaction, Account
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import uuid
 import logging
 
-router = APIRouter(prefix="/api/accounts", tags=["Accounts"])
+router = APIRouter(prefix="/api/accounts", tags=["Accounts"], route_class=FastJSONRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -52,13 +54,9 @@ class AccountResponse(BaseModel):
 async def set_default_account(
     account_id: str,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Sets an account as the user's default for WhatsApp bot transactions."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     result = await db.execute(
         select(Account).where(
@@ -80,6 +78,7 @@ async def set_default_account(
     # Set new default (or toggle off if same account)
     account.is_default = True
     await db.commit()
+    await invalidate_directory(current_user_phone)
     await db.refresh(account)
     logger.info(f"Default account set to {account_id} for {current_user_phone}")
 
@@ -89,13 +88,9 @@ async def set_default_account(
 @router.get("/")
 async def list_accounts(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Returns all active accounts for the authenticated user."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     ledger = LedgerService(db)
     accounts = await ledger.get_accounts(current_user_phone)
@@ -124,13 +119,9 @@ async def list_accounts(
 @router.get("/all")
 async def list_all_accounts(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Returns all accounts (active and deleted) for transaction history lookup."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     ledger = LedgerService(db)
     accounts = await ledger.get_accounts(current_user_phone, include_inactive=True)
@@ -152,27 +143,19 @@ async def list_all_accounts(
 async def create_account(
     payload: AccountCreate,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Creates a new financial account."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     ledger = LedgerService(db)
 
     type_label = {"CHECKING": "Conta Corrente", "CREDIT": "Cartão de Crédito", "INVESTMENT": "Investimento", "CASH": "Dinheiro"}.get(payload.type, payload.type)
 
-    # Check for duplicate name within the same account type (including inactive accounts)
-    existing = await db.execute(
-        select(Account).where(
-            Account.user_phone == current_user_phone,
-            Account.name == payload.name,
-            Account.type == payload.type,
-        )
+    # Check for duplicate name within the same account type (including inactive accounts);
+    # names are compared accent/case-insensitively, like the unique index
+    existing_account = await ledger.get_account_by_name(
+        current_user_phone, payload.name, payload.type, include_inactive=True
     )
-    existing_account = existing.scalar_one_or_none()
     if existing_account:
         if existing_account.is_active:
             raise HTTPException(status_code=409, detail=f"{type_label} '{payload.name}' já existe.")
@@ -187,6 +170,7 @@ async def create_account(
             existing_account.closing_day = payload.closing_day
         await ledger.recalculate_balances(current_user_phone)
         await db.commit()
+        await invalidate_directory(current_user_phone)
         await db.refresh(existing_account)
         logger.info(f"Account '{payload.name}' reactivated for {current_user_phone}")
         return {
@@ -213,6 +197,7 @@ async def create_account(
             closing_day=payload.closing_day
         )
         await db.commit()
+        await invalidate_directory(current_user_phone)
         logger.info(f"Account '{payload.name}' created for {current_user_phone}")
     except IntegrityError:
         await db.rollback()
@@ -239,13 +224,9 @@ async def adjust_account_balance(
     account_id: str,
     payload: BalanceAdjust,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Creates a manual balance correction transaction for the given account."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     ledger = LedgerService(db)
     accounts = await ledger.get_accounts(current_user_phone)
@@ -285,8 +266,7 @@ async def adjust_account_balance(
             is_cleared=True,
         )
     )
-
-    await ledger.recalculate_balances(current_user_phone)
+    # The balance trigger applies the adjustment to current_balance
     await db.commit()
 
     # Refresh account data
@@ -312,13 +292,9 @@ async def update_account(
     account_id: str,
     payload: AccountUpdate,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Updates name and optional fields of an account."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     result = await db.execute(
         select(Account).where(
@@ -331,9 +307,9 @@ async def update_account(
     if not account:
         raise HTTPException(status_code=404, detail="Conta não encontrada.")
 
-    # Check for name conflict (excluding self)
+    # Check for name conflict (excluding self; inactive accounts keep their names)
     ledger = LedgerService(db)
-    existing = await ledger.get_account_by_name(current_user_phone, payload.name, account.type)
+    existing = await ledger.get_account_by_name(current_user_phone, payload.name, account.type, include_inactive=True)
     if existing and str(existing.id) != account_id:
         raise HTTPException(status_code=409, detail=f"Já existe uma conta com o nome '{payload.name}'.")
 
@@ -346,6 +322,7 @@ async def update_account(
         account.closing_day = payload.closing_day
 
     await db.commit()
+    await invalidate_directory(current_user_phone)
     await db.refresh(account)
     logger.info(f"Account {account_id} updated by {current_user_phone}")
 
@@ -365,13 +342,9 @@ async def update_account(
 async def delete_account(
     account_id: str,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Soft-deletes an account. Past transactions are preserved; new ones cannot be added."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     result = await db.execute(
         select(Account).where(
@@ -400,4 +373,5 @@ async def delete_account(
 
     account.is_active = False
     await db.commit()
+    await invalidate_directory(current_user_phone)
     logger.info(f"Account {account_id} soft-deleted by {current_user_phone}")
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from sqlalchemy import text
+from backend.api.responses import FastJSONRoute
 from backend.core.auth import get_current_user
-from backend.db.session import get_db
+from backend.core.read_models import SeriesPoint
+from backend.db.session import get_user_db
+from backend.db.replica import get_user_read_db
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.analytics.forecasting import project_balance, get_monthly_cashflow
 from backend.simulators.what_if import simulate_scenario
@@ -12,7 +15,7 @@ from backend.workers.investment_snapshotter import take_daily_snapshot
 import logging
 import asyncio
 
-router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
+router = APIRouter(prefix="/api/analytics", tags=["Analytics"], route_class=FastJSONRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -119,14 +122,10 @@ async def get_forex_rates(
 @router.get("/forecast")
 async def get_forecast(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_read_db)
 ):
     """Projects future balance using historical data."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
-    result = await project_balance(current_user_phone, months_ahead=6)
+    result = await project_balance(db, current_user_phone, months_ahead=6)
     return result
 
 
@@ -134,28 +133,21 @@ async def get_forecast(
 async def get_cashflow(
     months: int = 6,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_read_db)
 ):
     """Returns monthly income/expense breakdown."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
-    return await get_monthly_cashflow(current_user_phone, months=months)
+    return await get_monthly_cashflow(db, current_user_phone, months=months)
 
 
 @router.post("/simulate")
 async def post_simulate(
     req: ScenarioRequest,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Simulates a What-If financial scenario."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
     return await simulate_scenario(
+        db,
         user_phone=current_user_phone,
         description=req.description,
         total_amount=req.total_amount,
@@ -166,14 +158,10 @@ async def post_simulate(
 @router.get("/anomalies")
 async def get_anomalies(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Scans for spending anomalies in recurring categories."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
-    return await detect_anomalies(current_user_phone)
+    return await detect_anomalies(db, current_user_phone)
 
 
 @router.get("/investments/search")
@@ -211,27 +199,19 @@ async def suggest_tickers_endpoint(
 @router.get("/investments")
 async def get_investments(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Returns portfolio summary with current market values."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
-    return await get_user_portfolio_value(current_user_phone)
+    return await get_user_portfolio_value(db, current_user_phone)
 
 
 @router.post("/investments/add")
 async def add_asset(
     req: AssetAddRequest,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Adds a new asset to the user's portfolio."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     from datetime import date as date_type
     purchased_at = None
@@ -310,13 +290,9 @@ async def add_asset(
 async def delete_asset(
     asset_id: str,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Removes an asset entry entirely (correcting a wrong entry)."""
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
     try:
         result = await db.execute(
             text("DELETE FROM assets WHERE id = :id AND user_phone = :phone RETURNING id"),
@@ -340,15 +316,10 @@ async def sell_asset(
     asset_id: str,
     req: AssetSellRequest,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """Registers the sale of an asset: reduces quantity and optionally deposits proceeds."""
     try:
-        await db.execute(
-            text("SELECT set_config('app.current_user_phone', :phone, true)"),
-            {"phone": current_user_phone}
-        )
-
         # Fetch current asset (bypass RLS with explicit user_phone filter)
         result = await db.execute(
             text("SELECT ticker, name, quantity FROM assets WHERE id = :id AND user_phone = :phone"),
@@ -418,17 +389,13 @@ async def sell_asset(
 async def get_investments_performance(
     period: str = "1y",
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_read_db)
 ):
     """
     Returns normalized performance series (% return from period start) for
     portfolio vs IBOV, CDI, SP500.
     period: 1m | 3m | 6m | 1y | all
     """
-    await db.execute(
-        text("SELECT set_config('app.current_user_phone', :phone, false)"),
-        {"phone": current_user_phone}
-    )
 
     period_days = {"1m": 30, "3m": 90, "6m": 180, "1y": 365, "all": 36500}
     days = period_days.get(period, 365)
@@ -461,17 +428,14 @@ async def get_investments_performance(
     )
     bench_rows = bench_result.fetchall()
 
-    def normalize(series: list[tuple]) -> list[dict]:
+    def normalize(series: list[tuple]) -> list[SeriesPoint]:
         """Normalizes a (date, value) series to % return from first point."""
         if not series:
             return []
         base = series[0][1]
         if not base:
             return []
-        return [
-            {"date": str(d), "value": round(((v / base) - 1) * 100, 4)}
-            for d, v in series
-        ]
+        return [SeriesPoint(d, round(((v / base) - 1) * 100, 4)) for d, v in series]
 
     portfolio_series = [(r.snapshot_date, float(r.total_value)) for r in port_rows]
 
@@ -2,10 +2,11 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 import random
 import logging
+from backend.api.responses import FastJSONRoute
 from backend.core import clients # Use shared clients
 from backend.core.auth import create_access_token
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=FastJSONRoute)
 logger = logging.getLogger(__name__)
 
 def normalize_phone(phone: str) -> str:
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from backend.db.session import get_db
-from backend.db.models import Budget, Transaction
+from sqlalchemy import select
+from backend.api.responses import FastJSONRoute
+from backend.db.session import get_user_db
+from backend.db.models import Budget
+from backend.analytics import monthly_totals
 from backend.core.auth import get_current_user
 from pydantic import BaseModel, ConfigDict
 import uuid
 from typing import Optional
 from datetime import datetime
 
-router = APIRouter(prefix="/api/budgets", tags=["Budgets"])
+router = APIRouter(prefix="/api/budgets", tags=["Budgets"], route_class=FastJSONRoute)
 
 class BudgetCreate(BaseModel):
     category: str
@@ -29,7 +31,7 @@ class BudgetResponse(BaseModel):
 async def get_budgets(
     month: str,
     current_user: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     stmt = select(Budget).where(
         Budget.user_phone == current_user,
@@ -38,26 +40,9 @@ async def get_budgets(
     result = await db.execute(stmt)
     budgets = result.scalars().all()
 
-    # Calculate spent per category for the month
+    # Spent per category for the month, from the monthly rollup
     month_start = datetime.strptime(f"{month}-01", "%Y-%m-%d")
-    # Last day: go to first day of next month
-    year, m = int(month.split("-")[0]), int(month.split("-")[1])
-    if m == 12:
-        month_end = datetime(year + 1, 1, 1)
-    else:
-        month_end = datetime(year, m + 1, 1)
-    spent_stmt = (
-        select(Transaction.category, func.sum(Transaction.amount).label("total"))
-        .where(
-            Transaction.user_phone == current_user,
-            Transaction.type == "EXPENSE",
-            Transaction.date >= month_start,
-            Transaction.date < month_end,
-        )
-        .group_by(Transaction.category)
-    )
-    spent_result = await db.execute(spent_stmt)
-    spent_by_category = {row.category: row.total for row in spent_result}
+    spent_by_category = await monthly_totals.totals_by_category(db, current_user, month_start, tx_type="EXPENSE")
 
     response = []
     for b in budgets:
@@ -74,7 +59,7 @@ async def get_budgets(
 async def create_or_update_budget(
     budget_data: BudgetCreate,
     current_user: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     # Check if exists
     stmt = select(Budget).where(
@@ -106,7 +91,7 @@ async def create_or_update_budget(
 async def delete_budget(
     budget_id: str,
     current_user: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     stmt = select(Budget).where(
         Budget.id == uuid.UUID(budget_id),
@@ -1,94 +1,109 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, Body
+from fastapi import APIRouter, Depends, Query, HTTPException, Body, Request
 from sqlalchemy import text, select, func, insert, update
+from backend.api.responses import FastJSONRoute
 from backend.core.auth import get_current_user
-from backend.db.session import get_db
+from backend.db.session import get_user_db
+from backend.db.replica import get_user_read_sessions
+from backend.core.data_version import get_data_version, get_versioned, store_versioned
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.core.repository import TransactionRepository
-from backend.core.ledger import LedgerService
+from backend.analytics import monthly_totals
+from backend.core.categories import list_categories
+from backend.workers.insights_cache import (
+    INSIGHTS_TX_LIMIT, build_insights, format_insights_context,
+    get_cached_insights, refresh_insights, store_insights,
+)
+from backend.workers.category_learning import learn_from_transaction
 from datetime import datetime, timedelta
+import asyncio
+import contextlib
+import json
 import logging
+import re
 
-router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
+router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"], route_class=FastJSONRoute)
 logger = logging.getLogger(__name__)
 
-@router.get("/summary")
-async def get_dashboard_summary(
-    current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
+# Sessions a cold HUD/summary load may hold at once (its queries are spread over them)
+MAX_FANOUT_SESSIONS = 2
+
+
+async def _gather_in_sessions(sessions, *queries):
     """
-    Returns the summary for the dashboard:
-    - Current Balance (Safe-to-Spend logic could be added here)
-    - Recent Transactions
-    - Basic categorization
+    Runs the query(session) callables concurrently on at most MAX_FANOUT_SESSIONS sessions from
+    `sessions` (see read_session_factory), returning their results in order. A session runs one
+    statement at a time, so queries sharing a session run in turn.
     """
-    logger.info(f"Dashboard access for user: {current_user_phone}")
-    
-    # RLS: Set current user context
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
+    lanes = [queries[i::MAX_FANOUT_SESSIONS] for i in range(min(MAX_FANOUT_SESSIONS, len(queries)))]
 
-    repo = TransactionRepository(db)
-    
-    # Recent Transactions
-    recent_txs = await repo.get_recent_transactions(current_user_phone, limit=5)
-    
-    # Calculate Total Spent Current Month
+    async def run(lane):
+        async with sessions() as session:
+            return [await query(session) for query in lane]
+
+    lane_results = await asyncio.gather(*(run(lane) for lane in lanes))
+    results = [None] * len(queries)
+    for i, lane in enumerate(lane_results):
+        results[i::MAX_FANOUT_SESSIONS] = lane
+    return results
+
+
+async def _compute_summary(user_phone: str, sessions) -> dict:
     now = datetime.now()
     start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    # Simple query for total (could be moved to repository)
-    result = await db.execute(
-        text("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE user_phone = :phone AND date >= :start_date"),
-        {"phone": current_user_phone, "start_date": start_of_month}
-    )
-    total_spent_month = result.scalar() or 0.0
-
-    # Net worth: CHECKING + CASH accounts + latest investment snapshot
-    net_worth_result = await db.execute(
-        text("""
-            SELECT COALESCE(SUM(current_balance), 0)
-            FROM accounts
-            WHERE user_phone = :phone AND type IN ('CHECKING', 'CASH') AND is_active = true
-        """),
-        {"phone": current_user_phone}
-    )
-    liquid_balance = float(net_worth_result.scalar() or 0.0)
-
-    investment_result = await db.execute(
-        text("""
-            SELECT COALESCE(total_value, 0)
-            FROM investment_snapshots
-            WHERE user_phone = :phone
-            ORDER BY snapshot_date DESC
-            LIMIT 1
-        """),
-        {"phone": current_user_phone}
-    )
-    investment_value = float(investment_result.scalar() or 0.0)
 
+    async def recent(session):
+        # Recent Transactions
+        return await TransactionRepository(session).get_recent_transactions(user_phone, limit=5)
+
+    async def month_total(session):
+        # Month total from the monthly rollup (O(months), not O(transactions))
+        return await monthly_totals.sum_since(session, user_phone, start_of_month)
+
+    async def liquid(session):
+        # Net worth: CHECKING + CASH accounts + latest investment snapshot
+        result = await session.execute(
+            text("""
+                SELECT COALESCE(SUM(current_balance), 0)
+                FROM accounts
+                WHERE user_phone = :phone AND type IN ('CHECKING', 'CASH') AND is_active = true
+            """),
+            {"phone": user_phone}
+        )
+        return float(result.scalar() or 0.0)
+
+    async def investments(session):
+        result = await session.execute(
+            text("""
+                SELECT COALESCE(total_value, 0)
+                FROM investment_snapshots
+                WHERE user_phone = :phone
+                ORDER BY snapshot_date DESC
+                LIMIT 1
+            """),
+            {"phone": user_phone}
+        )
+        return float(result.scalar() or 0.0)
+
+    recent_txs, total_spent_month, liquid_balance, investment_value = await _gather_in_sessions(
+        sessions, recent, month_total, liquid, investments
+    )
     net_worth = liquid_balance + investment_value
 
-    formatted_txs = []
-    for tx in recent_txs:
-        date_str = ""
-        if tx.date:
-            if isinstance(tx.date, str):
-                date_str = tx.date[:10]
-            else:
-                date_str = tx.date.strftime("%Y-%m-%d")
-        
-        formatted_txs.append({
-            "id": tx.id,
+    formatted_txs = [
+        {
+            "id": str(tx.id),
             "amount": tx.amount,
             "type": tx.type,
             "category": tx.category or "Outros",
             "description": tx.description,
-            "date": date_str,
-            "is_installment": bool(tx.installment_number)
-        })
+            "date": tx.date.strftime("%Y-%m-%d") if tx.date else "",
+            "is_installment": tx.is_installment,
+        }
+        for tx in recent_txs
+    ]
 
     return {
-        "user": current_user_phone,
+        "user": user_phone,
         "month_total_spent": float(total_spent_month),
         "recent_transactions": formatted_txs,
         "net_worth": net_worth,
@@ -96,37 +111,56 @@ async def get_dashboard_summary(
         "safe_to_spend": 1500.00 - float(total_spent_month) # Placeholder budget
     }
 
+
+@router.get("/summary")
+async def get_dashboard_summary(
+    current_user_phone: str = Depends(get_current_user),
+    sessions = Depends(get_user_read_sessions)
+):
+    """
+    Returns the summary for the dashboard:
+    - Current Balance (Safe-to-Spend logic could be added here)
+    - Recent Transactions
+    - Basic categorization
+    Cached per user data version (and day); unchanged users get it from Redis.
+    Read from the replica when it is fresh enough (backend/db/replica.py); the version and
+    the payload come from the same database, so a lagging replica can't cache stale data
+    under a newer version.
+    """
+    logger.info(f"Dashboard access for user: {current_user_phone}")
+
+    async with sessions() as db:
+        version = await get_data_version(db, current_user_phone)
+    today = datetime.now().strftime("%Y-%m-%d")
+    cached = await get_versioned("summary", current_user_phone, version, today)
+    if cached is not None:
+        return cached
+
+    summary = await _compute_summary(current_user_phone, sessions)
+    await store_versioned("summary", current_user_phone, version, summary, today)
+    return summary
+
 @router.get("/categories")
 async def get_categories(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
-    import json
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-    from backend.db.models import Transaction, UserProfile
-
-    # Categories from transactions
-    result = await db.execute(
-        select(Transaction.category)
-        .where(Transaction.category != None, Transaction.user_phone == current_user_phone)
-        .distinct()
-    )
-    tx_categories = {row[0] for row in result.fetchall()}
+    return {"categories": await list_categories(db, current_user_phone)}
 
-    # Custom categories from user profile
-    profile_result = await db.execute(
-        select(UserProfile.custom_categories).where(UserProfile.user_phone == current_user_phone)
-    )
-    row = profile_result.scalar_one_or_none()
-    custom = set()
-    if row:
-        try:
-            custom = set(json.loads(row))
-        except (json.JSONDecodeError, TypeError):
-            pass
 
-    all_categories = sorted(tx_categories | custom)
-    return {"categories": all_categories}
+async def _cached_total(repo: TransactionRepository, user_phone: str, filters: dict) -> int:
+    """Exact filtered count, cached per user data version and filter set."""
+    import hashlib
+
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    version = await get_data_version(repo.session, user_phone)
+    cached = await get_versioned("txcount", user_phone, version, digest)
+    if cached is not None:
+        return int(cached)
+
+    total = await repo.count_transactions(repo.filtered_query(user_phone, **filters))
+    await store_versioned("txcount", user_phone, version, total, digest)
+    return total
 
 
 @router.get("/transactions")
@@ -137,46 +171,57 @@ async def get_transactions(
     description: str = None,
     search: str = None,
     account_id: str = None,
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: str = None,
+    count: str = Query(None, pattern="^(exact|estimate|none)$"),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-
+    """
+    Lists transactions, newest first.
+    - pagination=offset (default): page/limit with meta.total/pages. The total is counted
+      on page 1 and reused (per filter set, briefly cached) by the following pages.
+    - pagination=cursor: pass meta.next_cursor back as `cursor`; constant cost per page.
+      count=exact|estimate adds meta.total (default: none).
+    Items are TransactionItem rows (date is null for undated rows).
+    """
     repo = TransactionRepository(db)
-    skip = (page - 1) * limit
+    filters = {"category": category, "description": description, "search": search, "account_id": account_id}
 
-    txs, total = await repo.get_transactions(current_user_phone, skip=skip, limit=limit, category=category, description=description, search=search, account_id=account_id)
-    
-    data = []
-    for tx in txs:
-        date_iso = ""
-        if tx.date:
-            if isinstance(tx.date, str):
-                date_iso = tx.date
-            else:
-                date_iso = tx.date.isoformat()
-                
-        data.append({
-            "id": str(tx.id),
-            "amount": tx.amount,
-            "category": tx.category,
-            "description": tx.description,
-            "type": tx.type,
-            "account_id": str(tx.account_id) if tx.account_id else None,
-            "date": date_iso,
-            "is_installment": bool(tx.installment_number),
-            "installment_info": f"{tx.installment_number}/{tx.installments_count}" if tx.installments_count and tx.installments_count > 1 else None,
-            "is_cleared": tx.is_cleared
-        })
+    if pagination == "cursor":
+        try:
+            txs, next_cursor, total = await repo.get_transactions_page(
+                current_user_phone, limit=limit, cursor=cursor, count=count, **filters
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "data": txs,
+            "meta": {
+                "limit": limit,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+                "total": total,
+                "total_is_estimate": count == "estimate",
+            }
+        }
+
+    skip = (page - 1) * limit
+    txs, _ = await repo.get_transactions(current_user_phone, skip=skip, limit=limit, count=False, **filters)
+    if count == "none":
+        total = None
+    elif count == "estimate":
+        total = await repo.estimate_count(repo.filtered_query(current_user_phone, **filters))
+    else:
+        total = await _cached_total(repo, current_user_phone, filters=filters)
 
     return {
-        "data": data,
+        "data": txs,
         "meta": {
             "total": total,
             "page": page,
             "limit": limit,
-            "pages": (total + limit - 1) // limit
+            "pages": (total + limit - 1) // limit if total is not None else None
         }
     }
 
@@ -184,13 +229,11 @@ async def get_transactions(
 async def create_transaction(
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Creates a new transaction (Income or Expense).
     """
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
     
     from backend.core.ledger import LedgerService
     ledger = LedgerService(db)
@@ -209,6 +252,8 @@ async def create_transaction(
             is_cleared=is_cleared_val if is_cleared_val is not None else None
         )
         await db.commit()
+        if tx.type != "TRANSFER":
+            asyncio.create_task(learn_from_transaction(current_user_phone, tx.description, tx.category))
         return {"status": "success", "transaction_id": str(tx.id)}
     except Exception as e:
         logger.error(f"Error creating transaction: {e}")
@@ -218,201 +263,251 @@ async def create_transaction(
 @router.post("/insights")
 async def generate_insights(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
+    """
+    Returns 3 LLM insights about the user's recent transactions.
+    Served from the per-user cache while the transaction fingerprint is unchanged;
+    when it changed, the previous insights are returned and a refresh runs in background.
+    """
     from backend.core import clients
-    
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-    
+
+
     repo = TransactionRepository(db)
+    fingerprint = await repo.get_transactions_fingerprint(current_user_phone, limit=INSIGHTS_TX_LIMIT)
+    cached = await get_cached_insights(current_user_phone)
+    if cached:
+        if cached.get("fingerprint") != fingerprint:
+            asyncio.create_task(refresh_insights(current_user_phone))
+        return {"insights": cached["insights"]}
+
     # Get last 50 transactions for analysis
-    recent_txs = await repo.get_recent_transactions(current_user_phone, limit=50)
-    
+    recent_txs = await repo.get_recent_transactions(current_user_phone, limit=INSIGHTS_TX_LIMIT)
+
     if not recent_txs:
         return {"insight": "Ainda não tenho dados suficientes para uma análise completa. Continue registrando suas compras!"}
-    
-    # Format for LLM
-    context = "Histórico Financeiro Recente:\n"
-    for tx in recent_txs:
-        d_str = ""
-        if tx.date:
-            if isinstance(tx.date, str):
-                 d_str = tx.date[:10] # Simple slice for YYYY-MM-DD
-            else:
-                 d_str = tx.date.strftime('%d/%m')
-                 
-        context += f"- {d_str}: R$ {tx.amount} ({tx.category}) - {tx.description}\n"
-        
-    prompt = f"""
-    Analise os seguintes dados financeiros do usuário e forneça 3 insights curtos e acionáveis.
-    Foque em: Padrões de gastos, categorias dominantes e dicas de economia.
-    Seja direto, amigável e use emojis.
-    
-    {context}
-    
-    Retorne APENAS um JSON com a chave "insights" contendo uma lista de strings.
-    Exemplo: {{ "insights": ["Gasto alto em Uber", "Parabéns por economizar", "Sugestão..."] }}
-    """
-    
-    import traceback
-    
+
     logger.info("Generating insights: Starting analysis")
-    try:
-        # Check clients
-        if not clients.llm_client:
-            logger.error("LLM Client is not initialized!")
-            return {"insights": ["Erro interno: IA não inicializada."]}
+    # Check clients
+    if not clients.llm_client:
+        logger.error("LLM Client is not initialized!")
+        return {"insights": ["Erro interno: IA não inicializada."]}
 
-        response = await clients.llm_client.process_message(prompt, context_data="")
-        logger.info(f"LLM Response received: {response[:100]}...")
-        
-        # Simple cleanup if LLM returns markdown code blocks
-        clean_response = response.replace("```json", "").replace("```", "").strip()
-        import json
-        data = json.loads(clean_response)
-        
-        # Ensure 'insights' key exists
-        if "insights" not in data:
-            logger.warning(f"LLM response missing 'insights' key: {data}")
-            # Try to extract from reply_text if present, or fallback
-            return {"insights": ["Não consegui processar a análise no momento."]}
-            
-        return data
+    try:
+        insights = await build_insights(recent_txs)
     except Exception as e:
-        logger.error(f"Error generating insights: {e}")
-        traceback.print_exc()
-        return {"insights": ["Não consegui gerar uma análise agora. Tente novamente mais tarde."]}
+        logger.error(f"Error generating insights: {e}", exc_info=True)
         return {"insights": ["Não consegui gerar uma análise agora. Tente novamente mais tarde."]}
 
-@router.get("/hud")
-async def get_hud_metrics(
+    await store_insights(current_user_phone, fingerprint, insights)
+    return {"insights": insights}
+
+INSIGHTS_STREAM_PROMPT = """Você é o Cortex Brasil, um assistente financeiro pessoal.
+Analise os dados financeiros do usuário e forneça exatamente 3 insights curtos e acionáveis.
+Foque em: Padrões de gastos, categorias dominantes e dicas de economia.
+Seja direto, amigável e use emojis.
+Escreva UM insight por linha, sem numeração, sem marcadores, sem JSON e sem texto extra."""
+
+
+def _clean_insight_line(line: str) -> str:
+    """Strips bullets/numbering/quotes the model may add to a streamed insight line."""
+    line = line.strip().strip('"').strip()
+    line = re.sub(r"^(?:[-*•]|\d+[.)])\s*", "", line)
+    return line.strip()
+
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/insights/stream")
+async def stream_insights(
+    request: Request,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
-    Returns data for the HUD (Head-Up Display):
-    1. Safe-to-Spend
-    2. Burn Rate
-    3. Invoice Projection
+    Streaming variant of /insights over Server-Sent Events.
+    Each insight is sent as soon as the model finishes its line; generation is
+    aborted when the client disconnects.
     """
-    from backend.db.models import Budget, UserProfile
-    from sqlalchemy import func
-    
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-    
-    # Logic moved inside try/except block below
-    try:
-        logger.info("HUD STEP 1: Fetching User Profile")
-        # 1. Fetch User Profile
-        profile_stmt = select(UserProfile).where(UserProfile.user_phone == current_user_phone)
-        profile_result = await db.execute(profile_stmt)
-        profile = profile_result.scalar_one_or_none()
-        
-        needs_onboarding = not profile or profile.onboarding_completed == 0
-        income_mode = profile.income_mode if profile else 'manual'
-
-        # 2. Get Current Month Data
-        now = datetime.now()
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        days_in_month = (start_of_month.replace(month=start_of_month.month % 12 + 1) - timedelta(days=1)).day
-        days_passed = now.day
-
-        repo = TransactionRepository(db)
-
-        logger.info("HUD STEP 2: Spent and Realized Income MTD")
-        # Total Spent MTD
-        spent_result = await db.execute(
-            text("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE user_phone = :phone AND date >= :start_date AND type = 'EXPENSE'"),
-            {"phone": current_user_phone, "start_date": start_of_month}
-        )
-        total_spent_mtd = spent_result.scalar() or 0.0
+    from fastapi.responses import StreamingResponse
+    from backend.core import clients
+
+
+    repo = TransactionRepository(db)
+    sse_headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
-        # Total Realized Income MTD
-        income_result = await db.execute(
-            text("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE user_phone = :phone AND date >= :start_date AND type = 'INCOME'"),
-            {"phone": current_user_phone, "start_date": start_of_month}
+    fingerprint = await repo.get_transactions_fingerprint(current_user_phone, limit=INSIGHTS_TX_LIMIT)
+    cached = await get_cached_insights(current_user_phone)
+    if cached:
+        if cached.get("fingerprint") != fingerprint:
+            asyncio.create_task(refresh_insights(current_user_phone))
+
+        async def cached_events():
+            for insight in cached["insights"]:
+                yield _sse({"insight": insight})
+            yield _sse({"count": len(cached["insights"]), "cached": True}, event="done")
+
+        return StreamingResponse(cached_events(), media_type="text/event-stream", headers=sse_headers)
+
+    recent_txs = await repo.get_recent_transactions(current_user_phone, limit=INSIGHTS_TX_LIMIT)
+
+    if not recent_txs or not clients.llm_client:
+        message = (
+            "Ainda não tenho dados suficientes para uma análise completa. Continue registrando suas compras!"
+            if not recent_txs else "Erro interno: IA não inicializada."
         )
-        realized_income_mtd = income_result.scalar() or 0.0
-
-        # Income calculation based on mode
-        if income_mode == 'auto':
-            # Average of last 3 months of INCOME transactions (excluding current month)
-            three_months_ago = (start_of_month - timedelta(days=90)).replace(day=1)
-            avg_result = await db.execute(
-                text("""
-                    SELECT COALESCE(AVG(monthly_total), 0)
-                    FROM (
-                        SELECT DATE_TRUNC('month', date) AS month, SUM(amount) AS monthly_total
-                        FROM transactions
-                        WHERE user_phone = :phone
-                          AND type = 'INCOME'
-                          AND date >= :start AND date < :end
-                        GROUP BY DATE_TRUNC('month', date)
-                    ) sub
-                """),
-                {"phone": current_user_phone, "start": three_months_ago, "end": start_of_month}
-            )
-            auto_income = avg_result.scalar() or 0.0
-            income = auto_income
-        else:
-            income = profile.monthly_income if profile else 0.0
 
-        # Hybrid Income Logic: Max of expected and realized
-        effective_income = max(income, realized_income_mtd)
-        
-        logger.info("HUD STEP 3: Budgets")
-        # Total Budgets
-        budget_stmt = select(func.sum(Budget.amount)).where(
-            Budget.user_phone == current_user_phone,
-            Budget.month == now.strftime("%Y-%m")
+        async def single_event():
+            yield _sse({"insight": message})
+            yield _sse({"count": 1}, event="done")
+
+        return StreamingResponse(single_event(), media_type="text/event-stream", headers=sse_headers)
+
+    messages = [
+        {"role": "system", "content": INSIGHTS_STREAM_PROMPT},
+        {"role": "user", "content": format_insights_context(recent_txs)},
+    ]
+
+    async def event_stream():
+        buffer = ""
+        sent = []
+        try:
+            # aclosing: leaving early closes the upstream request now, not at garbage collection
+            stream = clients.llm_client.stream_chat_completion(messages, temperature=0.3, max_tokens=400)
+            async with contextlib.aclosing(stream):
+                async for delta in stream:
+                    if await request.is_disconnected():
+                        logger.info(f"Insights stream: client disconnected ({current_user_phone}), aborting generation")
+                        return
+                    buffer += delta
+                    while "\n" in buffer:
+                        line, buffer = buffer.split("\n", 1)
+                        insight = _clean_insight_line(line)
+                        if insight:
+                            sent.append(insight)
+                            yield _sse({"insight": insight})
+            insight = _clean_insight_line(buffer)
+            if insight:
+                sent.append(insight)
+                yield _sse({"insight": insight})
+            yield _sse({"count": len(sent)}, event="done")
+            await store_insights(current_user_phone, fingerprint, sent)
+        except asyncio.CancelledError:
+            logger.info(f"Insights stream cancelled for {current_user_phone}")
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming insights: {e}")
+            yield _sse({"message": "Não consegui gerar uma análise agora. Tente novamente mais tarde."}, event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=sse_headers)
+
+async def _compute_hud(user_phone: str, sessions) -> dict:
+    from backend.db.models import Budget, UserProfile
+
+    # 1. Current Month Data
+    now = datetime.now()
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    days_in_month = (start_of_month.replace(month=start_of_month.month % 12 + 1) - timedelta(days=1)).day
+    days_passed = now.day
+    three_months_ago = (start_of_month - timedelta(days=90)).replace(day=1)
+
+    async def fetch_profile(session):
+        result = await session.execute(select(UserProfile).where(UserProfile.user_phone == user_phone))
+        return result.scalar_one_or_none()
+
+    async def month_to_date(session):
+        # Spent, realized income and credit card invoice (EXPENSE on CREDIT accounts) MTD
+        spent = await monthly_totals.sum_since(session, user_phone, start_of_month, tx_type="EXPENSE")
+        income = await monthly_totals.sum_since(session, user_phone, start_of_month, tx_type="INCOME")
+        invoice = await monthly_totals.sum_since(
+            session, user_phone, start_of_month, tx_type="EXPENSE", account_type="CREDIT"
         )
-        total_budget_result = await db.execute(budget_stmt)
-        total_budget = total_budget_result.scalar() or 0.0
-        
-        # Safe-to-Spend: Effective Income - Budgets
-        safe_to_spend = effective_income - total_budget if not needs_onboarding else 0.0
-        
-        logger.info("HUD STEP 4: Burn Rate")
-        # Burn Rate Speed (R$/day)
-        daily_avg = total_spent_mtd / max(1, days_passed)
-        projected_spend = daily_avg * days_in_month
+        return spent, income, invoice
 
-        burn_rate_pct = (projected_spend / effective_income) * 100 if effective_income > 0 else 0
+    async def previous_months(session):
+        # Last 3 months of INCOME (excluding current month), used when income_mode == 'auto'
+        return await monthly_totals.totals_by_month(session, user_phone, three_months_ago, start_of_month)
 
-        logger.info("HUD STEP 4b: Credit Card Invoice Total")
-        # Sum of expenses on CREDIT accounts (current month)
-        credit_invoice_result = await db.execute(
-            text("""
-                SELECT COALESCE(SUM(t.amount), 0)
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.id
-                WHERE t.user_phone = :phone
-                  AND a.type = 'CREDIT'
-                  AND t.type = 'EXPENSE'
-                  AND t.date >= :start_date
-            """),
-            {"phone": current_user_phone, "start_date": start_of_month}
+    async def budgets_total(session):
+        result = await session.execute(
+            select(func.sum(Budget.amount)).where(
+                Budget.user_phone == user_phone,
+                Budget.month == now.strftime("%Y-%m")
+            )
         )
-        credit_invoice_total = credit_invoice_result.scalar() or 0.0
+        return result.scalar() or 0.0
 
-        logger.info("HUD STEP 5: Returning Data")
-        return {
-            "safe_to_spend": safe_to_spend,
-            "burn_rate": {
-                "value": burn_rate_pct,
-                "status": "Critical" if burn_rate_pct > 100 else "Warning" if burn_rate_pct > 80 else "Good",
-                "daily_avg": daily_avg
-            },
-            "invoice_projection": credit_invoice_total,
-            "income": effective_income,
-            "expected_income": income,
-            "realized_income": realized_income_mtd,
-            "needs_onboarding": needs_onboarding,
-            "income_mode": income_mode,
-            "manual_income": profile.monthly_income if profile else 0.0
-        }
+    logger.info("HUD: querying profile, month-to-date totals, income history and budgets")
+    profile, (total_spent_mtd, realized_income_mtd, credit_invoice_total), months, total_budget = (
+        await _gather_in_sessions(sessions, fetch_profile, month_to_date, previous_months, budgets_total)
+    )
+
+    needs_onboarding = not profile or profile.onboarding_completed == 0
+    income_mode = profile.income_mode if profile else 'manual'
+
+    # Income calculation based on mode
+    if income_mode == 'auto':
+        income_months = [m["income"] for m in months if m["income"]]
+        income = sum(income_months) / len(income_months) if income_months else 0.0
+    else:
+        income = profile.monthly_income if profile else 0.0
+
+    # Hybrid Income Logic: Max of expected and realized
+    effective_income = max(income, realized_income_mtd)
+
+    # Safe-to-Spend: Effective Income - Budgets
+    safe_to_spend = effective_income - total_budget if not needs_onboarding else 0.0
+
+    # Burn Rate Speed (R$/day)
+    daily_avg = total_spent_mtd / max(1, days_passed)
+    projected_spend = daily_avg * days_in_month
+
+    burn_rate_pct = (projected_spend / effective_income) * 100 if effective_income > 0 else 0
+
+    return {
+        "safe_to_spend": safe_to_spend,
+        "burn_rate": {
+            "value": burn_rate_pct,
+            "status": "Critical" if burn_rate_pct > 100 else "Warning" if burn_rate_pct > 80 else "Good",
+            "daily_avg": daily_avg
+        },
+        "invoice_projection": credit_invoice_total,
+        "income": effective_income,
+        "expected_income": income,
+        "realized_income": realized_income_mtd,
+        "needs_onboarding": needs_onboarding,
+        "income_mode": income_mode,
+        "manual_income": profile.monthly_income if profile else 0.0
+    }
+
+
+@router.get("/hud")
+async def get_hud_metrics(
+    current_user_phone: str = Depends(get_current_user),
+    sessions = Depends(get_user_read_sessions)
+):
+    """
+    Returns data for the HUD (Head-Up Display):
+    1. Safe-to-Spend
+    2. Burn Rate
+    3. Invoice Projection
+    Cached per user data version (and day): a hit is one version lookup plus one Redis GET;
+    a miss runs the queries concurrently on up to MAX_FANOUT_SESSIONS sessions. Replica-routed like /summary.
+    """
+    try:
+        async with sessions() as db:
+            version = await get_data_version(db, current_user_phone)
+        today = datetime.now().strftime("%Y-%m-%d")
+        cached = await get_versioned("hud", current_user_phone, version, today)
+        if cached is not None:
+            return cached
+
+        hud = await _compute_hud(current_user_phone, sessions)
+        await store_versioned("hud", current_user_phone, version, hud, today)
+        return hud
     except Exception as e:
         logger.error(f"Error in HUD: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -421,7 +516,7 @@ async def get_hud_metrics(
 async def update_user_profile(
     payload: dict,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Updates or creates the user profile.
@@ -429,8 +524,6 @@ async def update_user_profile(
     """
     from backend.db.models import UserProfile
 
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
 
     income = payload.get("monthly_income", None)
     income_mode = payload.get("income_mode", None)
@@ -461,15 +554,13 @@ async def update_user_profile(
 @router.get("/commitments")
 async def get_commitments(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Returns future commitments (installments) for the mountain chart.
     """
     repo = TransactionRepository(db)
     
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
     
     now = datetime.now()
     data = await repo.get_future_commitments(current_user_phone, start_date=now)
@@ -487,28 +578,23 @@ async def get_commitments(
 async def delete_transaction(
     transaction_id: str,
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Deletes a single transaction.
     """
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
     
     repo = TransactionRepository(db)
+    # Balances are adjusted by the balance trigger
     await repo.delete_transactions(current_user_phone, [transaction_id])
 
-    ledger = LedgerService(db)
-    await ledger.recalculate_balances(current_user_phone)
-    await db.commit()
-
     return {"status": "success", "message": "Transaction deleted"}
 
 @router.post("/transactions/bulk-delete")
 async def bulk_delete_transactions(
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Deletes multiple transactions.
@@ -517,23 +603,18 @@ async def bulk_delete_transactions(
     if not tx_ids:
         raise HTTPException(status_code=400, detail="No transaction IDs provided")
         
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
     
     repo = TransactionRepository(db)
+    # Balances are adjusted by the balance trigger
     await repo.delete_transactions(current_user_phone, tx_ids)
 
-    ledger = LedgerService(db)
-    await ledger.recalculate_balances(current_user_phone)
-    await db.commit()
-
     return {"status": "success", "message": f"{len(tx_ids)} transactions deleted"}
 
 @router.post("/transactions/bulk-update")
 async def bulk_update_transactions(
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Updates multiple transactions.
@@ -542,8 +623,6 @@ async def bulk_update_transactions(
     if not tx_ids:
         raise HTTPException(status_code=400, detail="No transaction IDs provided")
         
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
     
     repo = TransactionRepository(db)
     count = await repo.bulk_update_transactions(
@@ -558,45 +637,29 @@ async def bulk_update_transactions(
 
 @router.get("/transactions/export")
 async def export_transactions(
+    format: str = Query("csv", pattern="^(csv|parquet|xlsx)$"),
     category: str = None,
-    current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    description: str = None,
+    search: str = None,
+    account_id: str = None,
+    current_user_phone: str = Depends(get_current_user)
 ):
     """
-    Exports transactions to CSV.
+    Exports every transaction matching the list filters as CSV, Parquet or XLSX.
+    Streamed from a server-side cursor (see backend/core/export.py): no row cap.
     """
     from fastapi.responses import StreamingResponse
-    import io
-    import csv
-    
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-    
-    repo = TransactionRepository(db)
-    # Get all matching transactions (no pagination for export)
-    txs, _ = await repo.get_transactions(current_user_phone, limit=10000, category=category)
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["ID", "Data", "Descrição", "Categoria", "Valor", "Tipo", "Parcelas", "Status"])
-    
-    for tx in txs:
-        writer.writerow([
-            str(tx.id),
-            tx.date.strftime("%Y-%m-%d") if tx.date else "",
-            tx.description,
-            tx.category,
-            tx.amount,
-            tx.type,
-            f"{tx.installment_number}/{tx.installments_count}" if tx.installments_count else "1/1",
-            "Cleared" if tx.is_cleared else "Pending"
-        ])
-        
-    output.seek(0)
+    from backend.core.export import EXPORT_FORMATS, export_available, stream_export
+
+    if not export_available(format):
+        raise HTTPException(status_code=501, detail=f"Exportação em {format} indisponível neste servidor")
+
+    filters = {"category": category, "description": description, "search": search, "account_id": account_id}
+    media_type, filename = EXPORT_FORMATS[format]
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8-sig')),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=transacoes.csv"}
+        stream_export(current_user_phone, format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 @router.patch("/transactions/{transaction_id}")
@@ -604,13 +667,11 @@ async def patch_transaction(
     transaction_id: str,
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Updates a single transaction.
     """
-    # RLS
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
     
     amount = payload.get("amount")
     category = payload.get("category")
@@ -640,6 +701,11 @@ async def patch_transaction(
     
     if not success:
         raise HTTPException(status_code=404, detail="Transaction not found or no changes provided")
+
+    if category:
+        # Category corrections feed the nearest-neighbour suggestions
+        description = await repo.get_description(current_user_phone, transaction_id)
+        asyncio.create_task(learn_from_transaction(current_user_phone, description, category))
         
     return {"status": "success", "message": "Transaction updated"}
 
@@ -647,7 +713,7 @@ async def patch_transaction(
 async def search_transactions(
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     AI-powered natural language search for transactions.
@@ -656,12 +722,13 @@ async def search_transactions(
     if not query:
         raise HTTPException(status_code=400, detail="Search query is required")
         
-    # 1. Analyze query with LLM
+    # 1. Analyze query (local parser first, then cached/single-flight LLM)
     from backend.core.clients import llm_client
-    if not llm_client:
+    from backend.core.search_filters import resolve_search_filters
+    try:
+        filters = await resolve_search_filters(llm_client, query)
+    except RuntimeError:
         raise HTTPException(status_code=500, detail="AI Search service unavailable")
-        
-    filters = await llm_client.analyze_search_query(query)
     logger.info(f"AI Search Filters for '{query}': {filters}")
     
     # 2. Parse dates
@@ -677,7 +744,6 @@ async def search_transactions(
         except: pass
 
     # 3. Query DB
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
     repo = TransactionRepository(db)
     
     txs, total = await repo.get_transactions(
@@ -691,25 +757,10 @@ async def search_transactions(
         tx_type=filters.get("type")
     )
     
-    # 4. Format response
-    data = []
-    for tx in txs:
-        date_iso = tx.date.isoformat() if tx.date else ""
-        data.append({
-            "id": str(tx.id),
-            "amount": tx.amount,
-            "type": tx.type,
-            "account_id": str(tx.account_id) if tx.account_id else None,
-            "category": tx.category,
-            "description": tx.description,
-            "date": date_iso,
-            "is_installment": bool(tx.installment_number),
-            "installment_info": f"{tx.installment_number}/{tx.installments_count}" if tx.installment_number else None
-        })
-        
+    # 4. TransactionItem rows go out as they are (FastJSONRoute)
     return {
         "status": "success",
-        "data": data,
+        "data": txs,
         "filters_applied": filters,
         "total": total
     }
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from backend.db.session import get_db
+from backend.api.responses import FastJSONRoute
+from backend.db.session import get_user_db
 from backend.db.models import Goal
 from backend.core.auth import get_current_user
 
@@ -10,7 +11,7 @@ from typing import Optional
 from datetime import datetime
 import uuid
 
-router = APIRouter(prefix="/api/goals", tags=["Goals"])
+router = APIRouter(prefix="/api/goals", tags=["Goals"], route_class=FastJSONRoute)
 
 class GoalCreate(BaseModel):
     name: str
@@ -30,7 +31,7 @@ class GoalResponse(BaseModel):
 @router.get("/", response_model=list[GoalResponse])
 async def get_goals(
     current_user: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     try:
         stmt = select(Goal).where(Goal.user_phone == current_user)
@@ -46,7 +47,7 @@ async def get_goals(
 async def create_goal(
     goal_data: GoalCreate,
     current_user: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     new_goal = Goal(
         user_phone=current_user,
@@ -65,7 +66,7 @@ async def update_goal(
     goal_id: str,
     goal_data: GoalCreate,
     current_user: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     stmt = select(Goal).where(
         Goal.id == uuid.UUID(goal_id),
@@ -90,7 +91,7 @@ async def update_goal(
 async def delete_goal(
     goal_id: str,
     current_user: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     stmt = select(Goal).where(
         Goal.id == uuid.UUID(goal_id),
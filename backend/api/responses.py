@@ -0,0 +1,103 @@
+"""
+Response Layer
+Every router in backend/api uses FastJSONRoute: what an endpoint returns goes straight to orjson,
+skipping FastAPI's jsonable_encoder pass. orjson encodes the dataclass read models
+(backend/core/read_models.py), UUIDs, datetimes and numpy values natively, and anything else
+(Decimal, pydantic models) falls back to jsonable_encoder one value at a time.
+Routes with a response_model keep FastAPI's validation and only render through FastJSONResponse.
+CompressionMiddleware gzips bodies of GZIP_MIN_BYTES or more.
+"""
+import asyncio
+import functools
+import inspect
+import orjson
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.responses import Response
+from starlette.types import Message, Receive, Scope, Send
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Streams that must reach the client event by event, and formats that are already compressed
+UNCOMPRESSED_TYPES = (
+    "text/event-stream",
+    "application/vnd.apache.parquet",
+    "application/vnd.openxmlformats",
+    "application/zip",
+    "image/",
+)
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=jsonable_encoder, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def _respond(content, status_code: int | None) -> Response:
+    status_code = status_code or 200
+    if status_code < 200 or status_code in (204, 304):
+        return Response(status_code=status_code)
+    return FastJSONResponse(content, status_code=status_code)
+
+
+def _direct(endpoint, status_code: int | None):
+    """Wraps an endpoint so its result leaves as a FastJSONResponse (Responses pass through)."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            content = await endpoint(*args, **kwargs)
+            return content if isinstance(content, Response) else _respond(content, status_code)
+    else:
+        # Stays sync: FastAPI keeps running it in the threadpool
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            content = endpoint(*args, **kwargs)
+            return content if isinstance(content, Response) else _respond(content, status_code)
+    wrapper.direct_json = True
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """
+    APIRoute for the routers in backend/api (APIRouter(route_class=FastJSONRoute)).
+    Headers set on an injected Response parameter are not copied: return a Response to set them.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        response_model = kwargs.get("response_model")
+        if (
+            not getattr(endpoint, "direct_json", False)
+            and (response_model is None or isinstance(response_model, DefaultPlaceholder))
+            and inspect.signature(endpoint).return_annotation is inspect.Signature.empty
+        ):
+            endpoint = _direct(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+
+class _SelectiveGZipResponder(GZipResponder):
+    async def send_with_gzip(self, message: Message) -> None:
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(UNCOMPRESSED_TYPES):
+                # Same path as a response that already has a Content-Encoding: sent as is
+                self.content_encoding_set = True
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves UNCOMPRESSED_TYPES alone (SSE would otherwise be buffered)."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _SelectiveGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
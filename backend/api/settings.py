@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import delete, select, update, text
+from sqlalchemy import delete, update, text
 import random
 import logging
+from backend.api.responses import FastJSONRoute
 from backend.core.auth import get_current_user
-from backend.db.session import get_db
+from backend.db.session import get_user_db
 from backend.core import clients
-from backend.db.models import Transaction, Budget, Goal, Account, UserProfile
+from backend.db.models import Transaction, Budget, Goal, Account, UserProfile, Category
 from backend.core.ledger import LedgerService
+from backend.core.account_directory import invalidate_directory
+from backend.core.categories import add_category, find_category, list_categories, remove_category
 
-router = APIRouter(prefix="/api/settings", tags=["Settings"])
+router = APIRouter(prefix="/api/settings", tags=["Settings"], route_class=FastJSONRoute)
 logger = logging.getLogger(__name__)
 
 CONFIRMATION_PHRASE = "tenho certeza"
@@ -45,7 +48,7 @@ async def delete_account_request(
 async def delete_account_confirm(
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Verifies OTP and phrase, then wipes all user data.
@@ -74,6 +77,7 @@ async def delete_account_confirm(
         await db.execute(delete(Goal).where(Goal.user_phone == phone))
         await db.execute(delete(Account).where(Account.user_phone == phone))
         await db.execute(delete(UserProfile).where(UserProfile.user_phone == phone))
+        await db.execute(delete(Category).where(Category.user_phone == phone))
         await db.execute(text("DELETE FROM assets WHERE user_phone = :phone"), {"phone": phone})
         await db.execute(text("DELETE FROM category_learning WHERE user_phone = :phone"), {"phone": phone})
         await db.execute(text("DELETE FROM net_worth_history WHERE user_phone = :phone"), {"phone": phone})
@@ -97,6 +101,7 @@ async def delete_account_confirm(
         )
 
         await db.commit()
+        await invalidate_directory(phone)
 
         # Cleanup Redis
         await clients.redis_client.delete(redis_key)
@@ -113,85 +118,29 @@ async def delete_account_confirm(
 @router.get("/categories")
 async def get_user_categories(
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
-    """Returns all distinct categories for the current user (from transactions + custom)."""
-    import json
-    from sqlalchemy import text
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-
-    # Categories from transactions
-    result = await db.execute(
-        select(Transaction.category)
-        .where(Transaction.category != None, Transaction.user_phone == current_user_phone)
-        .distinct()
-    )
-    tx_categories = {row[0] for row in result.fetchall()}
-
-    # Custom categories from user profile
-    profile_result = await db.execute(
-        select(UserProfile.custom_categories).where(UserProfile.user_phone == current_user_phone)
-    )
-    row = profile_result.scalar_one_or_none()
-    custom = set()
-    if row:
-        try:
-            custom = set(json.loads(row))
-        except (json.JSONDecodeError, TypeError):
-            pass
-
-    all_categories = sorted(tx_categories | custom)
-    return {"categories": all_categories}
+    """Returns all categories for the current user (used by transactions or created)."""
+    return {"categories": await list_categories(db, current_user_phone)}
 
 
 @router.post("/categories")
 async def create_category(
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Creates a new custom category.
     Payload: {"name": "Vestuário"}
     """
-    import json
-    from sqlalchemy import text
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-
     name = payload.get("name", "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="Category name is required")
 
-    # Check if already exists in transactions
-    existing = await db.execute(
-        select(Transaction.id)
-        .where(Transaction.user_phone == current_user_phone, Transaction.category == name)
-        .limit(1)
-    )
-    if existing.first() is not None:
-        raise HTTPException(status_code=409, detail="Essa categoria já existe nas suas transações")
-
-    # Load profile
-    profile_result = await db.execute(
-        select(UserProfile).where(UserProfile.user_phone == current_user_phone)
-    )
-    profile = profile_result.scalar_one_or_none()
-
-    if not profile:
-        raise HTTPException(status_code=404, detail="User profile not found")
-
-    custom = []
-    if profile.custom_categories:
-        try:
-            custom = json.loads(profile.custom_categories)
-        except (json.JSONDecodeError, TypeError):
-            custom = []
-
-    if name in custom:
+    # Also catches case/accent variants ("vestuario" when "Vestuário" exists)
+    if await find_category(db, current_user_phone, name) or not await add_category(db, current_user_phone, name):
         raise HTTPException(status_code=409, detail="Essa categoria já existe")
-
-    custom.append(name)
-    profile.custom_categories = json.dumps(custom)
     await db.commit()
 
     return {"status": "success", "category": name}
@@ -201,15 +150,12 @@ async def create_category(
 async def rename_category(
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Renames a category across all transactions and budgets for the user.
     Payload: {"old_name": "Roupa", "new_name": "Vestuário"}
     """
-    from sqlalchemy import text
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-
     old_name = payload.get("old_name", "").strip()
     new_name = payload.get("new_name", "").strip()
 
@@ -219,13 +165,11 @@ async def rename_category(
     if old_name == new_name:
         raise HTTPException(status_code=400, detail="New name must be different from old name")
 
-    # Check if new_name already exists (would merge categories)
-    existing = await db.execute(
-        select(Transaction.id)
-        .where(Transaction.user_phone == current_user_phone, Transaction.category == new_name)
-        .limit(1)
-    )
-    merge = existing.first() is not None
+    # Renaming onto an existing category (even spelled "vestuario" for "Vestuário") merges them
+    existing = await find_category(db, current_user_phone, new_name)
+    merge = existing is not None and existing != old_name
+    if merge:
+        new_name = existing
 
     # Update all transactions
     tx_result = await db.execute(
@@ -241,22 +185,9 @@ async def rename_category(
         .values(category=new_name)
     )
 
-    # Update custom_categories list if the old name was there
-    import json
-    profile_result = await db.execute(
-        select(UserProfile).where(UserProfile.user_phone == current_user_phone)
-    )
-    profile = profile_result.scalar_one_or_none()
-    if profile and profile.custom_categories:
-        try:
-            custom = json.loads(profile.custom_categories)
-            if old_name in custom:
-                custom = [new_name if c == old_name else c for c in custom]
-                # Remove duplicates
-                custom = list(dict.fromkeys(custom))
-                profile.custom_categories = json.dumps(custom)
-        except (json.JSONDecodeError, TypeError):
-            pass
+    # The triggers moved the usage to new_name; categories without transactions move here
+    await remove_category(db, current_user_phone, old_name)
+    await add_category(db, current_user_phone, new_name)
 
     await db.commit()
 
@@ -272,15 +203,12 @@ async def rename_category(
 async def delete_category(
     payload: dict = Body(...),
     current_user_phone: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_db)
 ):
     """
     Removes a category from all transactions (sets to 'Outros') and deletes related budgets.
     Payload: {"name": "Roupa"}
     """
-    from sqlalchemy import text
-    await db.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": current_user_phone})
-
     name = payload.get("name", "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="Category name is required")
@@ -298,20 +226,9 @@ async def delete_category(
         .where(Budget.user_phone == current_user_phone, Budget.category == name)
     )
 
-    # Remove from custom_categories if present
-    import json
-    profile_result = await db.execute(
-        select(UserProfile).where(UserProfile.user_phone == current_user_phone)
-    )
-    profile = profile_result.scalar_one_or_none()
-    if profile and profile.custom_categories:
-        try:
-            custom = json.loads(profile.custom_categories)
-            if name in custom:
-                custom.remove(name)
-                profile.custom_categories = json.dumps(custom)
-        except (json.JSONDecodeError, TypeError):
-            pass
+    # "Outros" keeps its transactions, so its row stays
+    if name != "Outros":
+        await remove_category(db, current_user_phone, name)
 
     await db.commit()
 
@@ -0,0 +1,300 @@
+"""
+Account Directory
+Per-user directory of active accounts for resolving names typed in WhatsApp ("itau",
+"nubank credito", "cartão"). Tokens and aliases are precomputed once per directory and
+matches are ranked locally (token overlap, edit distance, type hints), so resolving a name
+costs no query beyond folding a new query string the way the names are (fold_query).
+Held in an in-process LRU backed by Redis; "accounts" change events (backend/core/events.py)
+invalidate it in every process, and the account endpoints also do so directly after committing.
+Redis entries are keyed by a per-user generation that invalidation bumps, so a directory read
+before a change can't be cached after it.
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core import clients, events
+from backend.core.ledger import _strip_accents
+from backend.db.models import Account
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY_CACHE_TTL = 86400
+# Change events invalidate local copies, so the TTL only bounds staleness from a missed event;
+# without a connected consumer other processes' changes only reach us when local copies expire
+LOCAL_TTL = 300
+DISCONNECTED_LOCAL_TTL = 30
+LOCAL_MAX_USERS = 2048
+FOLDED_QUERIES_MAX = 4096
+
+# Name scores go up to 1.0 (every word matches both ways); a matching type hint adds TYPE_BONUS
+MIN_SCORE = 0.5
+TYPE_BONUS = 0.5
+# A best match this far ahead of the runner-up is used without asking the user
+CLEAR_MARGIN = 0.2
+
+# Words that say which kind of account is meant ("nubank crédito", "cartão do itaú")
+TYPE_HINTS = {
+    "credito": "CREDIT", "cartao": "CREDIT", "card": "CREDIT", "fatura": "CREDIT",
+    "debito": "CHECKING", "corrente": "CHECKING", "poupanca": "CHECKING", "pix": "CHECKING",
+    "dinheiro": "CASH", "especie": "CASH", "carteira": "CASH",
+    "investimento": "INVESTMENT", "investimentos": "INVESTMENT", "corretora": "INVESTMENT",
+}
+# "cartão de débito" is the checking account, whatever "cartão" alone suggests
+OVERRIDING_HINTS = {"debito"}
+
+# Common nicknames, keyed by the normalized account name token
+BANK_ALIASES = {
+    "nubank": ["nu", "roxinho"],
+    "itau": ["itaucard"],
+    "caixa": ["cef"],
+    "bradesco": ["bradescard"],
+    "santander": ["santa"],
+    "mercadopago": ["mp"],
+    "picpay": ["pic"],
+}
+
+NAME_STOPWORDS = {"de", "do", "da", "dos", "das", "e", "o", "a", "meu", "minha", "no", "na", "conta", "banco"}
+
+
+class DirectoryAccount:
+    """An active account as the matcher sees it (id/name/type like Account, plus search terms)."""
+    __slots__ = ("id", "name", "type", "is_default", "tokens", "aliases")
+
+    def __init__(self, id: str, name: str, type: str, is_default: bool, tokens: list, aliases: list):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.is_default = is_default
+        self.tokens = tokens
+        self.aliases = aliases
+
+    @classmethod
+    def build(cls, id, name: str, type: str, is_default: bool, normalized_name: str = None) -> "DirectoryAccount":
+        """Search terms come from normalized_name (accounts.normalized_name, migration 021) when given."""
+        folded = normalized_name or name
+        tokens = _tokens(folded)
+        aliases = []
+        joined = "".join(tokens)
+        for key in (joined, *tokens):
+            aliases.extend(BANK_ALIASES.get(key, []))
+        words = [w for w in _tokens(folded, keep_stopwords=True) if w not in {"de", "do", "da", "dos", "das", "e"}]
+        if len(words) > 1:
+            # "Banco do Brasil" -> "bb", "Mercado Pago" -> "mp", plus the glued form "mercadopago"
+            aliases.append("".join(w[0] for w in words))
+            aliases.append("".join(words))
+        return cls(str(id), name, type, bool(is_default), tokens, sorted(set(aliases) - set(tokens)))
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercase, accent-free form of a name or query. Directory names are folded in SQL first
+    (normalize_account_name, migration 021), and unaccent also folds letters such as "ø" or "ß"
+    that NFD leaves alone, so queries against a directory go through fold_query too; this alone
+    only suits lists built without normalized_name, where both sides are folded here.
+    """
+    return " ".join(_strip_accents(text or "").lower().split())
+
+
+def _tokens(text: str, keep_stopwords: bool = False) -> list[str]:
+    words = "".join(c if c.isalnum() else " " for c in normalize(text)).split()
+    return [w for w in words if keep_stopwords or w not in NAME_STOPWORDS] or words
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 as soon as it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _similarity(word: str, term: str) -> float:
+    """1.0 for the same word, 0.9 for a prefix ("nub"), less for typos ("nubnak"), else 0."""
+    if word == term:
+        return 1.0
+    if len(word) >= 3 and term.startswith(word):
+        return 0.9
+    if len(word) >= 4:
+        limit = 1 if len(word) <= 5 else 2
+        distance = _edit_distance(word, term, limit)
+        if distance <= limit:
+            return 0.8 - 0.1 * distance
+    return 0.0
+
+
+def _name_score(words: list[str], account: DirectoryAccount) -> float:
+    """
+    Mean of how much of the query the account explains (aliases count) and how much of the
+    account name the query mentions, so neither extra words nor partial names sink a match.
+    """
+    if not words:
+        return 0.0
+    terms = account.tokens + account.aliases
+    query_coverage = sum(max(_similarity(w, t) for t in terms) for w in words) / len(words)
+    name_coverage = sum(max(_similarity(w, t) for w in words) for t in account.tokens) / len(account.tokens)
+    return (query_coverage + name_coverage) / 2
+
+
+def _type_hint(words: list[str]) -> str:
+    hinted = [w for w in words if w in TYPE_HINTS]
+    for word in hinted:
+        if word in OVERRIDING_HINTS:
+            return TYPE_HINTS[word]
+    return TYPE_HINTS[hinted[0]] if hinted else None
+
+
+def rank_accounts(accounts: list[DirectoryAccount], query: str) -> list[tuple[DirectoryAccount, float]]:
+    """Accounts matching `query`, best first, with their scores (>= MIN_SCORE)."""
+    words = _tokens(query)
+    hint = _type_hint(words)
+    ranked = []
+    for account in accounts:
+        # Hint words only count towards the name when the name has them ("Carteira")
+        name_words = [w for w in words if w not in TYPE_HINTS or w in account.tokens]
+        score = _name_score(name_words, account)
+        if hint:
+            score += TYPE_BONUS if account.type == hint else -TYPE_BONUS
+        if score >= MIN_SCORE:
+            ranked.append((account, round(score, 3)))
+    ranked.sort(key=lambda pair: (-pair[1], not pair[0].is_default, pair[0].name))
+    return ranked
+
+
+def best_matches(accounts: list[DirectoryAccount], query: str) -> list[DirectoryAccount]:
+    """
+    The account `query` names, as a one-element list when one match is clearly ahead;
+    otherwise the close contenders (for a disambiguation list), or [] when nothing matches.
+    """
+    ranked = rank_accounts(accounts, query)
+    if not ranked:
+        return []
+    top = ranked[0][1]
+    return [account for account, score in ranked if top - score < CLEAR_MARGIN]
+
+
+_local: "OrderedDict[str, tuple[float, list[DirectoryAccount]]]" = OrderedDict()
+# query -> normalize_account_name(query); the function is IMMUTABLE, so entries never go stale
+_folded_queries: "OrderedDict[str, str]" = OrderedDict()
+# Bumped by every invalidation in this process: a directory loaded across one isn't kept locally
+_invalidations = 0
+
+
+def _generation_key(user_phone: str) -> str:
+    return f"acctdir:{user_phone}:gen"
+
+
+def _cache_key(user_phone: str, generation: str) -> str:
+    return f"acctdir:{user_phone}:{generation}"
+
+
+def _remember(user_phone: str, accounts: list[DirectoryAccount]):
+    ttl = LOCAL_TTL if events.connected() else DISCONNECTED_LOCAL_TTL
+    _local[user_phone] = (time.monotonic() + ttl, accounts)
+    _local.move_to_end(user_phone)
+    while len(_local) > LOCAL_MAX_USERS:
+        _local.popitem(last=False)
+
+
+async def get_directory(session: AsyncSession, user_phone: str) -> list[DirectoryAccount]:
+    """The user's active accounts: process LRU, then Redis, then one query."""
+    entry = _local.get(user_phone)
+    if entry and entry[0] > time.monotonic():
+        _local.move_to_end(user_phone)
+        return entry[1]
+    invalidations = _invalidations
+
+    # Read before the query: if the accounts change meanwhile, the entry written below goes to
+    # a generation nobody reads anymore
+    generation = None
+    if clients.redis_client:
+        try:
+            generation = await clients.redis_client.get(_generation_key(user_phone)) or "0"
+            cached = await clients.redis_client.get(_cache_key(user_phone, generation))
+            if cached:
+                accounts = [DirectoryAccount(**item) for item in json.loads(cached)]
+                if invalidations == _invalidations:
+                    _remember(user_phone, accounts)
+                return accounts
+        except Exception as e:
+            logger.warning(f"Account directory cache read failed for {user_phone}: {e}")
+
+    result = await session.execute(
+        select(Account.id, Account.name, Account.type, Account.is_default, Account.normalized_name).where(
+            Account.user_phone == user_phone,
+            Account.is_active == True,
+        )
+    )
+    accounts = [
+        DirectoryAccount.build(row.id, row.name, row.type, row.is_default, row.normalized_name)
+        for row in result.fetchall()
+    ]
+    if invalidations == _invalidations:
+        _remember(user_phone, accounts)
+
+    if clients.redis_client and generation is not None:
+        try:
+            await clients.redis_client.set(
+                _cache_key(user_phone, generation), json.dumps([a.to_dict() for a in accounts]),
+                ex=DIRECTORY_CACHE_TTL,
+            )
+        except Exception as e:
+            logger.warning(f"Account directory cache write failed for {user_phone}: {e}")
+    return accounts
+
+
+async def invalidate_directory(user_phone: str):
+    """
+    Drops the user's directory here and moves Redis to a new generation. Runs on every
+    "accounts" change event, and right after the account endpoints commit so this process never
+    waits on the bus for its own writes; entries of older generations expire with DIRECTORY_CACHE_TTL.
+    """
+    global _invalidations
+    _invalidations += 1
+    _local.pop(user_phone, None)
+    if clients.redis_client:
+        try:
+            await clients.redis_client.incr(_generation_key(user_phone))
+        except Exception as e:
+            logger.warning(f"Account directory invalidation failed for {user_phone}: {e}")
+
+
+async def _on_accounts_changed(event: dict):
+    await invalidate_directory(event["user_phone"])
+
+
+events.subscribe("accounts", _on_accounts_changed)
+
+
+async def fold_query(session: AsyncSession, query: str) -> str:
+    """
+    `query` folded by normalize_account_name, like the directory's names, so both sides compare
+    under the same rules. Cached per process: repeated queries cost no round trip.
+    """
+    query = query or ""
+    folded = _folded_queries.get(query)
+    if folded is None:
+        folded = await session.scalar(select(func.normalize_account_name(query))) or ""
+        _folded_queries[query] = folded
+        while len(_folded_queries) > FOLDED_QUERIES_MAX:
+            _folded_queries.popitem(last=False)
+    else:
+        _folded_queries.move_to_end(query)
+    return folded
+
+
+async def resolve_account(session: AsyncSession, user_phone: str, query: str) -> list[DirectoryAccount]:
+    """best_matches over the user's directory, with the query folded like the names (fold_query)."""
+    return best_matches(await get_directory(session, user_phone), await fold_query(session, query))
@@ -0,0 +1,63 @@
+"""
+Categories
+Reads and writes of the per-user categories table (migration 022). Transaction writes keep
+usage_count/last_used_at current through triggers; these helpers cover listing, lookup and
+categories created, renamed or removed by the user.
+"""
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db.models import Category
+
+
+async def list_categories(session: AsyncSession, user_phone: str) -> list[str]:
+    """The user's category names, alphabetically."""
+    result = await session.scalars(
+        select(Category.name).where(Category.user_phone == user_phone).order_by(Category.name)
+    )
+    return list(result.all())
+
+
+async def ranked_categories(session: AsyncSession, user_phone: str) -> list[str]:
+    """The user's category names, most used first (for the LLM prompt)."""
+    result = await session.scalars(
+        select(Category.name)
+        .where(Category.user_phone == user_phone)
+        .order_by(Category.usage_count.desc(), Category.last_used_at.desc().nulls_last(), Category.name)
+    )
+    return list(result.all())
+
+
+async def find_category(session: AsyncSession, user_phone: str, name: str) -> str | None:
+    """
+    The stored name of the category `name` refers to, ignoring case and accents
+    ("alimentacao" -> "Alimentação"); an exact match wins, then the most used.
+    """
+    result = await session.scalars(
+        select(Category.name)
+        .where(
+            Category.user_phone == user_phone,
+            Category.normalized_name == func.normalize_account_name(name),
+        )
+        .order_by(case((Category.name == name, 0), else_=1), Category.usage_count.desc())
+        .limit(1)
+    )
+    return result.first()
+
+
+async def add_category(session: AsyncSession, user_phone: str, name: str) -> bool:
+    """Creates the category if the user doesn't have it yet. Returns whether it was created."""
+    result = await session.execute(
+        insert(Category)
+        .values(user_phone=user_phone, name=name)
+        .on_conflict_do_nothing(index_elements=["user_phone", "name"])
+        .returning(Category.id)
+    )
+    return result.first() is not None
+
+
+async def remove_category(session: AsyncSession, user_phone: str, name: str):
+    """Deletes the category row (its transactions must have been moved to another category first)."""
+    await session.execute(
+        delete(Category).where(Category.user_phone == user_phone, Category.name == name)
+    )
@@ -0,0 +1,281 @@
+"""
+Category Suggester
+Embeds transaction descriptions with a small local CPU sentence model and stores them in
+category_learning (pgvector). A nearest-neighbour vote over the user's confirmed history
+suggests a category; confident matches let simple WhatsApp messages skip the LLM.
+"""
+import asyncio
+import logging
+import re
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.config import settings
+from backend.core.ledger import _strip_accents
+from backend.core.llm import INTENT_LOG, classify_intent, _normalize_message
+
+logger = logging.getLogger(__name__)
+
+try:
+    from sentence_transformers import SentenceTransformer
+    HAS_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    HAS_SENTENCE_TRANSFORMERS = False
+    logger.warning("⚠️ 'sentence-transformers' library not found. Embedding-based category suggestions will be disabled.")
+
+EMBEDDING_DIM = 384  # category_learning.embedding vector(384)
+EMBED_BATCH_SIZE = 64
+NEIGHBOURS = 5
+# Neighbours below this similarity don't vote
+MIN_NEIGHBOUR_SIMILARITY = 0.6
+
+
+def normalize_description(description: str) -> str:
+    """Lowercase, accent-free, single-spaced form used as the learning key."""
+    return " ".join(_strip_accents(description or "").lower().split())
+
+
+def _to_pgvector(vector) -> str:
+    # Text literal cast to vector in SQL (bound as TEXT, so asyncpg needs no pgvector codec)
+    return "[" + ",".join(f"{float(x):.6f}" for x in vector) + "]"
+
+
+class CategoryEmbedder:
+    def __init__(self, model_name: str = None, device: str = "cpu"):
+        """
+        Loads the sentence model (384-dim, multilingual MiniLM by default).
+        """
+        self.model_name = model_name or settings.CATEGORY_EMBEDDING_MODEL
+        self.model = None
+        if HAS_SENTENCE_TRANSFORMERS:
+            try:
+                self.model = SentenceTransformer(self.model_name, device=device)
+                dim = self.model.get_sentence_embedding_dimension()
+                if dim != EMBEDDING_DIM:
+                    logger.error(f"Embedding model '{self.model_name}' has dimension {dim}, expected {EMBEDDING_DIM}.")
+                    self.model = None
+                else:
+                    logger.info(f"Embedding model '{self.model_name}' loaded successfully.")
+            except Exception as e:
+                logger.error(f"Failed to load embedding model: {e}")
+        else:
+            logger.warning("CategoryEmbedder initialized without a model (missing dependency).")
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    def embed(self, texts: list[str], batch_size: int = EMBED_BATCH_SIZE) -> list[list[float]]:
+        """
+        Embeds texts in batches (CPU-bound, blocking). Vectors are L2-normalized so
+        cosine distance in pgvector matches the model's similarity.
+        """
+        if not self.available or not texts:
+            return []
+        vectors = self.model.encode(
+            texts, batch_size=batch_size, normalize_embeddings=True,
+            convert_to_numpy=True, show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    async def aembed(self, texts: list[str], batch_size: int = EMBED_BATCH_SIZE) -> list[list[float]]:
+        """Non-blocking embed: runs the model in a worker thread."""
+        return await asyncio.to_thread(self.embed, texts, batch_size)
+
+
+class CategorySuggester:
+    def __init__(self, session: AsyncSession, embedder: CategoryEmbedder):
+        self.session = session
+        self.embedder = embedder
+
+    async def learn_many(self, user_phone: str, pairs: list[tuple[str, str]]) -> int:
+        """
+        Stores confirmed (description, category) pairs for a user.
+        Descriptions are embedded in one batch; repeated pairs bump their hit count.
+        Does not commit.
+        """
+        if not self.embedder or not self.embedder.available:
+            return 0
+
+        counts: dict[tuple[str, str], int] = {}
+        for description, category in pairs:
+            key = (normalize_description(description), (category or "").strip())
+            if key[0] and key[1]:
+                counts[key] = counts.get(key, 0) + 1
+        if not counts:
+            return 0
+
+        keys = list(counts)
+        vectors = await self.embedder.aembed([desc for desc, _ in keys])
+        await self.session.execute(
+            text("""
+                INSERT INTO category_learning
+                    (id, user_phone, original_description, corrected_category, embedding, hits)
+                VALUES (gen_random_uuid(), :phone, :description, :category, CAST(CAST(:embedding AS TEXT) AS vector), :hits)
+                ON CONFLICT (user_phone, original_description, corrected_category)
+                DO UPDATE SET hits = category_learning.hits + EXCLUDED.hits,
+                              updated_at = CURRENT_TIMESTAMP
+            """),
+            [
+                {"phone": user_phone, "description": desc, "category": cat,
+                 "embedding": _to_pgvector(vec), "hits": counts[(desc, cat)]}
+                for (desc, cat), vec in zip(keys, vectors)
+            ]
+        )
+        return len(keys)
+
+    async def learn(self, user_phone: str, description: str, category: str) -> int:
+        return await self.learn_many(user_phone, [(description, category)])
+
+    async def suggest(self, user_phone: str, description: str, k: int = NEIGHBOURS) -> dict | None:
+        """
+        Nearest-neighbour category vote for a description.
+        Returns {"category", "similarity", "share", "confident", "latency_ms"} or None
+        when there is no model or no learned history.
+        """
+        normalized = normalize_description(description)
+        if not normalized or not self.embedder or not self.embedder.available:
+            return None
+
+        started = time.perf_counter()
+        vectors = await self.embedder.aembed([normalized])
+        # Exact search over the user's rows (found through the user_phone btree; a user has
+        # hundreds of pairs at most). An ANN index over every user's rows filters by user only
+        # after its scan, so a user could get fewer than k neighbours, or none.
+        result = await self.session.execute(
+            text("""
+                WITH mine AS MATERIALIZED (
+                    SELECT corrected_category, hits, embedding
+                    FROM category_learning
+                    WHERE user_phone = :phone AND embedding IS NOT NULL
+                )
+                SELECT corrected_category, hits,
+                       1 - (embedding <=> CAST(CAST(:embedding AS TEXT) AS vector)) AS similarity
+                FROM mine
+                ORDER BY embedding <=> CAST(CAST(:embedding AS TEXT) AS vector)
+                LIMIT :k
+            """),
+            {"phone": user_phone, "embedding": _to_pgvector(vectors[0]), "k": k}
+        )
+        rows = result.fetchall()
+        latency_ms = (time.perf_counter() - started) * 1000
+        if not rows:
+            return None
+
+        # Similarity-weighted vote; frequently confirmed pairs count more (capped)
+        votes: dict[str, float] = {}
+        for category, hits, similarity in rows:
+            if similarity < MIN_NEIGHBOUR_SIMILARITY:
+                continue
+            votes[category] = votes.get(category, 0.0) + similarity * (1 + min(hits, 10) / 10)
+        if not votes:
+            return None
+
+        best = max(votes, key=votes.get)
+        best_similarity = max(float(s) for c, _, s in rows if c == best)
+        share = votes[best] / sum(votes.values())
+        confident = (
+            best_similarity >= settings.CATEGORY_MATCH_THRESHOLD
+            and share >= settings.CATEGORY_MATCH_MIN_SHARE
+        )
+        return {
+            "category": best,
+            "similarity": round(best_similarity, 4),
+            "share": round(share, 3),
+            "confident": confident,
+            "latency_ms": round(latency_ms, 1),
+        }
+
+
+# --- Fast path for simple WhatsApp logs ---
+
+_INCOME_WORDS = ("recebi", "ganhei", "caiu", "salario", "entrou", "rendimento", "reembolso")
+# Anything the fast path can't represent (accounts, transfers, installments) goes to the LLM
+_COMPLEX_MARKERS = re.compile(
+    r"\b(?:cartao|credito|debito|conta|transferi|transferencia|parcel\w*|vezes|\d+\s*x|"
+    r"ontem|anteontem|amanha|semana|mes|dia)\b"
+)
+_VERBS = re.compile(
+    r"\b(?:gastei|paguei|comprei|recebi|ganhei|caiu|entrou|almocei|jantei|abasteci|assinei)\b"
+)
+_MONEY = re.compile(r"(?:r\$\s*)?(\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:[.,]\d{1,2})?)(?:\s*(?:reais|real|conto|contos|pila))?")
+_AMOUNT_TOKEN = re.compile(r"(?:r\$)?\d[\d.,]*|r\$|reais|real|conto|contos|pila")
+_EDGE_STOPWORDS = {"no", "na", "nos", "nas", "em", "com", "de", "do", "da", "dos", "das", "pra", "para", "pro", "o", "a", "um", "uma"}
+
+
+def _parse_amount(raw: str) -> float:
+    if "," in raw:
+        raw = raw.replace(".", "").replace(",", ".")
+    elif raw.count(".") == 1 and len(raw.split(".")[1]) == 3:
+        raw = raw.replace(".", "")  # "1.500" = mil e quinhentos
+    return float(raw)
+
+
+def extract_simple_transaction(message: str, account_names: list[str] = None) -> dict | None:
+    """
+    Extracts amount, type and description from short logs like "gastei 45 no ifood",
+    "uber 23,50" or "recebi 200 de reembolso". Returns None whenever the message needs
+    the LLM: not a log, more than one value, dates, installments, transfers or accounts.
+    """
+    if classify_intent(message) != INTENT_LOG:
+        return None
+    normalized = _normalize_message(message)
+    if _COMPLEX_MARKERS.search(normalized):
+        return None
+
+    padded = f" {normalized} "
+    for name in account_names or []:
+        name_norm = normalize_description(name)
+        if name_norm and f" {name_norm} " in padded:
+            return None
+
+    amounts = _MONEY.findall(normalized)
+    if len(amounts) != 1:
+        return None
+    amount = _parse_amount(amounts[0])
+    if amount <= 0:
+        return None
+
+    tx_type = "INCOME" if any(w in normalized for w in _INCOME_WORDS) else "EXPENSE"
+
+    # Description = the remaining words, keeping the user's original spelling
+    original = message.strip()
+    if original.startswith("[Transcrição de Áudio]:"):
+        original = original[len("[Transcrição de Áudio]:"):]
+    tokens = [(w.strip(".,!?"), normalize_description(w).strip(".,!?")) for w in original.split()]
+    tokens = [(w, n) for w, n in tokens if n and not _VERBS.fullmatch(n) and not _AMOUNT_TOKEN.fullmatch(n)]
+    while tokens and tokens[0][1] in _EDGE_STOPWORDS:
+        tokens.pop(0)
+    while tokens and tokens[-1][1] in _EDGE_STOPWORDS:
+        tokens.pop()
+    if not tokens or len(tokens) > 5:
+        return None
+
+    description = " ".join(w for w, _ in tokens)
+    if description == description.lower():
+        description = description[:1].upper() + description[1:]
+    return {
+        "amount": amount,
+        "type": tx_type,
+        "description": description,
+        "account_name": None,
+        "installments": None,
+    }
+
+
+async def suggest_simple_transaction(
+    suggester: CategorySuggester, user_phone: str, message: str, account_names: list[str] = None
+) -> tuple[dict | None, dict | None]:
+    """
+    Tries to build a log_transaction payload without the LLM.
+    Returns (data, suggestion): data is set only for a confident category match;
+    suggestion carries the lookup result (and latency) even when it isn't used.
+    """
+    data = extract_simple_transaction(message, account_names)
+    if not data:
+        return None, None
+    suggestion = await suggester.suggest(user_phone, data["description"])
+    if not suggestion or not suggestion["confident"]:
+        return None, suggestion
+    data["category"] = suggestion["category"]
+    return data, suggestion
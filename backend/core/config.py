@@ -13,6 +13,49 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: str = "5432"
     DATABASE_URL: Optional[str] = None
+    # Set to false when migrations run as a separate deploy step (python -m backend.db.migrate)
+    RUN_MIGRATIONS_ON_STARTUP: bool = True
+
+    # Connection pools (per process). Watch GET /health/db before changing these.
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    # Background jobs (create_task workers, CLIs) use a separate, smaller pool
+    DB_WORKER_POOL_SIZE: int = 3
+    DB_WORKER_MAX_OVERFLOW: int = 2
+    DB_WORKER_POOL_TIMEOUT: float = 30.0
+    # DATABASE_URL points at PgBouncer in transaction mode (disables statement caches).
+    # Migrations take a session-level advisory lock: run them against Postgres directly.
+    DB_PGBOUNCER: bool = False
+    # Streaming replica for read-only endpoints (backend/db/replica.py); unset = everything on the primary
+    DATABASE_REPLICA_URL: Optional[str] = None
+    DB_REPLICA_POOL_SIZE: int = 10
+    DB_REPLICA_MAX_OVERFLOW: int = 5
+    # Reads go back to the primary while the replica's replay lag is above this...
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_SECONDS: float = 2.0
+    # ...and, per user, for this long after the user's own write (read-your-writes)
+    REPLICA_STICKY_SECONDS: float = 10.0
+
+    # Monthly totals rollup check (backend/workers/monthly_totals.py); 0 disables the background loop
+    MONTHLY_TOTALS_CHECK_INTERVAL_MINUTES: int = 1440
+
+    # Balance drift check (backend/workers/balance_drift.py); 0 disables the background loop
+    BALANCE_DRIFT_INTERVAL_MINUTES: int = 60
+    BALANCE_DRIFT_BATCH_USERS: int = 200
+
+    # Change events outbox (backend/workers/outbox_dispatcher.py); 0 disables the background loop
+    OUTBOX_DISPATCH_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 500
+
+    # Responses (backend/api/responses.py): gzip bodies of at least this many bytes
+    GZIP_MIN_BYTES: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 5
+
+    # Monthly transaction partitions (backend/workers/transaction_partitions.py); 0 disables the background loop
+    PARTITION_MAINTENANCE_INTERVAL_HOURS: int = 24
+    TRANSACTION_PARTITION_MONTHS_AHEAD: int = 36
 
     # WhatsApp
     WHATSAPP_API_TOKEN: Optional[str] = None
@@ -25,6 +68,19 @@ class Settings(BaseSettings):
 
     # VLLM
     HUGGING_FACE_HUB_TOKEN: Optional[str] = None
+    LLM_BASE_URL: str = "http://vllm:8000/v1"
+    LLM_MODEL: str = "Qwen/Qwen2.5-7B-Instruct-AWQ"
+    # Optional smaller model served on the same OpenAI-compatible interface.
+    # When set, it handles chitchat and ambiguous intent classification.
+    LLM_ROUTER_MODEL: Optional[str] = None
+    LLM_ROUTER_BASE_URL: Optional[str] = None
+
+    # Category suggestions (local CPU embeddings + pgvector nearest neighbours)
+    CATEGORY_EMBEDDING_MODEL: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    # A match skips the LLM only if the closest neighbour is this similar...
+    CATEGORY_MATCH_THRESHOLD: float = 0.88
+    # ...and its category holds this share of the neighbour vote
+    CATEGORY_MATCH_MIN_SHARE: float = 0.7
 
     @model_validator(mode='after')
     def assemble_db_connection(self):
@@ -0,0 +1,56 @@
+"""
+Data Versions
+Per-user counter (user_data_versions, migration 019) bumped by triggers on every write to
+transactions, accounts, budgets, profiles and investment snapshots. Responses cached in Redis
+under the current version stay valid until the user's data changes: no explicit invalidation.
+"""
+import json
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core import clients
+
+logger = logging.getLogger(__name__)
+
+# Superseded versions are never read again; the TTL only bounds how long they linger
+VERSIONED_CACHE_TTL = 6 * 3600
+
+
+async def get_data_version(session: AsyncSession, user_phone: str) -> int:
+    """Current version (0 if the user never wrote anything). One primary-key lookup."""
+    result = await session.execute(
+        text("SELECT version FROM user_data_versions WHERE user_phone = :phone"),
+        {"phone": user_phone}
+    )
+    return result.scalar() or 0
+
+
+def _cache_key(kind: str, user_phone: str, version: int, scope: str) -> str:
+    return f"{kind}:{user_phone}:v{version}" + (f":{scope}" if scope else "")
+
+
+async def get_versioned(kind: str, user_phone: str, version: int, scope: str = ""):
+    """
+    Cached payload for (kind, user, version, scope) or None.
+    `scope` covers inputs other than the data, e.g. the current day or a filter hash.
+    """
+    if not clients.redis_client:
+        return None
+    try:
+        raw = await clients.redis_client.get(_cache_key(kind, user_phone, version, scope))
+        return json.loads(raw) if raw is not None else None
+    except Exception as e:
+        logger.warning(f"{kind} cache read failed for {user_phone}: {e}")
+        return None
+
+
+async def store_versioned(kind: str, user_phone: str, version: int, payload, scope: str = "",
+                          ttl: int = VERSIONED_CACHE_TTL):
+    if not clients.redis_client:
+        return
+    try:
+        await clients.redis_client.set(
+            _cache_key(kind, user_phone, version, scope), json.dumps(payload, default=str), ex=ttl
+        )
+    except Exception as e:
+        logger.warning(f"{kind} cache write failed for {user_phone}: {e}")
@@ -0,0 +1,82 @@
+"""
+Change Events
+Bus for the change events written to change_events_outbox by triggers (migration 023) and
+published to a Redis stream by backend/workers/outbox_dispatcher.py. Caches register a handler
+per topic (table name) with `subscribe` instead of being invalidated by each write path; every
+app process reads the whole stream, so process-local caches are invalidated everywhere.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable
+from backend.core import clients
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM = "change_events"
+# Approximate cap on the stream length; consumers only need recent entries
+EVENT_STREAM_MAXLEN = 10000
+READ_BLOCK_MS = 5000
+
+# topic -> handlers; an event is a dict with topic, user_phone, operation, row_count, outbox_id
+_handlers: dict[str, list[Callable[[dict], Awaitable[None]]]] = defaultdict(list)
+# Whether this process's consumer is currently reading the stream (its last read succeeded)
+_connected = False
+
+
+def connected() -> bool:
+    """True while run_event_consumer is receiving events; caches shorten their local TTLs otherwise."""
+    return _connected
+
+
+def subscribe(topic: str, handler: Callable[[dict], Awaitable[None]]):
+    """Registers an async handler for the events of one table (e.g. "accounts")."""
+    _handlers[topic].append(handler)
+
+
+async def publish(events: list[dict]):
+    """Appends events to the stream in one round trip. Raises if Redis is unavailable."""
+    if not clients.redis_client:
+        raise RuntimeError("Redis client not initialized")
+    async with clients.redis_client.pipeline(transaction=False) as pipe:
+        for event in events:
+            fields = {key: str(value) for key, value in event.items()}
+            pipe.xadd(EVENT_STREAM, fields, maxlen=EVENT_STREAM_MAXLEN, approximate=True)
+        await pipe.execute()
+
+
+async def handle(event: dict):
+    """Runs the handlers subscribed to the event's topic; a failing handler doesn't stop the others."""
+    for handler in _handlers.get(event.get("topic"), []):
+        try:
+            await handler(event)
+        except Exception as e:
+            logger.warning(f"Change event handler {handler.__name__} failed for {event}: {e}")
+
+
+async def run_event_consumer():
+    """
+    Background loop (asyncio.create_task): feeds stream entries to the subscribed handlers.
+    Starts at the end of the stream; what changed before startup is not in this process's caches.
+    """
+    global _connected
+    last_id = "$"
+    while True:
+        if not clients.redis_client:
+            _connected = False
+            await asyncio.sleep(READ_BLOCK_MS / 1000)
+            continue
+        try:
+            response = await clients.redis_client.xread({EVENT_STREAM: last_id}, block=READ_BLOCK_MS, count=500)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _connected = False
+            logger.warning(f"Change event stream read failed: {e}")
+            await asyncio.sleep(READ_BLOCK_MS / 1000)
+            continue
+        _connected = True
+        for _stream, entries in response or []:
+            for entry_id, fields in entries:
+                last_id = entry_id
+                await handle(fields)
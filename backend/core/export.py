@@ -0,0 +1,201 @@
+"""
+Transaction Export
+Streams a user's transactions as CSV, Parquet or XLSX from a server-side cursor: rows arrive
+in batches and are encoded and sent batch by batch, so memory stays flat at any history size.
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import tempfile
+from typing import AsyncIterator
+from sqlalchemy import desc
+from backend.core.repository import TransactionRepository
+from backend.db.models import Transaction
+from backend.db.replica import read_session_factory
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+    logger.warning("⚠️ 'pyarrow' library not found. Parquet export will be disabled.")
+
+try:
+    import xlsxwriter
+    HAS_XLSXWRITER = True
+except ImportError:
+    HAS_XLSXWRITER = False
+    logger.warning("⚠️ 'XlsxWriter' library not found. XLSX export will be disabled.")
+
+# Rows per server-side cursor fetch (and per Parquet row group)
+EXPORT_BATCH_SIZE = 2000
+FILE_READ_CHUNK = 256 * 1024
+# Excel's sheet limit; longer exports continue on a new sheet
+XLSX_MAX_ROWS = 1_048_576
+
+EXPORT_COLUMNS = (
+    Transaction.id, Transaction.date, Transaction.description, Transaction.category,
+    Transaction.amount, Transaction.type, Transaction.installment_number,
+    Transaction.installments_count, Transaction.is_cleared,
+)
+HEADERS = ["ID", "Data", "Descrição", "Categoria", "Valor", "Tipo", "Parcelas", "Status"]
+
+# format -> (media type, download filename)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "transacoes.csv"),
+    "parquet": ("application/vnd.apache.parquet", "transacoes.parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "transacoes.xlsx"),
+}
+
+
+def export_available(fmt: str) -> bool:
+    return fmt == "csv" or (fmt == "parquet" and HAS_PYARROW) or (fmt == "xlsx" and HAS_XLSXWRITER)
+
+
+async def _row_batches(user_phone: str, filters: dict, batch_size: int) -> AsyncIterator[list]:
+    """
+    Yields lists of Core rows (EXPORT_COLUMNS) in list order, newest first.
+    Opens its own session: a StreamingResponse body runs after request-scoped sessions close.
+    """
+    # Replica when fresh enough: long exports stay off the primary pool
+    new_session = await read_session_factory(user_phone)
+    async with new_session() as session:
+        query = (
+            TransactionRepository(session).filtered_query(user_phone, **filters)
+            .with_only_columns(*EXPORT_COLUMNS)
+            .order_by(desc(Transaction.date), desc(Transaction.id))
+            .execution_options(yield_per=batch_size)
+        )
+        result = await session.stream(query)
+        async for batch in result.partitions():
+            yield batch
+
+
+def _display_row(row) -> list:
+    return [
+        str(row.id),
+        row.date.strftime("%Y-%m-%d") if row.date else "",
+        row.description,
+        row.category,
+        row.amount,
+        row.type,
+        f"{row.installment_number}/{row.installments_count}" if row.installments_count else "1/1",
+        "Cleared" if row.is_cleared else "Pending",
+    ]
+
+
+async def _csv(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(HEADERS)
+    async for batch in batches:
+        writer.writerows(_display_row(row) for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object for ParquetWriter; drain() hands over the bytes written so far."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("id", pa.string()),
+        ("date", pa.timestamp("us")),
+        ("description", pa.string()),
+        ("category", pa.string()),
+        ("amount", pa.float64()),
+        ("type", pa.string()),
+        ("installment_number", pa.int32()),
+        ("installments_count", pa.int32()),
+        ("is_cleared", pa.bool_()),
+    ])
+
+
+async def _parquet(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    async for batch in batches:
+        columns = {name: [] for name in schema.names}
+        for row in batch:
+            for name in schema.names:
+                columns[name].append(str(row.id) if name == "id" else getattr(row, name))
+        # One row group per batch; its bytes can go out right away
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    writer.close()
+    yield sink.drain()
+
+
+async def _xlsx(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    # XLSX is a zip whose directory is written last, so the workbook is built in
+    # constant_memory mode (rows flushed to disk as written) and the file streamed after.
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "tmpdir": tempfile.gettempdir()})
+        date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+        worksheet, row_index = None, XLSX_MAX_ROWS
+        async for batch in batches:
+            for row in batch:
+                if row_index >= XLSX_MAX_ROWS:
+                    worksheet = workbook.add_worksheet()
+                    worksheet.write_row(0, 0, HEADERS)
+                    row_index = 1
+                values = _display_row(row)
+                worksheet.write_row(row_index, 0, values)
+                if row.date:
+                    worksheet.write_datetime(row_index, 1, row.date, date_format)
+                row_index += 1
+        if worksheet is None:
+            workbook.add_worksheet().write_row(0, 0, HEADERS)
+        await asyncio.to_thread(workbook.close)
+
+        with open(path, "rb") as f:
+            while chunk := await asyncio.to_thread(f.read, FILE_READ_CHUNK):
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+def stream_export(user_phone: str, fmt: str, filters: dict) -> AsyncIterator[bytes]:
+    """Body generator for a StreamingResponse; check export_available(fmt) first."""
+    encoders = {"csv": _csv, "parquet": _parquet, "xlsx": _xlsx}
+    return encoders[fmt](_row_batches(user_phone, filters, EXPORT_BATCH_SIZE))
@@ -0,0 +1,96 @@
+"""
+Installment Scheduler
+Splits a purchase into N installments in one pass (exact cents, monthly dates from the purchase,
+invoice due dates from the card's closing_day/due_day) and persists them with a single multi-row
+INSERT ... RETURNING.
+Used by LedgerService.register_transaction and TransactionRepository.create_transaction.
+"""
+import calendar
+import uuid
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db.models import Transaction
+
+
+def split_amount(amount: float, count: int) -> list[float]:
+    """
+    Splits amount into count installments that add up to it exactly, in cents.
+    The leftover cents go one each to the first installments (R$ 100 / 3 = 33.34 + 33.33 + 33.33).
+    """
+    cents = int((Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+    base, leftover = divmod(cents, count)
+    return [(base + (1 if i < leftover else 0)) / 100 for i in range(count)]
+
+
+def _on_day(month: datetime, day: int) -> datetime:
+    """month moved to `day`, clamped to the month's length (due day 31 in February -> 28/29)."""
+    return month.replace(day=min(day, calendar.monthrange(month.year, month.month)[1]))
+
+
+def installment_dates(purchase_date: datetime, count: int) -> list[datetime]:
+    """
+    Dates of the count installments: one per month from the purchase date, so the first one counts
+    in the purchase month like a single purchase does. Invoice due dates are kept in due_date.
+    """
+    return [purchase_date + relativedelta(months=i) for i in range(count)]
+
+
+def invoice_due_dates(purchase_date: datetime, count: int, closing_day: int = None,
+                      due_day: int = None) -> list[datetime]:
+    """
+    Due dates of the card invoices the count installments are billed on (None without a due_day).
+    Purchases on or after closing_day go to the next invoice, and an invoice is due in its closing
+    month when due_day > closing_day, otherwise in the following month.
+    """
+    if not due_day:
+        return [None] * count
+
+    closing_month = purchase_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if closing_day and purchase_date.day >= closing_day:
+        closing_month += relativedelta(months=1)
+    if closing_day:
+        first_due = closing_month if due_day > closing_day else closing_month + relativedelta(months=1)
+    else:
+        # Unknown closing day: the next due date after the purchase
+        first_due = closing_month if purchase_date.day < due_day else closing_month + relativedelta(months=1)
+    return [_on_day(first_due + relativedelta(months=i), due_day) for i in range(count)]
+
+
+def plan_installments(user_phone: str, amount: float, count: int, description: str, category: str,
+                      purchase_date: datetime, tx_type: str = "EXPENSE", account_id=None,
+                      closing_day: int = None, due_day: int = None, raw_message: str = None,
+                      is_cleared: bool = None) -> list[dict]:
+    """Column values of every installment, ready for one INSERT."""
+    group_id = uuid.uuid4()
+    dates = installment_dates(purchase_date, count)
+    due_dates = invoice_due_dates(purchase_date, count, closing_day, due_day)
+    rows = []
+    for number, (value, date, due_date) in enumerate(zip(split_amount(amount, count), dates, due_dates), start=1):
+        row = dict(
+            id=uuid.uuid4(),
+            user_phone=str(user_phone),
+            account_id=account_id,
+            type=tx_type,
+            amount=value,
+            category=category,
+            description=f"{description or ''} ({number}/{count})",
+            date=date,
+            due_date=due_date,
+            raw_message=raw_message,
+            installments_count=count,
+            installment_number=number,
+            group_id=group_id,
+        )
+        if is_cleared is not None:
+            row["is_cleared"] = is_cleared
+        rows.append(row)
+    return rows
+
+
+async def insert_installments(session: AsyncSession, rows: list[dict]) -> list[Transaction]:
+    """Persists planned installments in one multi-row INSERT; returns them in installment order."""
+    result = await session.scalars(insert(Transaction).values(rows).returning(Transaction))
+    return sorted(result.all(), key=lambda tx: tx.installment_number)
@@ -1,8 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, text
 from backend.db.models import Transaction, Account
+from backend.core.installments import insert_installments, invoice_due_dates, plan_installments
 from uuid import UUID
-import uuid
 import unicodedata
 from datetime import datetime
 import logging
@@ -16,6 +16,10 @@ def _strip_accents(s: str) -> str:
         if unicodedata.category(c) != 'Mn'
     )
 
+def _escape_like(value: str) -> str:
+    """Escapes LIKE wildcards (escape character '!') so the term matches literally."""
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
 class LedgerService:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -49,6 +53,8 @@ class LedgerService:
         """
         Recalculates current_balance for all accounts of a user from scratch.
         current_balance = initial_balance + SUM(incomes) - SUM(expenses) +/- transfers
+        Scans the user's whole history: writes rely on the balance triggers instead, and this is
+        only for repairs (backend/workers/balance_drift.py) and initial_balance changes.
         """
         await self.session.execute(text("""
             UPDATE accounts a
@@ -86,59 +92,65 @@ class LedgerService:
         )
         return result.scalars().all()
 
-    async def get_account_by_name(self, user_phone: str, name: str, acc_type: str = None):
+    async def get_account_by_name(self, user_phone: str, name: str, acc_type: str = None,
+                                  include_inactive: bool = False):
         """
         Search for account by exact name (case-insensitive, accent-insensitive) and optionally by type.
         Used for duplicate detection — name uniqueness is scoped per type.
+        One lookup on the normalized_name index (migration 021).
         """
-        normalized_name = _strip_accents(name).lower()
         conditions = [
             Account.user_phone == user_phone,
-            Account.is_active == True,
+            Account.normalized_name == func.normalize_account_name(name),
         ]
+        if not include_inactive:
+            conditions.append(Account.is_active == True)
         if acc_type:
             conditions.append(Account.type == acc_type.upper())
-        stmt = select(Account).where(*conditions)
+        stmt = select(Account).where(*conditions).order_by(Account.is_active.desc(), Account.created_at).limit(1)
         result = await self.session.execute(stmt)
-        for account in result.scalars().all():
-            if _strip_accents(account.name).lower() == normalized_name:
-                return account
-        return None
+        return result.scalar_one_or_none()
+
+    async def find_accounts_by_name(self, user_phone: str, name: str) -> list:
+        """Active accounts of any type with this exact name (e.g. Itaú checking + Itaú credit card)."""
+        stmt = select(Account).where(
+            Account.user_phone == user_phone,
+            Account.is_active == True,
+            Account.normalized_name == func.normalize_account_name(name),
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
 
     async def get_default_account(self, user_phone: str):
         """Returns the user's default account. If only one active account exists, returns it automatically."""
-        all_active = await self.session.execute(
+        # Two rows tell "only one account" apart from "several"; the default one sorts first
+        result = await self.session.execute(
             select(Account).where(
                 Account.user_phone == user_phone,
                 Account.is_active == True,
-            )
+            ).order_by(Account.is_default.desc()).limit(2)
         )
-        active_accounts = all_active.scalars().all()
+        active_accounts = result.scalars().all()
 
         if len(active_accounts) == 1:
             return active_accounts[0]
-
-        for acc in active_accounts:
-            if acc.is_default:
-                return acc
-
+        if active_accounts and active_accounts[0].is_default:
+            return active_accounts[0]
         return None
 
     async def search_accounts_by_partial_name(self, user_phone: str, name: str) -> list:
         """
         Search for active accounts whose name contains the given term (case-insensitive, accent-insensitive).
-        Used for fuzzy matching when exact name lookup fails.
+        Used for fuzzy matching when exact name lookup fails. An empty term matches every active account.
         """
-        normalized_name = _strip_accents(name).lower()
+        pattern = func.concat("%", func.normalize_account_name(_escape_like(name)), "%")
         stmt = select(Account).where(
             Account.user_phone == user_phone,
             Account.is_active == True,
+            Account.normalized_name.like(pattern, escape="!"),
         )
         result = await self.session.execute(stmt)
-        return [
-            acc for acc in result.scalars().all()
-            if normalized_name in _strip_accents(acc.name).lower()
-        ]
+        return result.scalars().all()
 
     async def register_transaction(self,
                                    user_phone: str,
@@ -188,56 +200,29 @@ class LedgerService:
                     resolved_dest_account_id = dest_account.id
 
         # 3. Create Transaction
-        # NOTE: Balance updates are handled by the DB trigger (trg_update_balance)
+        # NOTE: Balance updates are handled by the DB triggers (trg_update_balance_*, migration 020)
         # on INSERT/UPDATE/DELETE. No application-level balance changes needed here.
 
-        # Handle installments (Basic Logic for MVP - Recurrence is complex)
-        # For now, we log the full value or the first installment? 
-        # Requirement says: "Divisão automática de compras futuras". 
-        # We will create N transactions in the future.
-        
+        # Purchases keep their date; card expenses also get their invoice's due date (due_date)
+        purchase_date = date or datetime.utcnow()
+
+        # Installments: one row per month, inserted in a single statement
         if installments and installments > 1 and tx_type == "EXPENSE":
-             # Create N transactions
-             installment_amount = amount / installments
-             group_id = uuid.uuid4()
-             
-             # Create first one now
-             first_tx = Transaction(
+            rows = plan_installments(
                 user_phone=user_phone,
-                account_id=resolved_account_id,
-                type=tx_type,
-                amount=installment_amount,
+                amount=amount,
+                count=installments,
+                description=description,
                 category=category,
-                description=f"{description} (1/{installments})",
-                date=date or datetime.utcnow(),
-                installments_count=installments,
-                installment_number=1,
-                group_id=group_id
-             )
-             self.session.add(first_tx)
-             
-             # Create future ones (simple approach: +30 days loop)
-             # Ideally use dateutil.relativedelta
-             from dateutil.relativedelta import relativedelta
-             current_date = date or datetime.utcnow()
-             
-             for i in range(2, installments + 1):
-                 current_date += relativedelta(months=1)
-                 future_tx = Transaction(
-                    user_phone=user_phone,
-                    account_id=resolved_account_id,
-                    type=tx_type,
-                    amount=installment_amount,
-                    category=category,
-                    description=f"{description} ({i}/{installments})",
-                    date=current_date,
-                    installments_count=installments,
-                    installment_number=i,
-                    group_id=group_id
-                 )
-                 self.session.add(future_tx)
-                 
-             return first_tx
+                purchase_date=purchase_date,
+                tx_type=tx_type,
+                account_id=resolved_account_id,
+                closing_day=account.closing_day,
+                due_day=account.due_day,
+                is_cleared=is_cleared,
+            )
+            created = await insert_installments(self.session, rows)
+            return created[0]
         else:
             # Single Transaction
             tx_kwargs = dict(
@@ -248,8 +233,10 @@ class LedgerService:
                 amount=amount,
                 category=category,
                 description=description,
-                date=date or datetime.utcnow()
+                date=purchase_date
             )
+            if tx_type == "EXPENSE" and account.due_day:
+                tx_kwargs["due_date"] = invoice_due_dates(purchase_date, 1, account.closing_day, account.due_day)[0]
             if is_cleared is not None:
                 tx_kwargs["is_cleared"] = is_cleared
             tx = Transaction(**tx_kwargs)
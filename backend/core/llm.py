@@ -1,27 +1,133 @@
 import httpx
 import logging
 import json
+import re
+import time
+import unicodedata
 from datetime import datetime
 from backend.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-class LLMClient:
+# Intent tiers, from cheapest to most expensive prompt.
+INTENT_CHITCHAT = "chitchat"
+INTENT_QUESTION = "question"
+INTENT_EDIT = "edit"
+INTENT_LOG = "log"
+INTENTS = (INTENT_CHITCHAT, INTENT_QUESTION, INTENT_EDIT, INTENT_LOG)
+
+# Action the model is expected to return for each tier (used to measure routing accuracy)
+_EXPECTED_ACTION = {
+    INTENT_CHITCHAT: "chat",
+    INTENT_QUESTION: "chat",
+    INTENT_EDIT: "edit_last",
+    INTENT_LOG: "log_transaction",
+}
+
+_CHITCHAT_WORDS = {
+    "oi", "ola", "opa", "eai", "e", "ai", "hey", "hi", "hello", "bom", "boa", "dia", "tarde", "noite",
+    "tudo", "bem", "beleza", "blz", "obrigado", "obrigada", "obg", "vlw", "valeu", "tchau", "ate",
+    "logo", "mais", "tmj", "show", "top", "legal", "massa", "kkk", "kkkk", "haha", "rs", "como", "vai",
+    "voce", "vc", "cortex", "otimo", "perfeito", "entendi", "certo", "blza",
+}
+_QUESTION_STARTERS = {
+    "quanto", "quantos", "quanta", "quantas", "qual", "quais", "como", "onde", "quando", "porque",
+    "por", "mostra", "mostre", "lista", "liste", "resumo", "saldo", "extrato", "me",
+}
+_EDIT_STARTERS = {
+    "muda", "mude", "mudar", "corrige", "corrija", "corrigir", "altera", "altere", "alterar",
+    "troca", "troque", "trocar", "edita", "edite", "editar",
+}
+_EDIT_MARKERS = (" era ", "na verdade", "ultimo lancamento", "lancamento anterior")
+_LOG_VERBS = (
+    "gastei", "paguei", "comprei", "recebi", "ganhei", "transferi", "mandei", "enviei", "caiu",
+    "pix", "deposit", "saquei", "parcel", "almocei", "jantei", "abasteci", "assinei", "r$", "reais",
+)
+_AMOUNT_RE = re.compile(r"\d+(?:[.,]\d+)?")
+_TRANSCRIPTION_PREFIX = "[Transcrição de Áudio]:"
+
+
+def _normalize_message(message: str) -> str:
+    """Lowercases, strips accents and the audio transcription prefix."""
+    message = message.strip()
+    if message.startswith(_TRANSCRIPTION_PREFIX):
+        message = message[len(_TRANSCRIPTION_PREFIX):]
+    message = ''.join(
+        c for c in unicodedata.normalize('NFD', message.lower())
+        if unicodedata.category(c) != 'Mn'
+    )
+    return " ".join(message.split())
+
+
+def classify_intent(message: str) -> str | None:
+    """
+    Rule-based intent classifier (runs on CPU in microseconds).
+    Returns one of INTENTS, or None when the message is ambiguous.
+    """
+    text = _normalize_message(message)
+    if not text:
+        return INTENT_CHITCHAT
+
+    words = re.findall(r"[a-z$]+", text)
+    has_amount = bool(_AMOUNT_RE.search(text))
+
+    if not has_amount and words and all(w in _CHITCHAT_WORDS for w in words):
+        return INTENT_CHITCHAT
+    if not words and not has_amount:
+        # Only emojis / punctuation
+        return INTENT_CHITCHAT
+
+    padded = f" {text} "
+    if (words and words[0] in _EDIT_STARTERS) or any(m in padded for m in _EDIT_MARKERS):
+        return INTENT_EDIT
+
+    # A value or a money verb may be a transaction even when phrased as a question
+    # ("paguei 30 de uber?"): only the full prompt can log it
+    has_log_verb = any(v in text for v in _LOG_VERBS)
+    if has_amount or has_log_verb:
+        return INTENT_LOG
+
+    if "?" in text or (words and words[0] in _QUESTION_STARTERS):
+        return INTENT_QUESTION
+
+    return None
+
+
+class RouterStats:
+    """In-process per-tier counters: calls, latency, prompt tokens and routing accuracy."""
+
     def __init__(self):
-        # vLLM is running on a specific port (mapped to 8001 in docker-compose)
-        # However, inside the docker network, it is accessible via the service name 'vllm' and port 8000
-        self.base_url = "http://vllm:8000/v1" 
-        self.model = "Qwen/Qwen2.5-7B-Instruct-AWQ"
-        self.headers = {
-            "Content-Type": "application/json",
-            # "Authorization": f"Bearer {settings.HUGGING_FACE_HUB_TOKEN}" # Not needed for local vllm usually unless gated
-        }
-        
-    async def process_message(self, user_message: str, context_data: str = None, available_categories: list = None) -> str:
-        """
-        Sends a message to the local LLM and returns the response.
-        """
-        system_prompt = """Você é o Cortex Brasil, um assistente financeiro pessoal, sábio e proativo.
+        self._tiers: dict[str, dict] = {}
+
+    def record(self, tier: str, latency_ms: float, prompt_tokens: int = None, action: str = None):
+        entry = self._tiers.setdefault(tier, {
+            "calls": 0, "latency_ms_total": 0.0, "prompt_tokens_total": 0,
+            "checked": 0, "agreed": 0,
+        })
+        entry["calls"] += 1
+        entry["latency_ms_total"] += latency_ms
+        if prompt_tokens:
+            entry["prompt_tokens_total"] += prompt_tokens
+        expected = _EXPECTED_ACTION.get(tier)
+        if expected and action:
+            entry["checked"] += 1
+            if action == expected:
+                entry["agreed"] += 1
+
+    def snapshot(self) -> dict:
+        result = {}
+        for tier, e in self._tiers.items():
+            calls = e["calls"] or 1
+            result[tier] = {
+                "calls": e["calls"],
+                "avg_latency_ms": round(e["latency_ms_total"] / calls, 1),
+                "avg_prompt_tokens": round(e["prompt_tokens_total"] / calls, 1),
+                "accuracy": round(e["agreed"] / e["checked"], 3) if e["checked"] else None,
+            }
+        return result
+
+
+SYSTEM_PROMPT = """Você é o Cortex Brasil, um assistente financeiro pessoal, sábio e proativo.
 Seu objetivo é extrair informações financeiras de mensagens informais e realizar a contabilidade correta (Double-Entry).
 
 Sempre responda em formato JSON estrito, sem markdown, com a seguinte estrutura:
@@ -92,59 +198,213 @@ Resposta: {
     "reply_text": "Corrigido!"
 }
 """
-        # Build categories section
-        if available_categories:
-            cats_list = "\n".join(f"- {c}" for c in available_categories)
-            categories_section = f"Categorias disponíveis:\n{cats_list}"
-        else:
-            categories_section = "Nenhuma categoria cadastrada ainda. Use nomes comuns em português (ex: Alimentação, Transporte, Saúde, Lazer, Moradia, Salário)."
 
-        # Inject context and categories
-        formatted_prompt = system_prompt.replace("{context_data}", context_data if context_data else "Nenhuma transação recente encontrada.")
-        formatted_prompt = formatted_prompt.replace("{categories_section}", categories_section)
+CHITCHAT_PROMPT = """Você é o Cortex Brasil, um assistente financeiro pessoal simpático no WhatsApp.
+Responda a mensagem do usuário de forma curta (no máximo 2 frases), em português, com no máximo um emoji.
+Se fizer sentido, lembre que ele pode registrar gastos escrevendo algo como "gastei 50 no almoço".
+Responda APENAS em JSON estrito, sem markdown: {"action": "chat", "reply_text": "sua resposta"}
+"""
 
-        messages = [{"role": "system", "content": formatted_prompt}]
-        messages.append({"role": "user", "content": user_message})
+QUESTION_PROMPT = """Você é o Cortex Brasil, um assistente financeiro pessoal, sábio e proativo.
+Responda à pergunta do usuário usando SOMENTE os dados de contexto abaixo. Seja direto e use valores em R$.
+Se os dados não forem suficientes, diga isso de forma amigável e sugira consultar o painel web.
+Responda APENAS em JSON estrito, sem markdown: {"action": "chat", "reply_text": "sua resposta"}
+
+## CONTEXTO FINANCEIRO
+--------------------------------------------------
+{context_data}
+--------------------------------------------------
+"""
+
+ROUTER_PROMPT = """Classifique a intenção da mensagem de um usuário de um app financeiro.
+Responda com UMA palavra apenas:
+- log: registrar gasto, receita ou transferência
+- edit: corrigir o último lançamento
+- question: pergunta sobre saldo, gastos, histórico
+- chitchat: saudação, agradecimento, conversa
+"""
 
+class LLMClient:
+    def __init__(self):
+        # vLLM is running on a specific port (mapped to 8001 in docker-compose)
+        # However, inside the docker network, it is accessible via the service name 'vllm' and port 8000
+        self.base_url = settings.LLM_BASE_URL
+        self.model = settings.LLM_MODEL
+        # Small model on the same OpenAI-compatible interface (optional)
+        self.router_model = settings.LLM_ROUTER_MODEL
+        self.router_base_url = settings.LLM_ROUTER_BASE_URL or self.base_url
+        self.headers = {
+            "Content-Type": "application/json",
+            # "Authorization": f"Bearer {settings.HUGGING_FACE_HUB_TOKEN}" # Not needed for local vllm usually unless gated
+        }
+        self.router_stats = RouterStats()
+
+    async def _chat_completion(self, messages: list, model: str = None, base_url: str = None,
+                               temperature: float = 0.3, max_tokens: int = 1000,
+                               timeout: float = 120.0) -> tuple[str, dict]:
+        """
+        Posts a chat completion and returns (content, usage).
+        Errors are mapped to the chat fallback JSON the WhatsApp flow already understands.
+        """
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "messages": messages,
-            "temperature": 0.3,
-            "max_tokens": 1000 # Increased for context answers
+            "temperature": temperature,
+            "max_tokens": max_tokens,
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
+        async with httpx.AsyncClient(timeout=timeout) as client:
             try:
-                logger.info(f"Sending request to LLM: {self.model}")
-                response = await client.post(f"{self.base_url}/chat/completions", headers=self.headers, json=payload)
-                
+                logger.info(f"Sending request to LLM: {payload['model']}")
+                response = await client.post(f"{base_url or self.base_url}/chat/completions", headers=self.headers, json=payload)
+
                 if response.status_code != 200:
                     logger.error(f"LLM Error {response.status_code}: {response.text}")
                     return json.dumps({
                         "action": "chat",
                         "reply_text": "Desculpe, estou com dificuldades técnicas no momento."
-                    })
-                    
+                    }), {}
+
                 result = response.json()
                 content = result['choices'][0]['message']['content']
-                return content
+                return content, result.get("usage") or {}
             except httpx.ConnectError:
                 logger.error("Could not connect to vLLM service.")
                 return json.dumps({
                     "reply_text": "🧠 O Cortex está acordando. Tente novamente em alguns segundos."
-                })
+                }), {}
             except httpx.ReadTimeout:
                 logger.error("LLM Request Timed Out")
                 return json.dumps({
-                    "action": "chat", 
+                    "action": "chat",
                     "reply_text": "🧠 O processamento está demorando mais que o esperado. Tente uma frase mais curta?"
-                })
+                }), {}
             except Exception as e:
                 logger.error(f"Error calling LLM: {str(e)}")
                 return json.dumps({
-                    "action": "chat", 
+                    "action": "chat",
                     "reply_text": "Ops, tive um pensamento confuso. Tente novamente."
-                })
+                }), {}
+
+    async def stream_chat_completion(self, messages: list, model: str = None, temperature: float = 0.3,
+                                     max_tokens: int = 1000, timeout: float = 120.0):
+        """
+        Opens a streaming chat completion (stream=true) and yields content deltas as they arrive.
+        Closing the generator closes the HTTP connection, which makes vLLM abort the generation.
+        """
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            async with client.stream("POST", f"{self.base_url}/chat/completions", headers=self.headers, json=payload) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    logger.error(f"LLM Stream Error {response.status_code}: {body[:500]!r}")
+                    raise RuntimeError(f"LLM returned status {response.status_code}")
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping malformed stream chunk: {data[:100]}")
+                        continue
+                    choices = chunk.get("choices") or []
+                    delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                    if delta:
+                        yield delta
+
+    async def process_message(self, user_message: str, context_data: str = None, available_categories: list = None) -> str:
+        """
+        Sends a message to the local LLM and returns the response.
+        Always uses the full extraction prompt; see route_message for the tiered path.
+        """
+        content, _ = await self._full_completion(user_message, context_data, available_categories)
+        return content
+
+    async def _full_completion(self, user_message: str, context_data: str = None, available_categories: list = None) -> tuple[str, dict]:
+        # Build categories section
+        if available_categories:
+            cats_list = "\n".join(f"- {c}" for c in available_categories)
+            categories_section = f"Categorias disponíveis:\n{cats_list}"
+        else:
+            categories_section = "Nenhuma categoria cadastrada ainda. Use nomes comuns em português (ex: Alimentação, Transporte, Saúde, Lazer, Moradia, Salário)."
+
+        # Inject context and categories
+        formatted_prompt = SYSTEM_PROMPT.replace("{context_data}", context_data if context_data else "Nenhuma transação recente encontrada.")
+        formatted_prompt = formatted_prompt.replace("{categories_section}", categories_section)
+
+        messages = [{"role": "system", "content": formatted_prompt}]
+        messages.append({"role": "user", "content": user_message})
+
+        return await self._chat_completion(messages, temperature=0.3, max_tokens=1000)  # 1000: room for context answers
+
+    async def _classify_with_model(self, user_message: str) -> str | None:
+        """Asks the small router model for the intent. Returns None if unavailable or unparseable."""
+        if not self.router_model:
+            return None
+        messages = [
+            {"role": "system", "content": ROUTER_PROMPT},
+            {"role": "user", "content": user_message},
+        ]
+        content, _ = await self._chat_completion(
+            messages, model=self.router_model, base_url=self.router_base_url,
+            temperature=0.0, max_tokens=4, timeout=10.0,
+        )
+        word = _normalize_message(content).strip(" .\"'")
+        return word if word in INTENTS else None
+
+    async def route_message(self, user_message: str, context_data: str = None, available_categories: list = None) -> str:
+        """
+        Tiered entry point for WhatsApp messages.
+        Classifies the intent first and sends each message to the cheapest prompt/model
+        able to handle it. Log and edit (and anything ambiguous) use the full extraction prompt.
+        """
+        intent = classify_intent(user_message)
+        if intent is None:
+            intent = await self._classify_with_model(user_message)
+        tier = intent or "full"
+
+        started = time.perf_counter()
+        if tier == INTENT_CHITCHAT:
+            messages = [
+                {"role": "system", "content": CHITCHAT_PROMPT},
+                {"role": "user", "content": user_message},
+            ]
+            content, usage = await self._chat_completion(
+                messages,
+                model=self.router_model or self.model,
+                base_url=self.router_base_url if self.router_model else self.base_url,
+                temperature=0.5, max_tokens=150, timeout=30.0,
+            )
+        elif tier == INTENT_QUESTION:
+            prompt = QUESTION_PROMPT.replace("{context_data}", context_data if context_data else "Nenhuma transação recente encontrada.")
+            messages = [
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": user_message},
+            ]
+            content, usage = await self._chat_completion(messages, temperature=0.3, max_tokens=600)
+        else:
+            content, usage = await self._full_completion(user_message, context_data, available_categories)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        action = None
+        try:
+            action = json.loads(content).get("action")
+        except (json.JSONDecodeError, AttributeError):
+            pass
+        self.router_stats.record(tier, latency_ms, usage.get("prompt_tokens"), action)
+        logger.info(f"🧭 LLM route: tier={tier} action={action} latency={latency_ms:.0f}ms prompt_tokens={usage.get('prompt_tokens')}")
+        return content
 
     async def analyze_search_query(self, query: str) -> dict:
         """
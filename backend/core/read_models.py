@@ -0,0 +1,85 @@
+"""
+Read Models
+Slotted DTOs for the list-shaped read paths (transactions, holdings, performance series). The
+repository selects only their columns as Core rows and maps each row once; endpoints return them
+as they are and backend/api/responses.py serializes dataclasses (UUIDs, dates included) natively.
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import date as date_type, datetime
+from backend.db.models import Transaction
+
+# Columns behind TransactionItem, in from_row's order
+TRANSACTION_ITEM_COLUMNS = (
+    Transaction.id,
+    Transaction.amount,
+    Transaction.category,
+    Transaction.description,
+    Transaction.type,
+    Transaction.account_id,
+    Transaction.date,
+    Transaction.installment_number,
+    Transaction.installments_count,
+    Transaction.is_cleared,
+)
+
+
+@dataclass(slots=True, frozen=True)
+class TransactionItem:
+    """A transaction as list endpoints and LLM contexts use it (the /transactions item shape)."""
+    id: uuid.UUID
+    amount: float | None
+    category: str | None
+    description: str | None
+    type: str | None
+    account_id: uuid.UUID | None
+    date: datetime | None
+    is_installment: bool
+    installment_info: str | None
+    is_cleared: bool | None
+
+    @classmethod
+    def from_row(cls, row) -> "TransactionItem":
+        """Maps a row selected with TRANSACTION_ITEM_COLUMNS."""
+        (tx_id, amount, category, description, tx_type, account_id, date,
+         installment_number, installments_count, is_cleared) = row
+        return cls(
+            tx_id, amount, category, description, tx_type, account_id, date,
+            bool(installment_number),
+            f"{installment_number}/{installments_count}" if installments_count and installments_count > 1 else None,
+            is_cleared,
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class TransactionStats:
+    """Aggregates of a user's whole history, computed in one grouped query."""
+    count: int
+    total_income: float
+    total_expense: float
+    first_date: datetime | None
+    last_date: datetime | None
+
+
+@dataclass(slots=True, frozen=True)
+class Holding:
+    """A portfolio position valued at its latest price (the /investments holding shape)."""
+    id: uuid.UUID
+    ticker: str
+    name: str | None
+    type: str
+    quantity: float
+    avg_price: float
+    current_price: float
+    current_value: float
+    gain_loss: float
+    gain_pct: float
+    change_pct: float | None
+    dividend_yield: float | None
+
+
+@dataclass(slots=True, frozen=True)
+class SeriesPoint:
+    """One point of a performance series: % return from the period start."""
+    date: date_type
+    value: float
@@ -1,12 +1,32 @@
-from sqlalchemy import desc, or_
+from sqlalchemy import case, desc, false, func, or_, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from backend.db.models import Transaction
+from backend.db.models import Transaction, TransactionId
+from backend.core.installments import insert_installments, plan_installments
+from backend.core.read_models import TRANSACTION_ITEM_COLUMNS, TransactionItem, TransactionStats
 from datetime import datetime
+import base64
+import json
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+
+def encode_cursor(tx) -> str:
+    """Opaque keyset cursor pointing just after `tx` in (date DESC, id DESC) order."""
+    payload = json.dumps({"d": tx.date.isoformat(), "i": str(tx.id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload["d"]), uuid.UUID(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
 class TransactionRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -37,54 +57,20 @@ class TransactionRepository:
             base_date = datetime.now(tz).replace(tzinfo=None)
             logger.info(f"📅 User provided no date, using Brazil Time: {base_date}")
 
-        # Handle Installments
-        import uuid
-        from dateutil.relativedelta import relativedelta
-        
+        # Handle Installments (exact cents, one multi-row INSERT)
         main_tx = None
         
         if installments and installments > 1:
-            group_id = uuid.uuid4()
-            
-            # Precise rounding logic
-            # floor to 2 decimal places
-            import math
-            base_installment = math.floor((amount / installments) * 100) / 100
-            
-            # Calculate total of base installments
-            total_base = base_installment * installments
-            
-            # Calculate remainder (e.g. 100 - 99.99 = 0.01)
-            remainder = round(amount - total_base, 2)
-            
-            for i in range(1, installments + 1):
-                # Calculate date: base_date + (i-1) months
-                tx_date = base_date + relativedelta(months=i-1)
-                
-                # Determine amount for this specific installment
-                current_amount = base_installment
-                
-                # Add remainder to the LAST installment
-                if i == installments:
-                    current_amount = round(current_amount + remainder, 2)
-                
-                desc_suffix = f" ({i}/{installments})"
-                full_desc = (description or "") + desc_suffix
-                
-                tx = Transaction(
-                    user_phone=str(user_phone),
-                    amount=current_amount,
-                    category=category,
-                    description=full_desc,
-                    date=tx_date,
-                    raw_message=raw_message,
-                    installments_count=installments,
-                    installment_number=i,
-                    group_id=group_id
-                )
-                self.session.add(tx)
-                if i == 1:
-                    main_tx = tx # Return the first one for reference
+            rows = plan_installments(
+                user_phone=user_phone,
+                amount=amount,
+                count=installments,
+                description=description,
+                category=category,
+                purchase_date=base_date,
+                raw_message=raw_message,
+            )
+            main_tx = (await insert_installments(self.session, rows))[0]
                     
         else:
             # Single Transaction
@@ -105,30 +91,65 @@ class TransactionRepository:
             await self.session.refresh(main_tx)
         return main_tx
 
-    async def get_stats_by_user(self, user_phone: str):
-        # Placeholder for stats logic
-        stmt = select(Transaction).where(Transaction.user_phone == user_phone)
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+    async def get_stats_by_user(self, user_phone: str) -> TransactionStats:
+        """Count, income/expense totals and date span of the user's history (one aggregate row)."""
+        stmt = select(
+            func.count(),
+            func.coalesce(func.sum(case((Transaction.type == "INCOME", Transaction.amount))), 0),
+            func.coalesce(func.sum(case((Transaction.type == "EXPENSE", Transaction.amount))), 0),
+            func.min(Transaction.date),
+            func.max(Transaction.date),
+        ).where(Transaction.user_phone == user_phone)
+        count, income, expense, first_date, last_date = (await self.session.execute(stmt)).one()
+        return TransactionStats(count, float(income), float(expense), first_date, last_date)
 
-    async def get_recent_transactions(self, user_phone: str, limit: int = 50):
+    async def get_recent_transactions(self, user_phone: str, limit: int = 50) -> list[TransactionItem]:
         """
         Fetch recent transactions for context injection.
         """
         stmt = (
-            select(Transaction)
+            select(*TRANSACTION_ITEM_COLUMNS)
             .where(Transaction.user_phone == user_phone)
             .order_by(desc(Transaction.created_at))
             .limit(limit)
         )
         result = await self.session.execute(stmt)
-        return result.scalars().all()
+        return [TransactionItem.from_row(row) for row in result]
 
-    async def get_transactions(
+    async def get_transactions_fingerprint(self, user_phone: str, limit: int = 50) -> str:
+        """
+        Cheap fingerprint of the user's transaction set: count, max(created_at) and an md5
+        of the `limit` most recent rows (so edits to analyzed rows change it too).
+        Used to key caches of LLM output derived from recent transactions.
+        """
+        result = await self.session.execute(
+            text("""
+                SELECT
+                    (SELECT COUNT(*) FROM transactions WHERE user_phone = :phone) AS total,
+                    (SELECT MAX(created_at) FROM transactions WHERE user_phone = :phone) AS last_created,
+                    (
+                        SELECT md5(string_agg(
+                            concat_ws('|', id, amount, type, category, description, date, is_cleared),
+                            ',' ORDER BY created_at DESC, id
+                        ))
+                        FROM (
+                            SELECT id, amount, type, category, description, date, is_cleared, created_at
+                            FROM transactions
+                            WHERE user_phone = :phone
+                            ORDER BY created_at DESC
+                            LIMIT :limit
+                        ) recent
+                    ) AS checksum
+            """),
+            {"phone": user_phone, "limit": limit}
+        )
+        row = result.one()
+        last_created = row.last_created.isoformat() if row.last_created else "-"
+        return f"{row.total}:{last_created}:{row.checksum or '-'}"
+
+    def filtered_query(
         self,
         user_phone: str,
-        skip: int = 0,
-        limit: int = 10,
         start_date: datetime = None,
         end_date: datetime = None,
         category: str = None,
@@ -141,13 +162,10 @@ class TransactionRepository:
         account_id: str = None
     ):
         """
-        Fetch filtered transactions with pagination.
-        And returns total count for frontend pagination.
+        Base SELECT of TRANSACTION_ITEM_COLUMNS for the user's transactions with the list/search
+        filters applied (shared by offset and keyset pagination, counts and exports).
         """
-        from sqlalchemy import func
-
-        # Base Query
-        query = select(Transaction).where(Transaction.user_phone == user_phone)
+        query = select(*TRANSACTION_ITEM_COLUMNS).where(Transaction.user_phone == user_phone)
 
         # Filters
         if start_date:
@@ -187,46 +205,129 @@ class TransactionRepository:
         if account_id:
             import uuid as _uuid
             query = query.where(Transaction.account_id == _uuid.UUID(account_id))
+        return query
+
+    async def get_transactions(self, user_phone: str, skip: int = 0, limit: int = 10, count: bool = True, **filters):
+        """
+        Fetch filtered transactions (TransactionItem) with pagination.
+        And returns total count for frontend pagination (None with count=False).
+        Offset mode: cost grows with skip, prefer get_transactions_page for deep pages.
+        """
+        query = self.filtered_query(user_phone, **filters)
 
         # Count Query (before pagination)
-        count_query = select(func.count()).select_from(query.subquery())
-        total_count = await self.session.scalar(count_query)
+        total_count = await self.count_transactions(query) if count else None
         
         # Pagination & Sorting
         query = query.order_by(desc(Transaction.date)).offset(skip).limit(limit)
         
         result = await self.session.execute(query)
-        transactions = result.scalars().all()
+        transactions = [TransactionItem.from_row(row) for row in result]
         
         return transactions, total_count
 
+    async def get_transactions_page(self, user_phone: str, limit: int = 10, cursor: str = None,
+                                    count: str = None, **filters):
+        """
+        Keyset pagination: newest first on (date, id), seeking past `cursor` instead of
+        using OFFSET, so a deep page costs the same as the first one.
+        Returns (transactions, next_cursor, total). next_cursor is None on the last page;
+        total is None unless count is "exact" (COUNT(*)) or "estimate" (planner rows).
+        Rows without a date are not listed in this mode.
+        Raises ValueError for a malformed cursor.
+        """
+        query = self.filtered_query(user_phone, **filters).where(Transaction.date.isnot(None))
+
+        total = None
+        if count == "exact":
+            total = await self.count_transactions(query)
+        elif count == "estimate":
+            total = await self.estimate_count(query)
+
+        if cursor:
+            last_date, last_id = decode_cursor(cursor)
+            # Expanded row comparison (date, id) < (last_date, last_id); the date bound is index-usable
+            query = query.where(
+                Transaction.date <= last_date,
+                or_(Transaction.date < last_date, Transaction.id < last_id)
+            )
+
+        # One extra row tells whether there is a next page
+        query = query.order_by(desc(Transaction.date), desc(Transaction.id)).limit(limit + 1)
+        result = await self.session.execute(query)
+        transactions = [TransactionItem.from_row(row) for row in result]
+
+        next_cursor = encode_cursor(transactions[limit - 1]) if len(transactions) > limit else None
+        return transactions[:limit], next_cursor, total
+
+    async def count_transactions(self, query) -> int:
+        """Exact COUNT(*) of a query built by filtered_query."""
+        return await self.session.scalar(select(func.count()).select_from(query.subquery()))
+
+    async def estimate_count(self, query) -> int:
+        """
+        Planner row estimate for a query built by filtered_query (EXPLAIN, nothing is read).
+        Constant time; close for date/category/account filters, rough for text search.
+        """
+        conn = await self.session.connection()
+        sql = query.with_only_columns(Transaction.id).compile(
+            dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+        )
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
     async def get_future_commitments(self, user_phone: str, start_date: datetime):
         """
         Aggregates future transactions by month (YYYY-MM).
         Used for the 'Mountain of Commitments' chart.
+        The rest of start_date's month is summed from transactions; later months come
+        from the monthly_category_totals rollup.
         """
-        from sqlalchemy import func
-        
-        # We cast date to YYYY-MM string for grouping
-        # SQLite vs Postgres: Postgres uses to_char. 
-        # Assuming Postgres as per requirements.
-        month_col = func.to_char(Transaction.date, 'YYYY-MM')
-        
-        stmt = (
-            select(
-                month_col.label('month'),
-                func.sum(Transaction.amount).label('total')
-            )
-            .where(
-                Transaction.user_phone == user_phone,
-                Transaction.date >= start_date
-            )
-            .group_by(month_col)
-            .order_by(month_col)
+        result = await self.session.execute(
+            text("""
+                SELECT TO_CHAR(CAST(:start AS TIMESTAMP), 'YYYY-MM') AS month, SUM(amount) AS total
+                FROM transactions
+                WHERE user_phone = :phone
+                  AND date >= CAST(:start AS TIMESTAMP)
+                  AND date < DATE_TRUNC('month', CAST(:start AS TIMESTAMP)) + INTERVAL '1 month'
+                HAVING COUNT(*) > 0
+                UNION ALL
+                SELECT TO_CHAR(month, 'YYYY-MM') AS month, SUM(total) AS total
+                FROM monthly_category_totals
+                WHERE user_phone = :phone
+                  AND month >= DATE_TRUNC('month', CAST(:start AS TIMESTAMP)) + INTERVAL '1 month'
+                GROUP BY month
+                HAVING SUM(tx_count) > 0
+                ORDER BY month
+            """),
+            {"phone": user_phone, "start": start_date}
         )
-        result = await self.session.execute(stmt)
         return result.all()
 
+    async def locate(self, tx_ids: list) -> list:
+        """
+        WHERE clauses selecting transactions by id, with their dates looked up in transaction_ids
+        (migration 024) so Postgres prunes the statement to their partitions instead of probing
+        every partition's index. Unknown ids match nothing.
+        """
+        result = await self.session.execute(select(TransactionId.date).where(TransactionId.id.in_(tx_ids)))
+        dates = set(result.scalars().all())
+        in_partitions = []
+        if dates - {None}:
+            in_partitions.append(Transaction.date.in_(dates - {None}))
+        if None in dates:
+            in_partitions.append(Transaction.date.is_(None))
+        return [Transaction.id.in_(tx_ids), or_(*in_partitions) if in_partitions else false()]
+
+    async def get_description(self, user_phone: str, tx_id) -> str | None:
+        result = await self.session.execute(
+            select(Transaction.description).where(Transaction.user_phone == user_phone, *await self.locate([tx_id]))
+        )
+        return result.scalar()
+
     async def delete_transactions(self, user_phone: str, tx_ids: list[str]):
         """
         Securely deletes one or more transactions.
@@ -235,7 +336,7 @@ class TransactionRepository:
         from sqlalchemy import delete
         stmt = delete(Transaction).where(
             Transaction.user_phone == user_phone,
-            Transaction.id.in_(tx_ids)
+            *await self.locate(tx_ids)
         )
         await self.session.execute(stmt)
         await self.session.commit()
@@ -259,7 +360,7 @@ class TransactionRepository:
             
         stmt = (
             update(Transaction)
-            .where(Transaction.user_phone == user_phone, Transaction.id == tx_id)
+            .where(Transaction.user_phone == user_phone, *await self.locate([tx_id]))
             .values(**values)
         )
         await self.session.execute(stmt)
@@ -282,7 +383,7 @@ class TransactionRepository:
             
         stmt = (
             update(Transaction)
-            .where(Transaction.user_phone == user_phone, Transaction.id.in_(tx_ids))
+            .where(Transaction.user_phone == user_phone, *await self.locate(tx_ids))
             .values(**values)
         )
         result = await self.session.execute(stmt)
@@ -0,0 +1,225 @@
+"""
+Search Filters
+Turns a natural-language transaction search into structured filters.
+Common Portuguese time/amount/type expressions are parsed locally (no LLM call);
+anything else goes to the LLM behind a single-flight guard and a Redis cache.
+"""
+import asyncio
+import calendar
+import hashlib
+import json
+import logging
+import re
+from datetime import date, datetime, timedelta
+from backend.core import clients
+from backend.core.ledger import _strip_accents
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_TTL = 86400  # the current date is part of the key, so one day is enough
+
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+# Semantic expansion for the most common category words (mirrors the LLM prompt examples)
+KEYWORD_SYNONYMS = {
+    "comida": ["comida", "alimentação", "ifood", "rappi", "mercado", "restaurante", "hortifruti", "padaria", "lanche"],
+    "alimentacao": ["alimentação", "comida", "ifood", "mercado", "restaurante", "hortifruti"],
+    "mercado": ["mercado", "supermercado", "hortifruti", "alimentação"],
+    "transporte": ["transporte", "uber", "99", "taxi", "onibus", "metrô", "combustível", "gasolina"],
+    "lazer": ["lazer", "cinema", "netflix", "spotify", "jogo", "bar", "entretenimento"],
+    "moradia": ["moradia", "aluguel", "condomínio", "água", "luz", "energia", "internet"],
+    "saude": ["saúde", "farmácia", "médico", "consulta", "exame", "plano de saúde", "academia"],
+    "assinaturas": ["assinatura", "netflix", "spotify", "prime", "disney", "youtube"],
+}
+
+TYPE_WORDS = {
+    "INCOME": {"entrada", "entradas", "receita", "receitas", "recebi", "recebimentos", "ganhos", "salario"},
+    "EXPENSE": {"gasto", "gastos", "gastei", "despesa", "despesas", "compra", "compras", "comprei", "paguei", "pagamentos"},
+    "TRANSFER": {"transferencia", "transferencias", "transferi"},
+}
+
+STOPWORDS = {
+    "de", "do", "da", "dos", "das", "em", "no", "na", "nos", "nas", "com", "para", "pra", "pro", "por",
+    "o", "a", "os", "as", "um", "uma", "e", "que", "eu", "me", "meu", "meus", "minha", "minhas",
+    "quanto", "quantos", "quais", "qual", "mostra", "mostrar", "mostre", "ver", "lista", "listar",
+    "todos", "todas", "tudo", "lancamentos", "lancamento", "transacoes", "transacao", "valor", "valores",
+    "reais", "real", "r", "total", "foi", "foram", "tive", "fiz", "sobre", "ao", "aos", "mes", "ano",
+}
+
+_NUMBER = r"(\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?)"
+_MIN_RE = re.compile(r"(?:\b(?:acima de|mais de|maior(?:es)? que|superior(?:es)? a|a partir de)\b|>=?)\s*(?:r\$\s*)?" + _NUMBER)
+_MAX_RE = re.compile(r"(?:\b(?:abaixo de|menos de|menor(?:es)? que|inferior(?:es)? a|ate)\b|<=?)\s*(?:r\$\s*)?" + _NUMBER)
+_BETWEEN_RE = re.compile(r"\bentre\s*(?:r\$\s*)?" + _NUMBER + r"\s*e\s*(?:r\$\s*)?" + _NUMBER)
+_LAST_DAYS_RE = re.compile(r"\bultimos?\s+(\d+)\s+dias\b")
+_MONTH_RE = re.compile(r"\b(" + "|".join(MONTHS) + r")\b(?:\s+(?:de\s+)?(\d{4}))?")
+
+# Maximum number of free words the local parser turns into literal keywords
+MAX_LOCAL_KEYWORDS = 2
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _to_float(raw: str) -> float:
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+(?:,\d+)?", raw):
+        raw = raw.replace(".", "")
+    return float(raw.replace(",", "."))
+
+
+def _month_range(year: int, month: int) -> tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, accent-free, single-spaced form used for parsing and cache keys."""
+    return " ".join(_strip_accents(query).lower().replace("?", " ").replace("!", " ").split())
+
+
+def parse_search_query(query: str, today: date) -> dict | None:
+    """
+    Rule-based parser for common searches ("mês passado", "janeiro", "acima de 500", "entradas").
+    Returns the same filter shape as LLMClient.analyze_search_query, or None when the query
+    needs the LLM (nothing recognized, or too many free words to trust as literal keywords).
+    """
+    text = normalize_query(query)
+    filters = {"keywords": None, "start_date": None, "end_date": None,
+               "min_amount": None, "max_amount": None, "type": None}
+    recognized = False
+
+    def consume(match):
+        nonlocal text, recognized
+        text = (text[:match.start()] + " " + text[match.end():]).strip()
+        recognized = True
+
+    # --- Amounts ---
+    m = _BETWEEN_RE.search(text)
+    if m:
+        filters["min_amount"], filters["max_amount"] = _to_float(m.group(1)), _to_float(m.group(2))
+        consume(m)
+    m = _MIN_RE.search(text)
+    if m:
+        filters["min_amount"] = _to_float(m.group(1))
+        consume(m)
+    m = _MAX_RE.search(text)
+    if m:
+        filters["max_amount"] = _to_float(m.group(1))
+        consume(m)
+
+    # --- Time expressions ---
+    start = end = None
+    for phrase, rng in (
+        ("mes passado", lambda: _month_range(*((today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)))),
+        ("mes anterior", lambda: _month_range(*((today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)))),
+        ("este mes", lambda: (today.replace(day=1), today)),
+        ("esse mes", lambda: (today.replace(day=1), today)),
+        ("neste mes", lambda: (today.replace(day=1), today)),
+        ("nesse mes", lambda: (today.replace(day=1), today)),
+        ("mes atual", lambda: (today.replace(day=1), today)),
+        ("semana passada", lambda: (today - timedelta(days=today.weekday() + 7), today - timedelta(days=today.weekday() + 1))),
+        ("esta semana", lambda: (today - timedelta(days=today.weekday()), today)),
+        ("essa semana", lambda: (today - timedelta(days=today.weekday()), today)),
+        ("ano passado", lambda: (date(today.year - 1, 1, 1), date(today.year - 1, 12, 31))),
+        ("este ano", lambda: (date(today.year, 1, 1), today)),
+        ("esse ano", lambda: (date(today.year, 1, 1), today)),
+        ("anteontem", lambda: (today - timedelta(days=2), today - timedelta(days=2))),
+        ("ontem", lambda: (today - timedelta(days=1), today - timedelta(days=1))),
+        ("hoje", lambda: (today, today)),
+    ):
+        m = re.search(r"\b" + phrase + r"\b", text)
+        if m:
+            start, end = rng()
+            consume(m)
+            break
+
+    if start is None:
+        m = _LAST_DAYS_RE.search(text)
+        if m:
+            start, end = today - timedelta(days=int(m.group(1))), today
+            consume(m)
+
+    if start is None:
+        m = _MONTH_RE.search(text)
+        if m:
+            month = MONTHS[m.group(1)]
+            year = int(m.group(2)) if m.group(2) else (today.year if month <= today.month else today.year - 1)
+            start, end = _month_range(year, month)
+            consume(m)
+
+    if start is not None:
+        filters["start_date"] = start.isoformat()
+        filters["end_date"] = f"{end.isoformat()}T23:59:59"
+
+    # --- Transaction type + free words ---
+    leftovers = []
+    for word in re.findall(r"[a-z0-9$]+", text):
+        tx_type = next((t for t, words in TYPE_WORDS.items() if word in words), None)
+        if tx_type:
+            filters["type"] = tx_type
+            recognized = True
+        elif word not in STOPWORDS and len(word) > 1:
+            leftovers.append(word)
+
+    if len(leftovers) > MAX_LOCAL_KEYWORDS:
+        return None
+    if leftovers:
+        keywords = []
+        for word in leftovers:
+            for kw in KEYWORD_SYNONYMS.get(word, [word]):
+                if kw not in keywords:
+                    keywords.append(kw)
+        filters["keywords"] = keywords
+    elif not recognized:
+        return None
+
+    return filters
+
+
+async def _cached_llm_filters(llm_client, query: str, key: str) -> dict:
+    if clients.redis_client:
+        try:
+            cached = await clients.redis_client.get(key)
+            if cached:
+                return json.loads(cached)
+        except Exception:
+            pass
+
+    filters = await llm_client.analyze_search_query(query)
+
+    # Empty dict means the LLM call failed; don't pin that for the whole day
+    if filters and clients.redis_client:
+        try:
+            await clients.redis_client.set(key, json.dumps(filters), ex=SEARCH_CACHE_TTL)
+        except Exception:
+            pass
+    return filters
+
+
+async def get_llm_search_filters(llm_client, query: str, today: date) -> dict:
+    """
+    LLM fallback for parse_search_query. Identical queries (normalized text + current date)
+    share one in-flight LLM call, and results are cached in Redis.
+    """
+    digest = hashlib.sha1(f"{today.isoformat()}|{normalize_query(query)}".encode("utf-8")).hexdigest()
+    key = f"search_filters:{digest}"
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_cached_llm_filters(llm_client, query, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one client going away must not cancel the call the others are waiting on
+    return await asyncio.shield(task)
+
+
+async def resolve_search_filters(llm_client, query: str) -> dict:
+    """Local parser first; LLM (single-flight + cached) only when needed."""
+    today = datetime.now().date()
+    filters = parse_search_query(query, today)
+    if filters is not None:
+        logger.info(f"Search filters parsed locally for '{query}'")
+        return filters
+    if not llm_client:
+        raise RuntimeError("AI Search service unavailable")
+    return await get_llm_search_filters(llm_client, query, today)
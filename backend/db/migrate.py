@@ -0,0 +1,256 @@
+"""
+Migration Runner
+Applies pending SQL files from backend/db/migrations exactly once, in filename order.
+Applied files are recorded in schema_migrations with a SHA-256 checksum; a Postgres
+advisory lock makes concurrent app workers/deploys wait instead of racing.
+
+    python -m backend.db.migrate              # apply pending migrations
+    python -m backend.db.migrate --status     # list applied / pending / changed files
+    python -m backend.db.migrate --dry-run    # show what would run
+    python -m backend.db.migrate --repair     # accept current checksums of edited files
+
+A file starting with "-- migrate:no-transaction" runs outside a transaction, one
+statement at a time (needed for CREATE INDEX CONCURRENTLY).
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import asyncpg
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+# Arbitrary app-wide key for pg_advisory_lock
+MIGRATION_LOCK_ID = 7_210_315_001
+NO_TRANSACTION_MARKER = "-- migrate:no-transaction"
+# Files from before automatic migrations (applied by hand; not idempotent).
+# On the first run they are recorded as baseline instead of executed.
+BASELINE_BEFORE = "006"
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, filename: str, sql: str):
+        self.filename = filename
+        self.sql = sql
+        self.checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        self.transactional = not sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+
+
+_DOLLAR_QUOTE = re.compile(r"\$[A-Za-z_]*\$")
+
+
+def split_statements(sql: str) -> list[str]:
+    """
+    Splits a SQL script on top-level semicolons, keeping quoted strings, $$ bodies
+    and comments intact. Postgres runs a multi-statement query string as one implicit
+    transaction, so no-transaction files have to be sent statement by statement.
+    """
+    statements, current, i, n = [], [], 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = n if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+        elif ch == "'":
+            end = i + 1
+            while end < n:
+                if sql[end] == "'" and sql[end + 1:end + 2] != "'":
+                    break
+                end += 2 if sql[end] == "'" else 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif ch == "$" and _DOLLAR_QUOTE.match(sql, i):
+            tag = _DOLLAR_QUOTE.match(sql, i).group(0)
+            end = sql.find(tag, i + len(tag))
+            end = n if end == -1 else end + len(tag)
+            current.append(sql[i:end])
+            i = end
+        elif ch == ";":
+            statements.append("".join(current))
+            current = []
+            i += 1
+        else:
+            current.append(ch)
+            i += 1
+    statements.append("".join(current))
+    return [s.strip() for s in statements if _has_code(s)]
+
+
+def _has_code(statement: str) -> bool:
+    statement = re.sub(r"/\*.*?\*/", "", statement, flags=re.S)
+    return any(line.split("--", 1)[0].strip() for line in statement.splitlines())
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".sql"):
+            with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                migrations.append(Migration(filename, f.read()))
+    return migrations
+
+
+def _dsn() -> str:
+    # asyncpg wants a plain postgresql:// URL
+    return settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def _ensure_table(conn: asyncpg.Connection, migrations: list[Migration]):
+    exists = await conn.fetchval("SELECT to_regclass('public.schema_migrations') IS NOT NULL")
+    if exists:
+        return
+    await conn.execute("""
+        CREATE TABLE schema_migrations (
+            filename TEXT PRIMARY KEY,
+            checksum VARCHAR(64) NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            execution_ms INTEGER,
+            baseline BOOLEAN NOT NULL DEFAULT FALSE
+        )
+    """)
+    baseline = [m for m in migrations if m.filename < BASELINE_BEFORE]
+    await conn.executemany(
+        "INSERT INTO schema_migrations (filename, checksum, baseline) VALUES ($1, $2, TRUE)",
+        [(m.filename, m.checksum) for m in baseline]
+    )
+    logger.info(f"📋 schema_migrations created; {len(baseline)} legacy files recorded as baseline")
+
+
+async def _applied(conn: asyncpg.Connection) -> dict[str, str]:
+    rows = await conn.fetch("SELECT filename, checksum FROM schema_migrations")
+    return {r["filename"]: r["checksum"] for r in rows}
+
+
+def _plan(migrations: list[Migration], applied: dict[str, str]) -> tuple[list[Migration], list[Migration]]:
+    """Returns (pending, changed): files never applied, and applied files edited since."""
+    pending = [m for m in migrations if m.filename not in applied]
+    changed = [m for m in migrations if m.filename in applied and applied[m.filename] != m.checksum]
+    return pending, changed
+
+
+async def _apply(conn: asyncpg.Connection, migration: Migration):
+    started = time.perf_counter()
+    record = "INSERT INTO schema_migrations (filename, checksum, execution_ms) VALUES ($1, $2, $3)"
+    if migration.transactional:
+        async with conn.transaction():
+            await conn.execute(migration.sql)
+            elapsed = int((time.perf_counter() - started) * 1000)
+            await conn.execute(record, migration.filename, migration.checksum, elapsed)
+    else:
+        for statement in split_statements(migration.sql):
+            await conn.execute(statement)
+        elapsed = int((time.perf_counter() - started) * 1000)
+        await conn.execute(record, migration.filename, migration.checksum, elapsed)
+    logger.info(f"✅ Migration applied: {migration.filename} ({elapsed}ms)")
+
+
+async def run_migrations(dsn: str = None, directory: str = MIGRATIONS_DIR,
+                         dry_run: bool = False, repair: bool = False) -> list[str]:
+    """
+    Applies pending migrations under an advisory lock and returns their filenames.
+    Raises MigrationError if an already-applied file was edited (unless repair=True,
+    which re-records the current checksums without re-running anything).
+    """
+    migrations = load_migrations(directory)
+    conn = await asyncpg.connect(dsn or _dsn())
+    try:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        try:
+            await _ensure_table(conn, migrations)
+            pending, changed = _plan(migrations, await _applied(conn))
+
+            if changed:
+                names = ", ".join(m.filename for m in changed)
+                if not repair:
+                    raise MigrationError(
+                        f"Applied migrations were modified: {names}. "
+                        "Add a new migration file instead (or run with --repair to accept the edits)."
+                    )
+                await conn.executemany(
+                    "UPDATE schema_migrations SET checksum = $2 WHERE filename = $1",
+                    [(m.filename, m.checksum) for m in changed]
+                )
+                logger.warning(f"⚠️ Checksums repaired: {names}")
+
+            if not pending:
+                logger.info("✅ Database schema up to date")
+                return []
+            if dry_run:
+                return [m.filename for m in pending]
+
+            for migration in pending:
+                try:
+                    await _apply(conn, migration)
+                except Exception as e:
+                    raise MigrationError(f"Migration {migration.filename} failed: {e}") from e
+            return [m.filename for m in pending]
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+    finally:
+        await conn.close()
+
+
+async def migration_status(dsn: str = None, directory: str = MIGRATIONS_DIR) -> list[tuple[str, str]]:
+    """Returns (filename, state) with state in applied | baseline | pending | changed."""
+    migrations = load_migrations(directory)
+    conn = await asyncpg.connect(dsn or _dsn())
+    try:
+        exists = await conn.fetchval("SELECT to_regclass('public.schema_migrations') IS NOT NULL")
+        rows = await conn.fetch("SELECT filename, checksum, baseline FROM schema_migrations") if exists else []
+    finally:
+        await conn.close()
+
+    recorded = {r["filename"]: r for r in rows}
+    status = []
+    for m in migrations:
+        row = recorded.get(m.filename)
+        if row is None:
+            state = "baseline" if not exists and m.filename < BASELINE_BEFORE else "pending"
+        elif row["checksum"] != m.checksum:
+            state = "changed"
+        else:
+            state = "baseline" if row["baseline"] else "applied"
+        status.append((m.filename, state))
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending SQL migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations and their state")
+    parser.add_argument("--dry-run", action="store_true", help="show pending migrations without applying")
+    parser.add_argument("--repair", action="store_true", help="accept checksums of edited, already-applied files")
+    parser.add_argument("--dsn", help="database URL (defaults to DATABASE_URL)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if args.status:
+        for filename, state in asyncio.run(migration_status(args.dsn)):
+            print(f"{state:<9} {filename}")
+        return
+
+    try:
+        applied = asyncio.run(run_migrations(args.dsn, dry_run=args.dry_run, repair=args.repair))
+    except MigrationError as e:
+        raise SystemExit(f"❌ {e}")
+    label = "Pending" if args.dry_run else "Applied"
+    print(f"{label}: {', '.join(applied) if applied else 'nothing'}")
+
+
+if __name__ == "__main__":
+    main()
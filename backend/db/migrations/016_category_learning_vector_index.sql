@@ -0,0 +1,43 @@
+-- Migration 016: Category learning lookups (pgvector)
+-- category_learning (002) stores one embedded description per confirmed (description, category)
+-- pair; nearest neighbours over a user's rows suggest categories without the LLM.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS category_learning (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_phone VARCHAR(50) NOT NULL,
+    original_description TEXT NOT NULL,
+    corrected_category VARCHAR(100) NOT NULL,
+    embedding vector(384),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- How many times the pair was confirmed (weights the neighbour vote)
+ALTER TABLE category_learning ADD COLUMN IF NOT EXISTS hits INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE category_learning ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_category_learning_user ON category_learning (user_phone);
+
+-- One row per pair; repeated confirmations upsert and bump hits
+CREATE UNIQUE INDEX IF NOT EXISTS uix_category_learning_pair
+    ON category_learning (user_phone, original_description, corrected_category);
+
+-- No ANN index: neighbours are searched exactly within one user's rows (CategorySuggester.suggest,
+-- through idx_category_learning_user). An HNSW index over all users' rows applies the user filter
+-- after returning ~ef_search candidates, so most users would get fewer than k neighbours.
+DROP INDEX IF EXISTS idx_category_learning_embedding_hnsw;
+
+ALTER TABLE category_learning ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'category_learning' AND policyname = 'category_learning_isolation'
+    ) THEN
+        CREATE POLICY category_learning_isolation ON category_learning
+        USING (user_phone = current_setting('app.current_user_phone', true))
+        WITH CHECK (user_phone = current_setting('app.current_user_phone', true));
+    END IF;
+END $$;
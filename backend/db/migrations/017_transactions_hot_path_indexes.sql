@@ -0,0 +1,35 @@
+-- migrate:no-transaction
+-- Migration 017: Composite and trigram indexes for the transaction hot paths
+-- Built CONCURRENTLY so writes keep flowing; the runner executes each statement on its own.
+-- A failed concurrent build leaves an INVALID index behind: drop it before re-running.
+-- Plans are checked by backend/tests/test_query_plans.py.
+
+-- Month/range totals, HUD, forecasting cashflow and the list endpoint (ORDER BY date DESC)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_user_date
+    ON transactions (user_phone, date);
+
+-- Recent transactions (context injection, dashboard feed, insights fingerprint)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_user_created
+    ON transactions (user_phone, created_at);
+
+-- Category filters, category lists and per-category totals over a period
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_user_category_date
+    ON transactions (user_phone, category, date);
+
+-- Account statements, credit invoice joins and balance recalculation
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_account
+    ON transactions (account_id);
+
+-- The ORM's single-column user_phone index is a prefix of the composites above
+DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_user_phone;
+
+-- ILIKE '%term%' search over description and category
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_description_trgm
+    ON transactions USING gin (description gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_category_trgm
+    ON transactions USING gin (category gin_trgm_ops);
+
+ANALYZE transactions;
@@ -0,0 +1,159 @@
+-- Migration 018: Monthly rollup of transactions (monthly_category_totals)
+-- One row per user/month/type/category/account type/cleared flag with the sum and count.
+-- Kept current by a row trigger, like the account balance trigger, so dashboard, budget and
+-- forecast aggregates read O(months) rows instead of scanning transactions.
+-- Verified/repaired by backend/workers/monthly_totals.py.
+
+CREATE TABLE IF NOT EXISTS monthly_category_totals (
+    user_phone VARCHAR(50) NOT NULL,
+    month DATE NOT NULL,                            -- first day of the month
+    type VARCHAR(20) NOT NULL,                      -- EXPENSE, INCOME, TRANSFER
+    category TEXT NOT NULL DEFAULT '',              -- '' = no category
+    account_type VARCHAR(50) NOT NULL DEFAULT '',   -- accounts.type of account_id; '' = no account
+    is_cleared BOOLEAN NOT NULL,
+    total DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    tx_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_phone, month, type, category, account_type, is_cleared)
+);
+
+-- Adds (p_sign = 1) or removes (p_sign = -1) one transaction from its bucket.
+-- Undated transactions have no month and are not rolled up.
+-- Takes the user's rollup lock until commit, so a rebuild of that user waits for this write.
+CREATE OR REPLACE FUNCTION monthly_totals_add(
+    p_user_phone VARCHAR, p_date TIMESTAMP, p_type VARCHAR, p_category TEXT,
+    p_account_id UUID, p_is_cleared BOOLEAN, p_amount DOUBLE PRECISION, p_sign INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    IF (p_date IS NULL) THEN
+        RETURN;
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext('monthly_category_totals'), hashtext(p_user_phone));
+
+    INSERT INTO monthly_category_totals AS m
+        (user_phone, month, type, category, account_type, is_cleared, total, tx_count)
+    VALUES (
+        p_user_phone,
+        DATE_TRUNC('month', p_date)::date,
+        COALESCE(p_type, ''),
+        COALESCE(p_category, ''),
+        COALESCE((SELECT a.type FROM accounts a WHERE a.id = p_account_id), ''),
+        COALESCE(p_is_cleared, TRUE),
+        p_sign * ROUND(COALESCE(p_amount, 0)::numeric, 2),
+        p_sign
+    )
+    ON CONFLICT (user_phone, month, type, category, account_type, is_cleared) DO UPDATE
+    SET total = m.total + EXCLUDED.total,
+        tx_count = m.tx_count + EXCLUDED.tx_count,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_monthly_totals()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Description/raw_message edits don't move money between buckets
+    IF (TG_OP = 'UPDATE') THEN
+        IF (OLD.user_phone IS NOT DISTINCT FROM NEW.user_phone
+            AND OLD.date IS NOT DISTINCT FROM NEW.date
+            AND OLD.type IS NOT DISTINCT FROM NEW.type
+            AND OLD.category IS NOT DISTINCT FROM NEW.category
+            AND OLD.account_id IS NOT DISTINCT FROM NEW.account_id
+            AND OLD.is_cleared IS NOT DISTINCT FROM NEW.is_cleared
+            AND OLD.amount IS NOT DISTINCT FROM NEW.amount) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    IF (TG_OP IN ('UPDATE', 'DELETE')) THEN
+        PERFORM monthly_totals_add(OLD.user_phone, OLD.date, OLD.type, OLD.category,
+                                   OLD.account_id, OLD.is_cleared, OLD.amount, -1);
+    END IF;
+    IF (TG_OP IN ('INSERT', 'UPDATE')) THEN
+        PERFORM monthly_totals_add(NEW.user_phone, NEW.date, NEW.type, NEW.category,
+                                   NEW.account_id, NEW.is_cleared, NEW.amount, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recomputes the rollup from transactions for one user (or everyone when NULL).
+-- No concurrent change may be missed or counted twice: the full rebuild blocks all transaction
+-- writes meanwhile, a user's rebuild takes that user's rollup lock (see monthly_totals_add), so
+-- only that user's writes wait.
+CREATE OR REPLACE FUNCTION rebuild_monthly_totals(p_user_phone VARCHAR DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    inserted INTEGER;
+BEGIN
+    IF (p_user_phone IS NULL) THEN
+        LOCK TABLE transactions IN SHARE MODE;
+    ELSE
+        PERFORM pg_advisory_xact_lock(hashtext('monthly_category_totals'), hashtext(p_user_phone));
+    END IF;
+
+    DELETE FROM monthly_category_totals
+    WHERE p_user_phone IS NULL OR user_phone = p_user_phone;
+
+    INSERT INTO monthly_category_totals
+        (user_phone, month, type, category, account_type, is_cleared, total, tx_count)
+    SELECT t.user_phone,
+           DATE_TRUNC('month', t.date)::date,
+           COALESCE(t.type, ''),
+           COALESCE(t.category, ''),
+           COALESCE(a.type, ''),
+           COALESCE(t.is_cleared, TRUE),
+           SUM(ROUND(COALESCE(t.amount, 0)::numeric, 2)),
+           COUNT(*)
+    FROM transactions t
+    LEFT JOIN accounts a ON a.id = t.account_id
+    WHERE t.date IS NOT NULL
+      AND (p_user_phone IS NULL OR t.user_phone = p_user_phone)
+    GROUP BY 1, 2, 3, 4, 5, 6;
+
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+    RETURN inserted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Buckets carry the account type, so retyping an account re-buckets its owner's rollup
+CREATE OR REPLACE FUNCTION rebuild_monthly_totals_on_account_type()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM rebuild_monthly_totals(NEW.user_phone);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_monthly_category_totals ON transactions;
+
+CREATE TRIGGER trg_monthly_category_totals
+AFTER INSERT OR UPDATE OR DELETE ON transactions
+FOR EACH ROW
+EXECUTE FUNCTION update_monthly_totals();
+
+DROP TRIGGER IF EXISTS trg_monthly_totals_account_type ON accounts;
+
+CREATE TRIGGER trg_monthly_totals_account_type
+AFTER UPDATE OF type ON accounts
+FOR EACH ROW
+WHEN (OLD.type IS DISTINCT FROM NEW.type)
+EXECUTE FUNCTION rebuild_monthly_totals_on_account_type();
+
+ALTER TABLE monthly_category_totals ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'monthly_category_totals' AND policyname = 'monthly_category_totals_isolation'
+    ) THEN
+        CREATE POLICY monthly_category_totals_isolation ON monthly_category_totals
+        USING (user_phone = current_setting('app.current_user_phone', true))
+        WITH CHECK (user_phone = current_setting('app.current_user_phone', true));
+    END IF;
+END $$;
+
+-- Backfill (same transaction as the trigger, so nothing written meanwhile is lost)
+SELECT rebuild_monthly_totals();
@@ -0,0 +1,99 @@
+-- Migration 019: Per-user data version for response caches
+-- Every write to a table the dashboard reads bumps the owner's version in the same
+-- transaction, so caches keyed by (user, version) never serve data older than a commit.
+-- See backend/core/data_version.py.
+
+CREATE TABLE IF NOT EXISTS user_data_versions (
+    user_phone VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION bump_data_version(p_user_phone VARCHAR)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO user_data_versions AS v (user_phone, version)
+    VALUES (p_user_phone, 1)
+    ON CONFLICT (user_phone) DO UPDATE
+    SET version = v.version + 1,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level: a multi-row write (installment plans, bulk deletes) bumps each owner once.
+-- Transition tables only exist for their own event, so each branch reads only its own.
+CREATE OR REPLACE FUNCTION bump_data_version_on_write()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'INSERT') THEN
+        INSERT INTO user_data_versions AS v (user_phone, version)
+        SELECT DISTINCT user_phone, 1 FROM new_rows WHERE user_phone IS NOT NULL
+        ORDER BY user_phone
+        ON CONFLICT (user_phone) DO UPDATE
+        SET version = v.version + 1,
+            updated_at = CURRENT_TIMESTAMP;
+
+    ELSIF (TG_OP = 'DELETE') THEN
+        INSERT INTO user_data_versions AS v (user_phone, version)
+        SELECT DISTINCT user_phone, 1 FROM old_rows WHERE user_phone IS NOT NULL
+        ORDER BY user_phone
+        ON CONFLICT (user_phone) DO UPDATE
+        SET version = v.version + 1,
+            updated_at = CURRENT_TIMESTAMP;
+
+    ELSIF (TG_OP = 'UPDATE') THEN
+        -- A row moved to another user changes both users' data
+        INSERT INTO user_data_versions AS v (user_phone, version)
+        SELECT owners.user_phone, 1 FROM (
+            SELECT user_phone FROM old_rows
+            UNION
+            SELECT user_phone FROM new_rows
+        ) owners
+        WHERE owners.user_phone IS NOT NULL
+        ORDER BY owners.user_phone
+        ON CONFLICT (user_phone) DO UPDATE
+        SET version = v.version + 1,
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One trigger per event and table. Missing tables are skipped (test databases that only apply
+-- the recent migrations have no assets-era tables).
+DO $$
+DECLARE
+    target TEXT;
+    op TEXT;
+BEGIN
+    FOREACH target IN ARRAY ARRAY['transactions', 'accounts', 'budgets', 'user_profiles', 'investment_snapshots'] LOOP
+        CONTINUE WHEN to_regclass(target) IS NULL;
+        -- The row-level trigger this migration used to create
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_data_version ON %I', target);
+        FOREACH op IN ARRAY ARRAY['insert', 'update', 'delete'] LOOP
+            EXECUTE format('DROP TRIGGER IF EXISTS trg_data_version_%s ON %I', op, target);
+            EXECUTE format(
+                'CREATE TRIGGER trg_data_version_%s AFTER %s ON %I REFERENCING %s FOR EACH STATEMENT '
+                'EXECUTE FUNCTION bump_data_version_on_write()',
+                op, upper(op), target,
+                CASE op WHEN 'insert' THEN 'NEW TABLE AS new_rows'
+                        WHEN 'delete' THEN 'OLD TABLE AS old_rows'
+                        ELSE 'OLD TABLE AS old_rows NEW TABLE AS new_rows' END
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
+ALTER TABLE user_data_versions ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'user_data_versions' AND policyname = 'user_data_versions_isolation'
+    ) THEN
+        CREATE POLICY user_data_versions_isolation ON user_data_versions
+        USING (user_phone = current_setting('app.current_user_phone', true))
+        WITH CHECK (user_phone = current_setting('app.current_user_phone', true));
+    END IF;
+END $$;
@@ -0,0 +1,120 @@
+-- Migration 020: Statement-level account balance triggers (transition tables)
+-- The row trigger from 006/012 ran one or two UPDATE accounts per transaction row, so a
+-- 24-installment purchase or a 500-row bulk delete re-locked the same account hundreds of times.
+-- These triggers see all rows of the statement at once, sum the deltas per account and apply
+-- one UPDATE per affected account. Same rules as 012: only cleared transactions count.
+-- Postgres allows transition tables only on single-event triggers, hence one trigger per event.
+
+CREATE OR REPLACE FUNCTION apply_account_balance_deltas()
+RETURNS TRIGGER AS $$
+DECLARE
+    rec RECORD;
+BEGIN
+    -- Accounts are updated in id order so concurrent statements lock them in the same order
+    IF (TG_OP = 'INSERT') THEN
+        FOR rec IN
+            SELECT account_id, SUM(delta) AS delta
+            FROM (
+                SELECT n.account_id,
+                       CASE WHEN n.type = 'INCOME' THEN n.amount
+                            WHEN n.type IN ('EXPENSE', 'TRANSFER') THEN -n.amount END AS delta
+                FROM new_rows n WHERE n.is_cleared = TRUE
+                UNION ALL
+                SELECT n.destination_account_id, n.amount
+                FROM new_rows n WHERE n.is_cleared = TRUE AND n.type = 'TRANSFER'
+            ) movements
+            WHERE account_id IS NOT NULL AND delta IS NOT NULL
+            GROUP BY account_id
+            ORDER BY account_id
+        LOOP
+            UPDATE accounts SET current_balance = current_balance + rec.delta WHERE id = rec.account_id;
+        END LOOP;
+
+    ELSIF (TG_OP = 'DELETE') THEN
+        FOR rec IN
+            SELECT account_id, SUM(delta) AS delta
+            FROM (
+                SELECT o.account_id,
+                       CASE WHEN o.type = 'INCOME' THEN -o.amount
+                            WHEN o.type IN ('EXPENSE', 'TRANSFER') THEN o.amount END AS delta
+                FROM old_rows o WHERE o.is_cleared = TRUE
+                UNION ALL
+                SELECT o.destination_account_id, -o.amount
+                FROM old_rows o WHERE o.is_cleared = TRUE AND o.type = 'TRANSFER'
+            ) movements
+            WHERE account_id IS NOT NULL AND delta IS NOT NULL
+            GROUP BY account_id
+            ORDER BY account_id
+        LOOP
+            UPDATE accounts SET current_balance = current_balance + rec.delta WHERE id = rec.account_id;
+        END LOOP;
+
+    ELSIF (TG_OP = 'UPDATE') THEN
+        -- Reverse the old effect and apply the new one, only for rows whose balance inputs
+        -- changed (description/category edits touch no account)
+        FOR rec IN
+            WITH changed AS (
+                SELECT o.account_id AS old_account_id, o.destination_account_id AS old_destination_id,
+                       o.type AS old_type, o.amount AS old_amount, o.is_cleared AS old_cleared,
+                       n.account_id AS new_account_id, n.destination_account_id AS new_destination_id,
+                       n.type AS new_type, n.amount AS new_amount, n.is_cleared AS new_cleared
+                FROM old_rows o
+                JOIN new_rows n ON n.id = o.id
+                WHERE (o.amount, o.account_id, o.type, o.destination_account_id, o.is_cleared)
+                      IS DISTINCT FROM (n.amount, n.account_id, n.type, n.destination_account_id, n.is_cleared)
+            )
+            SELECT account_id, SUM(delta) AS delta
+            FROM (
+                SELECT old_account_id AS account_id,
+                       CASE WHEN old_type = 'INCOME' THEN -old_amount
+                            WHEN old_type IN ('EXPENSE', 'TRANSFER') THEN old_amount END AS delta
+                FROM changed WHERE old_cleared = TRUE
+                UNION ALL
+                SELECT old_destination_id, -old_amount
+                FROM changed WHERE old_cleared = TRUE AND old_type = 'TRANSFER'
+                UNION ALL
+                SELECT new_account_id,
+                       CASE WHEN new_type = 'INCOME' THEN new_amount
+                            WHEN new_type IN ('EXPENSE', 'TRANSFER') THEN -new_amount END
+                FROM changed WHERE new_cleared = TRUE
+                UNION ALL
+                SELECT new_destination_id, new_amount
+                FROM changed WHERE new_cleared = TRUE AND new_type = 'TRANSFER'
+            ) movements
+            WHERE account_id IS NOT NULL AND delta IS NOT NULL
+            GROUP BY account_id
+            ORDER BY account_id
+        LOOP
+            UPDATE accounts SET current_balance = current_balance + rec.delta WHERE id = rec.account_id;
+        END LOOP;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Replace the row trigger (both in one migration transaction: no write sees neither or both)
+DROP TRIGGER IF EXISTS trg_update_balance ON transactions;
+DROP TRIGGER IF EXISTS trg_update_balance_insert ON transactions;
+DROP TRIGGER IF EXISTS trg_update_balance_update ON transactions;
+DROP TRIGGER IF EXISTS trg_update_balance_delete ON transactions;
+
+CREATE TRIGGER trg_update_balance_insert
+AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_account_balance_deltas();
+
+CREATE TRIGGER trg_update_balance_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_account_balance_deltas();
+
+CREATE TRIGGER trg_update_balance_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_account_balance_deltas();
+
+DROP FUNCTION IF EXISTS update_account_balance();
@@ -0,0 +1,55 @@
+-- Migration 021: Stored, indexed accent-insensitive account names
+-- accounts.normalized_name = normalize_account_name(name), kept by a trigger. Name lookups in
+-- LedgerService compare against normalize_account_name(:input), so the normalization is defined
+-- only here. Unique per (user_phone, type); trigram index for partial matches.
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- unaccent() is only STABLE (it depends on search_path); naming the dictionary makes it safe to
+-- declare IMMUTABLE, which indexes need
+CREATE OR REPLACE FUNCTION normalize_account_name(p_name TEXT)
+RETURNS TEXT AS $$
+    SELECT btrim(public.unaccent('public.unaccent'::regdictionary, lower(p_name)));
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+ALTER TABLE accounts ADD COLUMN IF NOT EXISTS normalized_name TEXT;
+
+CREATE OR REPLACE FUNCTION set_account_normalized_name()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.normalized_name := normalize_account_name(NEW.name);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_account_normalized_name ON accounts;
+
+CREATE TRIGGER trg_account_normalized_name
+BEFORE INSERT OR UPDATE OF name, normalized_name ON accounts
+FOR EACH ROW
+EXECUTE FUNCTION set_account_normalized_name();
+
+-- Names that only differ by accents/case within a user and type ('Itaú' / 'itau') can't share
+-- the unique index: keep the active/oldest one and suffix the others ('Itau (2)')
+WITH ranked AS (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY user_phone, type, normalize_account_name(name)
+        ORDER BY is_active DESC, created_at, id
+    ) AS rn
+    FROM accounts
+)
+UPDATE accounts a
+SET name = a.name || ' (' || r.rn || ')'
+FROM ranked r
+WHERE r.id = a.id AND r.rn > 1;
+
+UPDATE accounts
+SET normalized_name = normalize_account_name(name)
+WHERE normalized_name IS DISTINCT FROM normalize_account_name(name);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uix_accounts_user_type_normalized_name
+ON accounts (user_phone, type, normalized_name);
+
+CREATE INDEX IF NOT EXISTS idx_accounts_normalized_name_trgm
+ON accounts USING gin (normalized_name gin_trgm_ops);
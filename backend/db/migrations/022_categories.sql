@@ -0,0 +1,173 @@
+-- Migration 022: Per-user categories table
+-- One row per category a user has: used by transactions or created in settings/WhatsApp.
+-- Replaces SELECT DISTINCT category over the user's whole history and the JSON list in
+-- user_profiles.custom_categories (kept, no longer read). Statement-level triggers keep
+-- usage_count/last_used_at current on every transaction write, like the balance triggers (020).
+-- Rows only go away through the category endpoints, so a category survives its last transaction.
+
+CREATE TABLE IF NOT EXISTS categories (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_phone VARCHAR NOT NULL,
+    name VARCHAR NOT NULL,
+    normalized_name TEXT,
+    usage_count INTEGER NOT NULL DEFAULT 0,
+    last_used_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uix_categories_user_name ON categories (user_phone, name);
+CREATE INDEX IF NOT EXISTS idx_categories_user_normalized_name ON categories (user_phone, normalized_name);
+
+-- Same folding as account names (021): 'alimentação' finds 'Alimentação'
+CREATE OR REPLACE FUNCTION set_category_normalized_name()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.normalized_name := normalize_account_name(NEW.name);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_category_normalized_name ON categories;
+
+CREATE TRIGGER trg_category_normalized_name
+BEFORE INSERT OR UPDATE OF name, normalized_name ON categories
+FOR EACH ROW
+EXECUTE FUNCTION set_category_normalized_name();
+
+-- Adds (p_sign = 1) or removes (p_sign = -1) uses per (user, category). Rows are upserted in
+-- (user_phone, name) order so concurrent statements lock them in the same order.
+CREATE OR REPLACE FUNCTION categories_add_usage(p_uses JSONB, p_sign INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF (p_sign > 0) THEN
+        INSERT INTO categories AS c (user_phone, name, usage_count, last_used_at)
+        SELECT u.user_phone, u.category, u.uses, CURRENT_TIMESTAMP
+        FROM jsonb_to_recordset(p_uses) AS u(user_phone VARCHAR, category VARCHAR, uses INTEGER)
+        ORDER BY u.user_phone, u.category
+        ON CONFLICT (user_phone, name) DO UPDATE
+        SET usage_count = c.usage_count + EXCLUDED.usage_count,
+            last_used_at = EXCLUDED.last_used_at;
+    ELSE
+        UPDATE categories c
+        SET usage_count = GREATEST(c.usage_count - u.uses, 0)
+        FROM jsonb_to_recordset(p_uses) AS u(user_phone VARCHAR, category VARCHAR, uses INTEGER)
+        WHERE c.user_phone = u.user_phone AND c.name = u.category;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables only exist for their own event, so each branch reads only its own
+CREATE OR REPLACE FUNCTION apply_category_usage()
+RETURNS TRIGGER AS $$
+DECLARE
+    added JSONB;
+    removed JSONB;
+BEGIN
+    IF (TG_OP = 'INSERT') THEN
+        SELECT jsonb_agg(u) INTO added FROM (
+            SELECT user_phone, category, COUNT(*) AS uses
+            FROM new_rows WHERE category IS NOT NULL
+            GROUP BY user_phone, category
+        ) u;
+
+    ELSIF (TG_OP = 'DELETE') THEN
+        SELECT jsonb_agg(u) INTO removed FROM (
+            SELECT user_phone, category, COUNT(*) AS uses
+            FROM old_rows WHERE category IS NOT NULL
+            GROUP BY user_phone, category
+        ) u;
+
+    ELSIF (TG_OP = 'UPDATE') THEN
+        -- Only rows whose owner or category changed move usage (amount/date edits don't)
+        SELECT jsonb_agg(u) INTO removed FROM (
+            SELECT o.user_phone, o.category, COUNT(*) AS uses
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE o.category IS NOT NULL
+              AND (n.user_phone, n.category) IS DISTINCT FROM (o.user_phone, o.category)
+            GROUP BY o.user_phone, o.category
+        ) u;
+        SELECT jsonb_agg(u) INTO added FROM (
+            SELECT n.user_phone, n.category, COUNT(*) AS uses
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.category IS NOT NULL
+              AND (n.user_phone, n.category) IS DISTINCT FROM (o.user_phone, o.category)
+            GROUP BY n.user_phone, n.category
+        ) u;
+    END IF;
+
+    IF (removed IS NOT NULL) THEN
+        PERFORM categories_add_usage(removed, -1);
+    END IF;
+    IF (added IS NOT NULL) THEN
+        PERFORM categories_add_usage(added, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_category_usage_insert ON transactions;
+DROP TRIGGER IF EXISTS trg_category_usage_update ON transactions;
+DROP TRIGGER IF EXISTS trg_category_usage_delete ON transactions;
+
+CREATE TRIGGER trg_category_usage_insert
+AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_category_usage();
+
+CREATE TRIGGER trg_category_usage_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_category_usage();
+
+CREATE TRIGGER trg_category_usage_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_category_usage();
+
+ALTER TABLE categories ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'categories' AND policyname = 'categories_isolation'
+    ) THEN
+        CREATE POLICY categories_isolation ON categories
+        USING (user_phone = current_setting('app.current_user_phone', true))
+        WITH CHECK (user_phone = current_setting('app.current_user_phone', true));
+    END IF;
+END $$;
+
+-- Backfill from transactions (same transaction as the triggers, so nothing written meanwhile is lost)
+INSERT INTO categories AS c (user_phone, name, usage_count, last_used_at)
+SELECT user_phone, category, COUNT(*), MAX(COALESCE(created_at, date))
+FROM transactions
+WHERE category IS NOT NULL
+GROUP BY user_phone, category
+ON CONFLICT (user_phone, name) DO UPDATE
+SET usage_count = EXCLUDED.usage_count,
+    last_used_at = EXCLUDED.last_used_at;
+
+-- ...and from the JSON lists of categories created without transactions (malformed lists are skipped)
+DO $$
+DECLARE
+    profile RECORD;
+BEGIN
+    FOR profile IN
+        SELECT user_phone, custom_categories FROM user_profiles
+        WHERE custom_categories IS NOT NULL AND custom_categories <> ''
+    LOOP
+        BEGIN
+            INSERT INTO categories (user_phone, name)
+            SELECT DISTINCT profile.user_phone, btrim(value)
+            FROM json_array_elements_text(profile.custom_categories::json) AS value
+            WHERE btrim(value) <> ''
+            ON CONFLICT (user_phone, name) DO NOTHING;
+        EXCEPTION WHEN others THEN
+            RAISE NOTICE 'Skipping custom_categories of %: %', profile.user_phone, SQLERRM;
+        END;
+    END LOOP;
+END $$;
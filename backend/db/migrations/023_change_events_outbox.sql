@@ -0,0 +1,105 @@
+-- Migration 023: Transactional outbox of change events
+-- Statement-level triggers on the user-data tables write one outbox row per (table, user, operation)
+-- of each statement, inside the writing transaction: every write path (ORM, raw SQL, other
+-- triggers) is covered and an event exists if and only if its change committed.
+-- backend/workers/outbox_dispatcher.py publishes the rows to a Redis stream and deletes them;
+-- cache consumers subscribe through backend/core/events.py.
+
+CREATE TABLE IF NOT EXISTS change_events_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    topic VARCHAR(50) NOT NULL,        -- table name: transactions, accounts, ...
+    user_phone VARCHAR(50) NOT NULL,
+    operation VARCHAR(10) NOT NULL,    -- INSERT, UPDATE, DELETE
+    row_count INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- TG_ARGV: columns whose changes alone are not events (balances moved by the balance triggers,
+-- category usage moved by the category triggers), so derived updates don't flood consumers.
+-- Transition tables only exist for their own event, so each branch reads only its own.
+CREATE OR REPLACE FUNCTION emit_change_events()
+RETURNS TRIGGER AS $$
+DECLARE
+    -- TG_ARGV is NULL, not empty, for a trigger without arguments
+    ignored TEXT[] := COALESCE(TG_ARGV, '{}');
+BEGIN
+    IF (TG_OP = 'INSERT') THEN
+        INSERT INTO change_events_outbox (topic, user_phone, operation, row_count)
+        SELECT TG_TABLE_NAME, user_phone, TG_OP, COUNT(*)
+        FROM new_rows WHERE user_phone IS NOT NULL
+        GROUP BY user_phone;
+
+    ELSIF (TG_OP = 'DELETE') THEN
+        INSERT INTO change_events_outbox (topic, user_phone, operation, row_count)
+        SELECT TG_TABLE_NAME, user_phone, TG_OP, COUNT(*)
+        FROM old_rows WHERE user_phone IS NOT NULL
+        GROUP BY user_phone;
+
+    ELSIF (TG_OP = 'UPDATE') THEN
+        -- A row moved to another user is an event for both
+        INSERT INTO change_events_outbox (topic, user_phone, operation, row_count)
+        SELECT TG_TABLE_NAME, owner, TG_OP, COUNT(*)
+        FROM (
+            SELECT to_jsonb(o) AS old_doc, to_jsonb(n) AS new_doc
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+        ) pairs
+        CROSS JOIN LATERAL (VALUES
+            (old_doc ->> 'user_phone'),
+            (NULLIF(new_doc ->> 'user_phone', old_doc ->> 'user_phone'))
+        ) owners(owner)
+        WHERE owner IS NOT NULL
+          AND (old_doc - ignored) IS DISTINCT FROM (new_doc - ignored)
+        GROUP BY owner;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One trigger per event and table. Missing tables are skipped (test databases that only apply
+-- the recent migrations have no assets table).
+DO $$
+DECLARE
+    target RECORD;
+    op TEXT;
+BEGIN
+    FOR target IN
+        SELECT * FROM (VALUES
+            ('transactions', ''),
+            ('accounts', '''current_balance'', ''updated_at'''),
+            ('budgets', ''),
+            ('goals', ''),
+            ('categories', '''usage_count'', ''last_used_at'''),
+            ('assets', ''),
+            ('user_profiles', '''updated_at''')
+        ) AS t(table_name, ignored_columns)
+        WHERE to_regclass(t.table_name) IS NOT NULL
+    LOOP
+        FOREACH op IN ARRAY ARRAY['insert', 'update', 'delete'] LOOP
+            EXECUTE format('DROP TRIGGER IF EXISTS trg_change_events_%s ON %I', op, target.table_name);
+            EXECUTE format(
+                'CREATE TRIGGER trg_change_events_%s AFTER %s ON %I REFERENCING %s FOR EACH STATEMENT '
+                'EXECUTE FUNCTION emit_change_events(%s)',
+                op, upper(op), target.table_name,
+                CASE op WHEN 'insert' THEN 'NEW TABLE AS new_rows'
+                        WHEN 'delete' THEN 'OLD TABLE AS old_rows'
+                        ELSE 'OLD TABLE AS old_rows NEW TABLE AS new_rows' END,
+                target.ignored_columns
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
+ALTER TABLE change_events_outbox ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'change_events_outbox' AND policyname = 'change_events_outbox_isolation'
+    ) THEN
+        CREATE POLICY change_events_outbox_isolation ON change_events_outbox
+        USING (user_phone = current_setting('app.current_user_phone', true))
+        WITH CHECK (user_phone = current_setting('app.current_user_phone', true));
+    END IF;
+END $$;
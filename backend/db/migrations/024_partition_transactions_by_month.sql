@@ -0,0 +1,324 @@
+-- Migration 024: Monthly range partitions of transactions on `date`
+-- Month-to-date, last-months and future-commitment queries only scan the partitions of their
+-- range, so recent months stay fast as the history grows. ensure_transaction_partitions() keeps
+-- TRANSACTION_PARTITION_MONTHS_AHEAD months ready (backend/workers/transaction_partitions.py);
+-- undated rows and dates outside the existing partitions land in transactions_default.
+-- The existing table is copied into the partitioned one with its constraints, grants, RLS
+-- policies, indexes (017) and triggers (018-023) recreated on the parent.
+--
+-- Trade-off: a partitioned table's unique keys must include the partition key, so the primary
+-- key on id becomes UNIQUE (id, date), and a lookup by id alone probes every partition's index
+-- (history plus the months ahead). transaction_ids (id PRIMARY KEY, date) keeps id unique and
+-- gives by-id paths the row's date first, so their statement only touches its partition
+-- (TransactionRepository.locate).
+
+-- Partitions are built detached and attached afterwards: ATTACH takes SHARE UPDATE EXCLUSIVE on
+-- transactions (concurrent reads and writes continue), CREATE TABLE ... PARTITION OF would block them.
+CREATE OR REPLACE FUNCTION create_transaction_partition(p_month DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    month_start DATE := date_trunc('month', p_month)::date;
+    month_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::date;
+    partition_name TEXT := 'transactions_p' || to_char(p_month, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE transactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+
+    -- ATTACH fails while the default partition holds rows of the month: move them first, with
+    -- the row triggers off, since they never leave transactions (balances, rollups and versions stay put)
+    IF EXISTS (SELECT 1 FROM transactions_default WHERE date >= month_start AND date < month_end) THEN
+        ALTER TABLE transactions_default DISABLE TRIGGER USER;
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM transactions_default WHERE date >= $1 AND date < $2 RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved', partition_name
+        ) USING month_start, month_end;
+        ALTER TABLE transactions_default ENABLE TRIGGER USER;
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE transactions ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, month_start, month_end
+    );
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitions from the current month to p_months_ahead months ahead (installments create rows
+-- years ahead), plus every month with dated rows in the default partition. Returns how many were created.
+CREATE OR REPLACE FUNCTION ensure_transaction_partitions(p_months_ahead INTEGER DEFAULT 36)
+RETURNS INTEGER AS $$
+DECLARE
+    target_month DATE;
+    created INTEGER := 0;
+BEGIN
+    -- Concurrent callers (app processes, the CLI) would race on the same partition names
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_transaction_partitions'));
+    FOR target_month IN
+        SELECT generate_series(
+            date_trunc('month', now()),
+            date_trunc('month', now()) + make_interval(months => p_months_ahead),
+            INTERVAL '1 month'
+        )::date
+        UNION
+        SELECT DISTINCT date_trunc('month', date)::date FROM transactions_default WHERE date IS NOT NULL
+        ORDER BY 1
+    LOOP
+        IF create_transaction_partition(target_month) THEN
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Convert the plain table once (tables created by create_all on a new database included)
+DO $$
+DECLARE
+    item RECORD;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'transactions'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE;
+    ALTER TABLE transactions RENAME TO transactions_unpartitioned;
+
+    -- Index names are schema-wide: free them for the partitioned indexes created below
+    FOR item IN
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'transactions_unpartitioned'::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = i.indexrelid)
+    LOOP
+        EXECUTE format('DROP INDEX %I', item.relname);
+    END LOOP;
+
+    CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE (date);
+    CREATE TABLE transactions_default PARTITION OF transactions DEFAULT;
+
+    -- A partition per month with data, then the copy (no triggers on the new table yet:
+    -- balances, rollups, categories and versions already account for these rows)
+    PERFORM create_transaction_partition(month)
+    FROM (SELECT DISTINCT date_trunc('month', date)::date AS month
+          FROM transactions_unpartitioned WHERE date IS NOT NULL) months;
+    INSERT INTO transactions SELECT * FROM transactions_unpartitioned;
+
+    -- Unique keys of a partitioned table must contain the partition key; ids are uuid4 either way
+    ALTER TABLE transactions ADD CONSTRAINT transactions_id_date_key UNIQUE (id, date);
+
+    FOR item IN
+        SELECT conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = 'transactions_unpartitioned'::regclass AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE transactions ADD CONSTRAINT %I %s', item.conname, item.definition);
+    END LOOP;
+
+    FOR item IN
+        SELECT privilege_type, grantee
+        FROM information_schema.role_table_grants
+        WHERE table_schema = current_schema() AND table_name = 'transactions_unpartitioned'
+    LOOP
+        EXECUTE format(
+            'GRANT %s ON transactions TO %s', item.privilege_type,
+            CASE WHEN item.grantee = 'PUBLIC' THEN 'PUBLIC' ELSE quote_ident(item.grantee) END
+        );
+    END LOOP;
+
+    -- Policies on the parent apply to every partition read or written through transactions
+    IF (SELECT relrowsecurity FROM pg_class WHERE oid = 'transactions_unpartitioned'::regclass) THEN
+        ALTER TABLE transactions ENABLE ROW LEVEL SECURITY;
+    END IF;
+    IF (SELECT relforcerowsecurity FROM pg_class WHERE oid = 'transactions_unpartitioned'::regclass) THEN
+        ALTER TABLE transactions FORCE ROW LEVEL SECURITY;
+    END IF;
+    FOR item IN
+        SELECT * FROM pg_policies
+        WHERE schemaname = current_schema() AND tablename = 'transactions_unpartitioned'
+    LOOP
+        EXECUTE format(
+            'CREATE POLICY %I ON transactions AS %s FOR %s TO %s%s%s',
+            item.policyname, item.permissive, item.cmd,
+            (SELECT string_agg(CASE WHEN r = 'public' THEN 'PUBLIC' ELSE quote_ident(r) END, ', ')
+             FROM unnest(item.roles::text[]) r),
+            COALESCE(' USING (' || item.qual || ')', ''),
+            COALESCE(' WITH CHECK (' || item.with_check || ')', '')
+        );
+    END LOOP;
+
+    DROP TABLE transactions_unpartitioned;
+END $$;
+
+SELECT ensure_transaction_partitions();
+
+-- Indexes of 017, built on every partition (CONCURRENTLY is not supported on partitioned tables)
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_phone, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_created ON transactions (user_phone, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_category_date ON transactions (user_phone, category, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions (account_id);
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_transactions_description_trgm ON transactions USING gin (description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_trgm ON transactions USING gin (category gin_trgm_ops);
+
+-- id -> date of every transaction, kept by the statement triggers below. Its primary key is the
+-- id uniqueness transactions can no longer enforce: a duplicate id fails the writing statement.
+CREATE TABLE IF NOT EXISTS transaction_ids (
+    id UUID PRIMARY KEY,
+    date TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION sync_transaction_ids()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'INSERT') THEN
+        INSERT INTO transaction_ids (id, date) SELECT id, date FROM new_rows;
+
+    ELSIF (TG_OP = 'DELETE') THEN
+        DELETE FROM transaction_ids t USING old_rows o WHERE t.id = o.id;
+
+    ELSIF (TG_OP = 'UPDATE') THEN
+        -- Only rows whose id or date changed (moved between partitions or renumbered)
+        DELETE FROM transaction_ids t
+        USING old_rows o
+        WHERE t.id = o.id AND NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.id = o.id);
+        UPDATE transaction_ids t SET date = n.date
+        FROM new_rows n
+        WHERE t.id = n.id AND t.date IS DISTINCT FROM n.date;
+        INSERT INTO transaction_ids (id, date)
+        SELECT n.id, n.date FROM new_rows n
+        WHERE NOT EXISTS (SELECT 1 FROM old_rows o WHERE o.id = n.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill (same transaction as the triggers; ids duplicated before 024 keep their first date)
+INSERT INTO transaction_ids (id, date)
+SELECT DISTINCT ON (id) id, date FROM transactions ORDER BY id, date
+ON CONFLICT (id) DO NOTHING;
+
+DROP TRIGGER IF EXISTS trg_transaction_ids_insert ON transactions;
+DROP TRIGGER IF EXISTS trg_transaction_ids_update ON transactions;
+DROP TRIGGER IF EXISTS trg_transaction_ids_delete ON transactions;
+
+CREATE TRIGGER trg_transaction_ids_insert
+AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_transaction_ids();
+
+CREATE TRIGGER trg_transaction_ids_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_transaction_ids();
+
+CREATE TRIGGER trg_transaction_ids_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION sync_transaction_ids();
+
+-- Triggers of 018-023 on the parent: row triggers are cloned to every partition, statement
+-- triggers fire once per statement on transactions with the rows of all partitions
+DROP TRIGGER IF EXISTS trg_update_balance_insert ON transactions;
+DROP TRIGGER IF EXISTS trg_update_balance_update ON transactions;
+DROP TRIGGER IF EXISTS trg_update_balance_delete ON transactions;
+
+CREATE TRIGGER trg_update_balance_insert
+AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_account_balance_deltas();
+
+CREATE TRIGGER trg_update_balance_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_account_balance_deltas();
+
+CREATE TRIGGER trg_update_balance_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_account_balance_deltas();
+
+DROP TRIGGER IF EXISTS trg_monthly_category_totals ON transactions;
+
+CREATE TRIGGER trg_monthly_category_totals
+AFTER INSERT OR UPDATE OR DELETE ON transactions
+FOR EACH ROW
+EXECUTE FUNCTION update_monthly_totals();
+
+DROP TRIGGER IF EXISTS trg_data_version_insert ON transactions;
+DROP TRIGGER IF EXISTS trg_data_version_update ON transactions;
+DROP TRIGGER IF EXISTS trg_data_version_delete ON transactions;
+
+CREATE TRIGGER trg_data_version_insert
+AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_data_version_on_write();
+
+CREATE TRIGGER trg_data_version_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_data_version_on_write();
+
+CREATE TRIGGER trg_data_version_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_data_version_on_write();
+
+DROP TRIGGER IF EXISTS trg_category_usage_insert ON transactions;
+DROP TRIGGER IF EXISTS trg_category_usage_update ON transactions;
+DROP TRIGGER IF EXISTS trg_category_usage_delete ON transactions;
+
+CREATE TRIGGER trg_category_usage_insert
+AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_category_usage();
+
+CREATE TRIGGER trg_category_usage_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_category_usage();
+
+CREATE TRIGGER trg_category_usage_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_category_usage();
+
+DROP TRIGGER IF EXISTS trg_change_events_insert ON transactions;
+DROP TRIGGER IF EXISTS trg_change_events_update ON transactions;
+DROP TRIGGER IF EXISTS trg_change_events_delete ON transactions;
+
+CREATE TRIGGER trg_change_events_insert
+AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION emit_change_events();
+
+CREATE TRIGGER trg_change_events_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION emit_change_events();
+
+CREATE TRIGGER trg_change_events_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION emit_change_events();
+
+ANALYZE transactions;
@@ -0,0 +1,7 @@
+-- Migration 025: Card invoice due dates on transactions
+-- Card purchases (single or installments) keep their purchase date in date, so month-to-date totals
+-- (monthly_category_totals, the HUD) count them when they were made; due_date is the due date of
+-- the invoice each row is billed on, from the account's closing_day/due_day (backend/core/installments.py).
+-- NULL for rows outside card accounts with a due_day and for rows written before this migration.
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS due_date TIMESTAMP;
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime, Integer, Boolean, Text
+from sqlalchemy import Column, String, Float, DateTime, Integer, Boolean, Text, Index, FetchedValue, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
@@ -24,18 +24,30 @@ class Account(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # normalize_account_name(name), set by trigger (migration 021): accent/case-insensitive lookups
+    normalized_name = Column(Text, server_default=FetchedValue(), server_onupdate=FetchedValue())
+
+    __table_args__ = (
+        Index("uix_accounts_user_type_normalized_name", "user_phone", "type", "normalized_name", unique=True),
+    )
+
 class Transaction(Base):
     __tablename__ = "transactions"
 
+    # The ORM's identity. In the database (migration 024) the key is UNIQUE (id, date), since
+    # partitioned tables can't have a key without the partition key; id uniqueness is enforced by
+    # transaction_ids, and by-id statements go through TransactionRepository.locate to be pruned.
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_phone = Column(String, index=True, nullable=False)
+    user_phone = Column(String, nullable=False) # Indexed through the composites below
     account_id = Column(UUID(as_uuid=True), nullable=True) # ForeignKey would be better but keeping simple for now
     destination_account_id = Column(UUID(as_uuid=True), nullable=True) # For transfers
     type = Column(String, default="EXPENSE") # EXPENSE, INCOME, TRANSFER
     amount = Column(Float, nullable=True)
     category = Column(String, nullable=True)
     description = Column(String, nullable=True)
-    date = Column(DateTime, nullable=True)
+    date = Column(DateTime, nullable=True) # Partition key (migration 024); undated rows go to transactions_default
+    # Due date of the card invoice the row is billed on (migration 025); date stays the purchase date
+    due_date = Column(DateTime, nullable=True)
     raw_message = Column(String, nullable=True)
     
     # Installments logic
@@ -46,6 +58,22 @@ class Transaction(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Partitioned by month on date in the database (migration 024, which also recreates these).
+    # Hot-path indexes (migration 017 adds them to existing databases, plus the trigram ones)
+    __table_args__ = (
+        Index("idx_transactions_user_date", "user_phone", "date"),
+        Index("idx_transactions_user_created", "user_phone", "created_at"),
+        Index("idx_transactions_user_category_date", "user_phone", "category", "date"),
+        Index("idx_transactions_account", "account_id"),
+    )
+
+class TransactionId(Base):
+    """id -> date of every transaction (migration 024, kept by triggers): finds a row's partition."""
+    __tablename__ = "transaction_ids"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    date = Column(DateTime, nullable=True)
+
 from sqlalchemy import UniqueConstraint
 
 class Budget(Base):
@@ -83,6 +111,25 @@ class UserProfile(Base):
     monthly_income = Column(Float, default=0.0)
     income_mode = Column(String, default='manual')  # 'manual' or 'auto'
     onboarding_completed = Column(Integer, default=0) # 0: No, 1: Yes
-    custom_categories = Column(Text, nullable=True)  # JSON array of user-created category names
+    custom_categories = Column(Text, nullable=True)  # Legacy JSON list, copied into categories by migration 022; no longer read
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Category(Base):
+    __tablename__ = "categories"
+
+    # Server defaults too: the transaction triggers insert rows directly
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
+    user_phone = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    # normalize_account_name(name), set by trigger (migration 022)
+    normalized_name = Column(Text, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    # Kept by the transaction triggers (migration 022): transactions using it, last time one did
+    usage_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_used_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=text("CURRENT_TIMESTAMP"))
+
+    __table_args__ = (
+        Index("uix_categories_user_name", "user_phone", "name", unique=True),
+        Index("idx_categories_user_normalized_name", "user_phone", "normalized_name"),
+    )
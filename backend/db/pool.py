@@ -0,0 +1,118 @@
+"""
+Connection Pool Instrumentation
+Engine factory with per-role pool sizing and in-process pool metrics
+(checkout wait time, in-use, overflow, timeouts), served by GET /health/db.
+"""
+import logging
+import time
+from collections import deque
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+# Recent checkout waits kept for percentiles
+WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+    """Counters for one engine's pool. Everything runs on the event loop thread."""
+
+    def __init__(self, role: str):
+        self.role = role
+        self.pool_class = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+
+    def record_wait(self, wait_ms: float):
+        self.checkouts += 1
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        self._waits.append(wait_ms)
+
+    def snapshot(self, pool) -> dict:
+        waits = sorted(self._waits)
+        result = {
+            "role": self.role,
+            "pool": self.pool_class,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "avg_wait_ms": round(self.wait_ms_total / self.checkouts, 2) if self.checkouts else 0.0,
+            "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+            "max_wait_ms": round(self.wait_ms_max, 2),
+        }
+        if hasattr(pool, "checkedout"):
+            result.update({
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # Negative while the base pool isn't full yet
+                "overflow": pool.overflow(),
+            })
+        return result
+
+
+class _InstrumentedMixin:
+    metrics: PoolMetrics  # set per role by build_engine (class attribute, survives pool.recreate())
+
+    def connect(self):
+        # Time the whole checkout: queue wait, new connection and pre-ping
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            logger.warning(f"⚠️ DB pool '{self.metrics.role}' checkout timed out ({self.status()})")
+            raise
+        self.metrics.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+
+def build_engine(url: str, role: str, pool_size: int, max_overflow: int, pool_timeout: float,
+                 pool_recycle: int, pgbouncer: bool = False, **kwargs) -> AsyncEngine:
+    """
+    Creates an async engine whose pool reports PoolMetrics under `role`.
+    pgbouncer=True targets PgBouncer in transaction mode: statement caches off,
+    unique prepared statement names, and no app-side pool (PgBouncer is the pool).
+    """
+    base = NullPool if pgbouncer else AsyncAdaptedQueuePool
+    metrics = PoolMetrics(role)
+    metrics.pool_class = base.__name__
+    pool_class = type(f"Instrumented{base.__name__}", (_InstrumentedMixin, base), {"metrics": metrics})
+
+    options = dict(poolclass=pool_class, pool_pre_ping=True, **kwargs)
+    if pgbouncer:
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    else:
+        options.update(pool_size=pool_size, max_overflow=max_overflow,
+                       pool_timeout=pool_timeout, pool_recycle=pool_recycle)
+
+    engine = create_async_engine(url, **options)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(engine.sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    return engine
+
+
+def pool_snapshot(engine: AsyncEngine) -> dict:
+    pool = engine.sync_engine.pool
+    return pool.metrics.snapshot(pool)
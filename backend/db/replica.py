@@ -0,0 +1,164 @@
+"""
+Read Replica Routing
+Read-only endpoints (HUD, summary, cashflow, forecast, investment performance, exports) take
+their sessions from here: on the streaming replica (DATABASE_REPLICA_URL) so heavy reads don't
+hold connections the WhatsApp write path needs, otherwise on the primary. The primary is used
+when no replica is configured, while the replica lags more than REPLICA_MAX_LAG_SECONDS, and
+for REPLICA_STICKY_SECONDS after the user's own committed write (read-your-writes).
+"""
+import asyncio
+import logging
+import time
+from typing import Callable
+from fastapi import Depends
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core import clients
+from backend.core.auth import get_current_user
+from backend.core.config import settings
+from backend.db import session as db_session
+from backend.db.session import RLSSession, background_engine, engine, user_session
+
+logger = logging.getLogger(__name__)
+
+# Replay lag in seconds; 0 when the replica has replayed everything it received. NULL when its WAL
+# receiver isn't streaming: it receives nothing new, so "replayed everything" says nothing about
+# freshness. (Without pg_read_all_stats the status column reads NULL; the row still means running.)
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE status IS NULL OR status = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+_WRITE_VERBS = ("INSERT", "UPDATE", "DELETE")
+
+# user_phone -> time.monotonic() until which this process keeps the user's reads on the primary
+_recent_writes: dict[str, float] = {}
+# (checked_at, lag_seconds) of the last replica lag check
+_lag = (0.0, float("inf"))
+_lag_lock = asyncio.Lock()
+
+
+def _sticky_key(user_phone: str) -> str:
+    return f"rw:{user_phone}"
+
+
+def note_write(user_phone: str):
+    """Keeps the user's reads on the primary for REPLICA_STICKY_SECONDS, in every process (via Redis)."""
+    now = time.monotonic()
+    _recent_writes[user_phone] = now + settings.REPLICA_STICKY_SECONDS
+    if len(_recent_writes) > 10000:
+        for phone in [p for p, until in _recent_writes.items() if until <= now]:
+            del _recent_writes[phone]
+
+    if clients.redis_client:
+        async def _share():
+            try:
+                await clients.redis_client.set(
+                    _sticky_key(user_phone), "1", px=int(settings.REPLICA_STICKY_SECONDS * 1000)
+                )
+            except Exception as e:
+                logger.warning(f"Read-your-writes marker failed for {user_phone}: {e}")
+        try:
+            asyncio.get_running_loop().create_task(_share())
+        except RuntimeError:
+            pass  # no event loop (sync scripts): the local marker is enough
+
+
+async def recently_wrote(user_phone: str) -> bool:
+    if _recent_writes.get(user_phone, 0) > time.monotonic():
+        return True
+    if clients.redis_client:
+        try:
+            return bool(await clients.redis_client.exists(_sticky_key(user_phone)))
+        except Exception as e:
+            logger.warning(f"Read-your-writes check failed for {user_phone}: {e}")
+    return False
+
+
+async def replica_lag() -> float:
+    """
+    Replica replay lag in seconds, checked at most every REPLICA_LAG_CHECK_SECONDS
+    (inf if unreachable or not streaming from the primary).
+    """
+    global _lag
+    if time.monotonic() - _lag[0] < settings.REPLICA_LAG_CHECK_SECONDS:
+        return _lag[1]
+    async with _lag_lock:
+        if time.monotonic() - _lag[0] < settings.REPLICA_LAG_CHECK_SECONDS:
+            return _lag[1]
+        try:
+            async with db_session.replica_engine.connect() as conn:
+                lag = await conn.scalar(text(LAG_SQL))
+            lag = float("inf") if lag is None else float(lag)
+        except Exception as e:
+            logger.warning(f"⚠️ Replica lag check failed, reading from the primary: {e}")
+            lag = float("inf")
+        if lag > settings.REPLICA_MAX_LAG_SECONDS and _lag[1] <= settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning(f"⚠️ Replica lag {lag:.1f}s above {settings.REPLICA_MAX_LAG_SECONDS}s, reading from the primary")
+        _lag = (time.monotonic(), lag)
+        return lag
+
+
+async def use_replica(user_phone: str) -> bool:
+    if db_session.ReplicaSessionLocal is None:
+        return False
+    if await recently_wrote(user_phone):
+        return False
+    return await replica_lag() <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+async def read_session_factory(user_phone: str) -> Callable[[], AsyncSession]:
+    """
+    Zero-argument factory of user-bound sessions for the user's reads: replica or primary,
+    decided once so concurrent queries of one response (e.g. the HUD fan-out) read the same database.
+    """
+    if await use_replica(user_phone):
+        return lambda: db_session.ReplicaSessionLocal(info={"user_phone": user_phone})
+    return lambda: user_session(user_phone)
+
+
+async def get_user_read_sessions(current_user_phone: str = Depends(get_current_user)) -> Callable[[], AsyncSession]:
+    """Dependency form of read_session_factory, for endpoints that open several sessions."""
+    return await read_session_factory(current_user_phone)
+
+
+async def get_user_read_db(current_user_phone: str = Depends(get_current_user)):
+    """get_user_db for read-only endpoints (nothing they run may write)."""
+    new_session = await read_session_factory(current_user_phone)
+    async with new_session() as session:
+        yield session
+
+
+# --- Write tracking on the primary pools -------------------------------------------------------
+# A user-bound transaction that sent INSERT/UPDATE/DELETE marks its user on COMMIT.
+
+@event.listens_for(RLSSession, "after_begin")
+def _tag_connection_user(session, transaction, connection):
+    connection.info["rls_user"] = session.info.get("user_phone")
+
+
+def _track_writes(sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in _WRITE_VERBS:
+            conn.info["wrote"] = True
+
+    @event.listens_for(sync_engine, "commit")
+    def _on_commit(conn):
+        user_phone = conn.info.pop("rls_user", None)
+        if conn.info.pop("wrote", False) and user_phone:
+            note_write(user_phone)
+
+    @event.listens_for(sync_engine, "rollback")
+    def _on_rollback(conn):
+        conn.info.pop("rls_user", None)
+        conn.info.pop("wrote", None)
+
+
+_track_writes(engine.sync_engine)
+_track_writes(background_engine.sync_engine)
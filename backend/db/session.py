@@ -1,18 +1,116 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+from contextlib import asynccontextmanager
+from fastapi import Depends
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from sqlalchemy.orm import DeclarativeBase, Session
+from backend.core.auth import get_current_user
 from backend.core.config import settings
+from backend.db.pool import build_engine
 
 # Ensure the database URL uses the async driver
 DATABASE_URL = settings.DATABASE_URL
 if DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-engine = create_async_engine(DATABASE_URL, echo=False)
-AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+# Request handlers
+engine = build_engine(
+    DATABASE_URL, "api",
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pgbouncer=settings.DB_PGBOUNCER,
+    echo=False,
+)
+# Fire-and-forget jobs (snapshots, market updates, insights refresh, category learning)
+# get their own small pool so they can't starve request handlers.
+background_engine = build_engine(
+    DATABASE_URL, "background",
+    pool_size=settings.DB_WORKER_POOL_SIZE,
+    max_overflow=settings.DB_WORKER_MAX_OVERFLOW,
+    pool_timeout=settings.DB_WORKER_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pgbouncer=settings.DB_PGBOUNCER,
+    echo=False,
+)
+
+# Read-only endpoints (see backend/db/replica.py); None when no replica is configured
+REPLICA_URL = settings.DATABASE_REPLICA_URL
+if REPLICA_URL and REPLICA_URL.startswith("postgresql://"):
+    REPLICA_URL = REPLICA_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+replica_engine = build_engine(
+    REPLICA_URL, "replica",
+    pool_size=settings.DB_REPLICA_POOL_SIZE,
+    max_overflow=settings.DB_REPLICA_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pgbouncer=settings.DB_PGBOUNCER,
+    echo=False,
+) if REPLICA_URL else None
+
+
+class RLSSession(Session):
+    """
+    Sync session behind AsyncSessionLocal. When info["user_phone"] is set, every
+    transaction it opens is bound to that user for RLS (see _bind_rls_user).
+    """
+
+
+@event.listens_for(RLSSession, "after_begin")
+def _bind_rls_user(session, transaction, connection):
+    # Transaction-scoped (SET LOCAL semantics): issued right after BEGIN on the same
+    # connection and gone at COMMIT/ROLLBACK, so it never leaks to the next pool user.
+    # Re-runs for each new transaction, so commit-then-query code stays bound.
+    user_phone = session.info.get("user_phone")
+    if user_phone:
+        connection.execute(
+            text("SELECT set_config('app.current_user_phone', :phone, true)"),
+            {"phone": user_phone}
+        )
+
+
+AsyncSessionLocal = async_sessionmaker(
+    engine, expire_on_commit=False, class_=AsyncSession, sync_session_class=RLSSession
+)
+BackgroundSessionLocal = async_sessionmaker(
+    background_engine, expire_on_commit=False, class_=AsyncSession, sync_session_class=RLSSession
+)
+ReplicaSessionLocal = async_sessionmaker(
+    replica_engine, expire_on_commit=False, class_=AsyncSession, sync_session_class=RLSSession
+) if replica_engine else None
 
 class Base(DeclarativeBase):
     pass
 
+def user_session(user_phone: str) -> AsyncSession:
+    """Session whose transactions run as user_phone under RLS. Use as `async with user_session(phone) as session:`."""
+    return AsyncSessionLocal(info={"user_phone": user_phone})
+
+def background_session(user_phone: str = None) -> AsyncSession:
+    """Like user_session, but on the background pool (for asyncio.create_task jobs and CLIs)."""
+    return BackgroundSessionLocal(info={"user_phone": user_phone} if user_phone else {})
+
+@asynccontextmanager
+async def job_lock(name: str):
+    """
+    `async with job_lock("name") as acquired:` for periodic jobs that every app process schedules.
+    acquired is True in the one process holding the advisory lock (transaction-scoped, on its own
+    background connection until the block exits) and False in the others, which skip the cycle.
+    """
+    async with background_session() as session:
+        acquired = await session.scalar(
+            text("SELECT pg_try_advisory_xact_lock(hashtext(:name))"), {"name": name}
+        )
+        try:
+            yield acquired
+        finally:
+            await session.rollback()
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+async def get_user_db(current_user_phone: str = Depends(get_current_user)):
+    """Request session bound to the authenticated user (replaces per-endpoint set_config calls)."""
+    async with user_session(current_user_phone) as session:
+        yield session
@@ -12,7 +12,9 @@ import asyncio
 import logging
 from datetime import datetime
 from sqlalchemy import text
-from backend.db.session import AsyncSessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.read_models import Holding
+from backend.db.session import background_session
 
 logger = logging.getLogger(__name__)
 
@@ -482,7 +484,7 @@ async def update_market_data(tickers: list[str], asset_types: dict[str, str] | N
     if asset_types is None:
         asset_types = {}
 
-    async with AsyncSessionLocal() as session:
+    async with background_session() as session:
         tasks = {
             t: fetch_stock_price(t, asset_types.get(t, "STOCK"))
             for t in tickers
@@ -521,73 +523,68 @@ async def update_market_data(tickers: list[str], asset_types: dict[str, str] | N
 # Portfolio value calculation
 # ---------------------------------------------------------------------------
 
-async def get_user_portfolio_value(user_phone: str) -> dict:
+async def get_user_portfolio_value(session: AsyncSession, user_phone: str) -> dict:
     """
     Calculates total portfolio value by multiplying local quantities
     by public prices. The multiplication happens LOCALLY.
+    The session must be bound to the user (get_user_db / user_session).
     """
-    async with AsyncSessionLocal() as session:
-        await session.execute(
-            text("SELECT set_config('app.current_user_phone', :phone, false)"),
-            {"phone": user_phone}
-        )
-
-        result = await session.execute(
-            text("""
-                SELECT a.id, a.ticker, a.name, a.type, a.quantity, a.avg_price,
-                       COALESCE(m.price, 0) as current_price,
-                       m.change_pct,
-                       m.dividend_yield
-                FROM assets a
-                LEFT JOIN market_data m ON a.ticker = m.ticker
-                WHERE a.user_phone = :phone
-            """),
-            {"phone": user_phone}
-        )
+    result = await session.execute(
+        text("""
+            SELECT a.id, a.ticker, a.name, a.type, a.quantity, a.avg_price,
+                   COALESCE(m.price, 0) as current_price,
+                   m.change_pct,
+                   m.dividend_yield
+            FROM assets a
+            LEFT JOIN market_data m ON a.ticker = m.ticker
+            WHERE a.user_phone = :phone
+        """),
+        {"phone": user_phone}
+    )
 
-        rows = result.fetchall()
-
-        # Refresh stale prices in background (tickers with no price data)
-        missing = [r.ticker for r in rows if float(r.current_price) == 0]
-        if missing:
-            type_map = {r.ticker: r.type for r in rows}
-            asyncio.create_task(update_market_data(missing, type_map))
-
-        holdings = []
-        total_value = 0
-        total_cost = 0
-
-        for row in rows:
-            current_value = float(row.quantity) * float(row.current_price)
-            cost_basis = float(row.quantity) * float(row.avg_price)
-            gain_loss = current_value - cost_basis
-            gain_pct = ((current_value / cost_basis) - 1) * 100 if cost_basis > 0 else 0
-
-            total_value += current_value
-            total_cost += cost_basis
-
-            holdings.append({
-                "id": str(row.id),
-                "ticker": row.ticker,
-                "name": row.name,
-                "type": row.type,
-                "quantity": float(row.quantity),
-                "avg_price": float(row.avg_price),
-                "current_price": float(row.current_price),
-                "current_value": round(current_value, 2),
-                "gain_loss": round(gain_loss, 2),
-                "gain_pct": round(gain_pct, 2),
-                "change_pct": float(row.change_pct) if row.change_pct else None,
-                "dividend_yield": float(row.dividend_yield) if row.dividend_yield else None,
-            })
-
-        total_gain = total_value - total_cost
-        total_gain_pct = ((total_value / total_cost) - 1) * 100 if total_cost > 0 else 0
+    rows = result.fetchall()
+
+    # Refresh stale prices in background (tickers with no price data)
+    missing = [r.ticker for r in rows if float(r.current_price) == 0]
+    if missing:
+        type_map = {r.ticker: r.type for r in rows}
+        asyncio.create_task(update_market_data(missing, type_map))
+
+    holdings = []
+    total_value = 0
+    total_cost = 0
+
+    for row in rows:
+        current_value = float(row.quantity) * float(row.current_price)
+        cost_basis = float(row.quantity) * float(row.avg_price)
+        gain_loss = current_value - cost_basis
+        gain_pct = ((current_value / cost_basis) - 1) * 100 if cost_basis > 0 else 0
+
+        total_value += current_value
+        total_cost += cost_basis
+
+        holdings.append(Holding(
+            id=row.id,
+            ticker=row.ticker,
+            name=row.name,
+            type=row.type,
+            quantity=float(row.quantity),
+            avg_price=float(row.avg_price),
+            current_price=float(row.current_price),
+            current_value=round(current_value, 2),
+            gain_loss=round(gain_loss, 2),
+            gain_pct=round(gain_pct, 2),
+            change_pct=float(row.change_pct) if row.change_pct else None,
+            dividend_yield=float(row.dividend_yield) if row.dividend_yield else None,
+        ))
+
+    total_gain = total_value - total_cost
+    total_gain_pct = ((total_value / total_cost) - 1) * 100 if total_cost > 0 else 0
 
-        return {
-            "holdings": holdings,
-            "total_value": round(total_value, 2),
-            "total_cost": round(total_cost, 2),
-            "total_gain": round(total_gain, 2),
-            "total_gain_pct": round(total_gain_pct, 2),
-        }
+    return {
+        "holdings": holdings,
+        "total_value": round(total_value, 2),
+        "total_cost": round(total_cost, 2),
+        "total_gain": round(total_gain, 2),
+        "total_gain_pct": round(total_gain_pct, 2),
+    }
@@ -3,11 +3,15 @@ from backend.core.config import settings
 from backend.core.whatsapp import WhatsAppClient
 from backend.core.llm import LLMClient
 from backend.core.audio import AudioTranscriber
-from backend.db.session import engine, Base, get_db
+from backend.core.categorizer import CategoryEmbedder, CategorySuggester, suggest_simple_transaction
+from backend.core.categories import add_category, find_category, ranked_categories
+from backend.db.session import engine, background_engine, replica_engine, Base, get_db
+from backend.db.pool import pool_snapshot
+from backend.db.migrate import run_migrations
 from backend.core.repository import TransactionRepository
 from backend.workers.benchmark_fetcher import fetch_all_benchmarks
+from backend.workers.category_learning import learn_from_transaction
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
 from contextlib import asynccontextmanager
 import asyncio
 import hashlib
@@ -20,7 +24,6 @@ import tempfile
 from datetime import datetime
 import unicodedata
 from uuid import UUID
-from backend.core.ledger import _strip_accents
 
 # Shared Clients
 from backend.core import clients
@@ -53,110 +56,44 @@ async def lifespan(app: FastAPI):
     clients.audio_transcriber = AudioTranscriber(model_size="large-v3", device="cpu", compute_type="int8")
     logger.info("✅ Whisper Model Loaded.")
 
+    # Initialize category embedder (small CPU sentence model for pgvector suggestions)
+    logger.info("⏳ Loading category embedding model...")
+    clients.category_embedder = CategoryEmbedder()
+    logger.info("✅ Category embedder ready." if clients.category_embedder.available else "⚠️ Category embedder disabled.")
+
     # Create tables on startup
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
-    # Apply balance trigger migration (idempotent - safe to run multiple times)
-    migration_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "006_fix_balance_trigger_with_update.sql")
-    if os.path.exists(migration_path):
-        async with engine.begin() as conn:
-            with open(migration_path, "r") as f:
-                sql = f.read()
-            # asyncpg requires single-statement execution; use raw connection
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ Balance trigger migration applied (006)")
-
-    # Recalculate all account balances (idempotent - fixes any drift)
-    migration_007_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "007_recalculate_all_balances.sql")
-    if os.path.exists(migration_007_path):
-        async with engine.begin() as conn:
-            with open(migration_007_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ Balance recalculation migration applied (007)")
-
-    # Add unique constraint on (user_phone, name, type) to allow same name for different account types
-    migration_008_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "008_unique_account_name_per_type.sql")
-    if os.path.exists(migration_008_path):
-        async with engine.begin() as conn:
-            with open(migration_008_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ Account name uniqueness per type migration applied (008)")
-
-    # Apply investment performance history tables migration
-    migration_009_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "009_investment_performance_history.sql")
-    if os.path.exists(migration_009_path):
-        async with engine.begin() as conn:
-            with open(migration_009_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ Investment performance history migration applied (009)")
-
-    # Add is_active column to accounts (soft delete support)
-    migration_010_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "010_add_is_active_to_accounts.sql")
-    if os.path.exists(migration_010_path):
-        async with engine.begin() as conn:
-            with open(migration_010_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ is_active column migration applied (010)")
-
-    # Add purchased_at column to assets table
-    migration_011_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "011_add_purchased_at_to_assets.sql")
-    if os.path.exists(migration_011_path):
-        async with engine.begin() as conn:
-            with open(migration_011_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ purchased_at column migration applied (011)")
-
-    # Only cleared transactions affect balance (is_cleared = FALSE means pending/unpaid)
-    migration_012_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "012_is_cleared_affects_balance.sql")
-    if os.path.exists(migration_012_path):
-        async with engine.begin() as conn:
-            with open(migration_012_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ is_cleared balance logic migration applied (012)")
-
-    # Add custom_categories column to user_profiles
-    migration_013_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "013_add_custom_categories_to_profiles.sql")
-    if os.path.exists(migration_013_path):
-        async with engine.begin() as conn:
-            with open(migration_013_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ custom_categories column migration applied (013)")
-
-    # Add is_default column to accounts
-    migration_014_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "014_add_is_default_to_accounts.sql")
-    if os.path.exists(migration_014_path):
-        async with engine.begin() as conn:
-            with open(migration_014_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ is_default column migration applied (014)")
-
-    # Add income_mode column to user_profiles
-    migration_015_path = os.path.join(os.path.dirname(__file__), "db", "migrations", "015_add_income_mode_to_profiles.sql")
-    if os.path.exists(migration_015_path):
-        async with engine.begin() as conn:
-            with open(migration_015_path, "r") as f:
-                sql = f.read()
-            raw = await conn.get_raw_connection()
-            await raw.driver_connection.execute(sql)
-            logger.info("✅ income_mode column migration applied (015)")
+    # Apply pending SQL migrations once each (tracked in schema_migrations, advisory-locked).
+    # Deploys can run `python -m backend.db.migrate` instead and set RUN_MIGRATIONS_ON_STARTUP=false.
+    if settings.RUN_MIGRATIONS_ON_STARTUP:
+        applied = await run_migrations()
+        if applied:
+            logger.info(f"✅ Migrations applied: {', '.join(applied)}")
+
+    # Check the monthly rollup against transactions periodically (rebuilds drifted users)
+    if settings.MONTHLY_TOTALS_CHECK_INTERVAL_MINUTES > 0:
+        from backend.workers.monthly_totals import run_monthly_totals_checks
+        asyncio.create_task(run_monthly_totals_checks())
+
+    # Balances are maintained by the balance triggers alone (migration 020); check them for drift periodically
+    if settings.BALANCE_DRIFT_INTERVAL_MINUTES > 0:
+        from backend.workers.balance_drift import run_balance_drift_checks
+        asyncio.create_task(run_balance_drift_checks())
+
+    # Monthly transaction partitions (migration 024): keep future months ready for installments
+    if settings.PARTITION_MAINTENANCE_INTERVAL_HOURS > 0:
+        from backend.workers.transaction_partitions import run_partition_maintenance
+        asyncio.create_task(run_partition_maintenance())
+
+    # Change events (migration 023): publish the outbox to Redis and feed this process's cache handlers
+    from backend.core import account_directory  # noqa: F401 (subscribes its cache invalidation)
+    from backend.core.events import run_event_consumer
+    asyncio.create_task(run_event_consumer())
+    if settings.OUTBOX_DISPATCH_INTERVAL_SECONDS > 0:
+        from backend.workers.outbox_dispatcher import run_outbox_dispatcher
+        asyncio.create_task(run_outbox_dispatcher())
 
     # Populate benchmark history in background (idempotent - only inserts missing dates)
     asyncio.create_task(fetch_all_benchmarks())
@@ -171,10 +108,15 @@ async def lifespan(app: FastAPI):
     # Close Redis
     if clients.redis_client:
         await clients.redis_client.close()
+    await engine.dispose()
+    await background_engine.dispose()
+    if replica_engine:
+        await replica_engine.dispose()
 
 from fastapi.middleware.cors import CORSMiddleware
+from backend.api.responses import CompressionMiddleware, FastJSONResponse
 
-app = FastAPI(title="Cortex Brasil", version="0.1.0", lifespan=lifespan)
+app = FastAPI(title="Cortex Brasil", version="0.1.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 
 @app.middleware("http")
@@ -192,6 +134,13 @@ origins = [
     "https://cortex-brasil.vercel.app",
 ]
 
+# Inside CORS: preflights and CORS headers are unaffected by compression
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.GZIP_MIN_BYTES,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -218,6 +167,15 @@ async def root():
 async def health_check():
     return {"status": "ok"}
 
+
+@app.get("/health/db")
+async def db_pool_health():
+    """Connection pool metrics per role: checkout wait, in use, overflow, timeouts."""
+    snapshot = {"api": pool_snapshot(engine), "background": pool_snapshot(background_engine)}
+    if replica_engine:
+        snapshot["replica"] = pool_snapshot(replica_engine)
+    return snapshot
+
 @app.get("/webhook")
 async def verify_webhook(request: Request):
     """
@@ -358,7 +316,7 @@ async def _send_account_disambiguation(phone: str, accounts: list, message_id: s
 
 async def _confirm_and_save(phone: str, conv_state: dict, message_id: str):
     """Persiste a transação pendente e atualiza estado."""
-    from backend.db.session import AsyncSessionLocal
+    from backend.db.session import user_session
     from backend.core.ledger import LedgerService
 
     data = conv_state.get("pending_tx", {})
@@ -368,8 +326,7 @@ async def _confirm_and_save(phone: str, conv_state: dict, message_id: str):
         return
 
     try:
-        async with AsyncSessionLocal() as session:
-            await session.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": phone})
+        async with user_session(phone) as session:
             ledger = LedgerService(session)
             tx = await ledger.register_transaction(
                 user_phone=phone,
@@ -386,6 +343,10 @@ async def _confirm_and_save(phone: str, conv_state: dict, message_id: str):
             tx_id = str(tx.id) if tx else None
             logger.info(f"✅ Transação salva para {phone}: {tx_id}")
 
+        # Aprende o par descrição → categoria confirmado (fora do caminho da resposta)
+        if data.get("type") != "TRANSFER":
+            asyncio.create_task(learn_from_transaction(phone, data.get("description"), data.get("category")))
+
         # Atualiza estado: limpa pending, guarda last_tx_id
         new_state = {"state": None, "last_tx_id": tx_id}
         await _set_conv_state(phone, new_state, ttl=600)
@@ -410,7 +371,7 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
         logger.info(f"🔄 Processando mensagem em background: {message_body}")
 
         from backend.core.ledger import LedgerService
-        from backend.db.session import AsyncSessionLocal
+        from backend.db.session import user_session
 
         # --- 1. Verificar estado da conversa ---
         conv_state = await _get_conv_state(phone_number)
@@ -441,24 +402,12 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
                 # Para categoria, usar o texto literal do usuário (capitalizado) sem passar pelo LLM
                 if field == "category":
                     new_category = message_body.strip().capitalize()
-                    pending_tx["category"] = new_category
-                    async with AsyncSessionLocal() as cat_session:
-                        await cat_session.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": phone_number})
-                        from backend.db.models import UserProfile as _UP2, Transaction as _TX2
-                        from sqlalchemy import select as _sel2
-                        tx_cats_res2 = await cat_session.execute(
-                            _sel2(_TX2.category).where(_TX2.user_phone == phone_number, _TX2.category.isnot(None)).distinct()
-                        )
-                        existing_cats2 = {r[0] for r in tx_cats_res2.fetchall() if r[0]}
-                        prof_res2 = await cat_session.execute(_sel2(_UP2.custom_categories).where(_UP2.user_phone == phone_number))
-                        prof_cats_raw2 = prof_res2.scalar_one_or_none()
-                        if prof_cats_raw2:
-                            try:
-                                existing_cats2 |= set(json.loads(prof_cats_raw2))
-                            except Exception:
-                                pass
-
-                    if new_category not in existing_cats2:
+                    async with user_session(phone_number) as cat_session:
+                        # "alimentacao" vira a categoria existente "Alimentação"
+                        existing_category = await find_category(cat_session, phone_number, new_category)
+                    pending_tx["category"] = existing_category or new_category
+
+                    if not existing_category:
                         new_state = {
                             "state": "pending_category",
                             "suggested_category": new_category,
@@ -484,46 +433,20 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
 
                 # Para account_name, usar texto do usuário direto (sem LLM) e validar contra contas reais
                 if field == "account_name":
-                    # Limpar prefixos descritivos do tipo de conta
+                    # Palavras de tipo ("cartão de crédito", "débito") ajudam a ranquear, não são removidas
                     account_name_input = message_body.strip()
-                    _acc_prefixes = [
-                        "cartão de crédito", "cartao de credito", "cartão de débito", "cartao de debito",
-                        "conta corrente", "conta poupança", "conta poupanca", "cc ", "cartão ", "cartao ",
-                    ]
-                    _input_lower = account_name_input.lower()
-                    for _prefix in _acc_prefixes:
-                        if _input_lower.startswith(_prefix):
-                            account_name_input = account_name_input[len(_prefix):].strip()
-                            break
+                    from backend.core.account_directory import resolve_account
                     from backend.core.ledger import LedgerService as _LSEdit
-                    async with AsyncSessionLocal() as _edit_sess:
-                        await _edit_sess.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": phone_number})
+                    async with user_session(phone_number) as _edit_sess:
                         _ledger_edit = _LSEdit(_edit_sess)
-                        candidates_edit = await _ledger_edit.search_accounts_by_partial_name(phone_number, account_name_input)
-                        exact_edits = [a for a in candidates_edit if _strip_accents(a.name).lower() == _strip_accents(account_name_input).lower()]
-                        if len(exact_edits) == 1:
-                            pending_tx["account_name"] = exact_edits[0].name
-                            pending_tx["account_id"] = str(exact_edits[0].id)
-                            pending_tx["account_type"] = exact_edits[0].type
-                            pending_tx.pop("account_show_type", None)
-                        elif len(exact_edits) > 1:
-                            candidate_list_edit = [{"id": str(a.id), "name": a.name, "type": a.type} for a in exact_edits]
-                            new_state_edit = {
-                                "state": "pending_account_selection",
-                                "pending_tx": pending_tx,
-                                "account_candidates": candidate_list_edit,
-                                "last_tx_id": conv_state.get("last_tx_id"),
-                            }
-                            await _set_conv_state(phone_number, new_state_edit)
-                            await _send_account_disambiguation(phone_number, exact_edits, message_id)
-                            return
-                        elif len(candidates_edit) == 1:
-                            pending_tx["account_name"] = candidates_edit[0].name
-                            pending_tx["account_id"] = str(candidates_edit[0].id)
-                            pending_tx["account_type"] = candidates_edit[0].type
+                        matches_edit = await resolve_account(_edit_sess, phone_number, account_name_input)
+                        if len(matches_edit) == 1:
+                            pending_tx["account_name"] = matches_edit[0].name
+                            pending_tx["account_id"] = str(matches_edit[0].id)
+                            pending_tx["account_type"] = matches_edit[0].type
                             pending_tx.pop("account_show_type", None)
-                        elif len(candidates_edit) > 1:
-                            candidate_list_edit = [{"id": str(a.id), "name": a.name, "type": a.type} for a in candidates_edit]
+                        elif len(matches_edit) > 1:
+                            candidate_list_edit = [{"id": str(a.id), "name": a.name, "type": a.type} for a in matches_edit]
                             new_state_edit = {
                                 "state": "pending_account_selection",
                                 "pending_tx": pending_tx,
@@ -531,7 +454,7 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
                                 "last_tx_id": conv_state.get("last_tx_id"),
                             }
                             await _set_conv_state(phone_number, new_state_edit)
-                            await _send_account_disambiguation(phone_number, candidates_edit, message_id)
+                            await _send_account_disambiguation(phone_number, matches_edit, message_id)
                             return
                         else:
                                 # Conta não encontrada — usar primeira conta ativa do usuário
@@ -598,18 +521,9 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
             if msg_lower in CONFIRM_KEYWORDS:
                 # Criar a categoria sugerida e voltar para confirmação
                 suggested_cat = conv_state.get("suggested_category", "Nova Categoria")
-                async with AsyncSessionLocal() as session:
-                    await session.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": phone_number})
-                    from backend.db.models import UserProfile
-                    from sqlalchemy import select as sa_select
-                    result = await session.execute(sa_select(UserProfile).where(UserProfile.user_phone == phone_number))
-                    profile = result.scalar_one_or_none()
-                    if profile:
-                        existing = json.loads(profile.custom_categories) if profile.custom_categories else []
-                        if suggested_cat not in existing:
-                            existing.append(suggested_cat)
-                            profile.custom_categories = json.dumps(existing)
-                            await session.commit()
+                async with user_session(phone_number) as session:
+                    if await add_category(session, phone_number, suggested_cat):
+                        await session.commit()
 
                 # Atualizar categoria no pending_tx e voltar para pending_confirmation
                 pending_tx = conv_state.get("pending_tx", {})
@@ -649,11 +563,11 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
                 if 0 <= idx < len(candidates):
                     chosen = candidates[idx]
             else:
-                msg_lower = msg_stripped.lower()
-                for c in candidates:
-                    if msg_lower in c["name"].lower() or c["name"].lower() in msg_lower:
-                        chosen = c
-                        break
+                from backend.core.account_directory import DirectoryAccount, best_matches
+                options = [DirectoryAccount.build(c["id"], c["name"], c.get("type"), False) for c in candidates]
+                matches = best_matches(options, msg_stripped)
+                if len(matches) == 1:
+                    chosen = next(c for c in candidates if c["id"] == matches[0].id)
 
             if chosen:
                 pending_tx["account_name"] = chosen["name"]
@@ -671,11 +585,6 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
                 await _send_confirmation_card(phone_number, pending_tx)
             else:
                 # Não entendeu — reexibir opções
-                async with AsyncSessionLocal() as session:
-                    await session.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": phone_number})
-                    from backend.core.ledger import LedgerService as _LS
-                    _ledger = _LS(session)
-                    accts = [a for a in await _ledger.search_accounts_by_partial_name(phone_number, "") if a.id in {c["id"] for c in candidates}]
                 if candidates:
                     options = "\n".join(f"{i+1}. {c['name']}" for i, c in enumerate(candidates))
                     await _send_whatsapp(phone_number, f"Não entendi. Responda com o número ou nome da conta:\n\n{options}", message_id)
@@ -684,9 +593,7 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
         # --- 2. Recuperar Contexto (saldos + histórico + categorias) ---
         context_str = ""
         available_categories = []
-        async with AsyncSessionLocal() as session:
-            await session.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": phone_number})
-
+        async with user_session(phone_number) as session:
             ledger = LedgerService(session)
             accounts = await ledger.get_accounts(phone_number)
             if accounts:
@@ -708,35 +615,41 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
             else:
                 context_str += "Nenhuma transação anterior encontrada."
 
-            # Buscar categorias disponíveis (transações + custom)
-            from sqlalchemy import select as sa_select
-            from backend.db.models import UserProfile, Transaction
-            cats_result = await session.execute(
-                sa_select(Transaction.category).where(
-                    Transaction.user_phone == phone_number,
-                    Transaction.category.isnot(None)
-                ).distinct()
-            )
-            tx_cats = {row[0] for row in cats_result.fetchall() if row[0]}
+            # Categorias disponíveis, as mais usadas primeiro
+            available_categories = await ranked_categories(session, phone_number)
 
-            profile_result = await session.execute(sa_select(UserProfile).where(UserProfile.user_phone == phone_number))
-            profile = profile_result.scalar_one_or_none()
-            custom_cats = []
-            if profile and profile.custom_categories:
+            # Lançamento simples com categoria já aprendida dispensa o LLM
+            fast_tx, suggestion = None, None
+            if clients.category_embedder and clients.category_embedder.available:
                 try:
-                    custom_cats = json.loads(profile.custom_categories)
-                except Exception:
-                    custom_cats = []
-
-            available_categories = sorted(tx_cats | set(custom_cats))
+                    fast_tx, suggestion = await suggest_simple_transaction(
+                        CategorySuggester(session, clients.category_embedder),
+                        phone_number, message_body, [a.name for a in accounts]
+                    )
+                except Exception as e:
+                    logger.warning(f"Sugestão de categoria falhou, seguindo com o LLM: {e}")
 
         # --- 3. Processar com IA ---
         try:
-            llm_response_str = await clients.llm_client.process_message(
-                message_body,
-                context_data=context_str,
-                available_categories=available_categories if available_categories else None
-            )
+            if suggestion:
+                # Mesmo painel do roteador: compara a latência do kNN com o tier "log" do LLM
+                clients.llm_client.router_stats.record(
+                    "category_knn" if fast_tx else "category_knn_miss", suggestion["latency_ms"]
+                )
+                llm_log = clients.llm_client.router_stats.snapshot().get("log", {})
+                logger.info(
+                    f"🏷️ kNN category: {suggestion['category']} sim={suggestion['similarity']} "
+                    f"share={suggestion['share']} confident={suggestion['confident']} "
+                    f"latency={suggestion['latency_ms']:.0f}ms (LLM log avg={llm_log.get('avg_latency_ms')}ms)"
+                )
+            if fast_tx:
+                llm_response_str = json.dumps({"action": "log_transaction", "data": fast_tx, "reply_text": ""}, ensure_ascii=False)
+            else:
+                llm_response_str = await clients.llm_client.route_message(
+                    message_body,
+                    context_data=context_str,
+                    available_categories=available_categories if available_categories else None
+                )
             logger.info(f"🧠 Resposta da IA: {llm_response_str}")
 
             reply_text = "Recebido."
@@ -749,8 +662,7 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
                 if action == "edit_last":
                     last_tx_id = conv_state.get("last_tx_id")
                     if last_tx_id and data:
-                        async with AsyncSessionLocal() as session:
-                            await session.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": phone_number})
+                        async with user_session(phone_number) as session:
                             from backend.core.repository import TransactionRepository
                             repo = TransactionRepository(session)
                             updated = await repo.update_transaction(
@@ -761,6 +673,10 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
                                 amount=data.get("amount"),
                             )
                             await session.commit()
+                            if updated and data.get("category"):
+                                # Correção de categoria é o sinal mais forte para o aprendizado
+                                description = await repo.get_description(phone_number, last_tx_id)
+                                asyncio.create_task(learn_from_transaction(phone_number, description, data["category"]))
                         if updated:
                             changes = []
                             if data.get("category"):
@@ -800,38 +716,25 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
 
                     # Verificar ambiguidade de conta
                     account_name_raw = data.get("account_name", "")
-                    from backend.core.ledger import LedgerService as _LS2
-                    async with AsyncSessionLocal() as _sess:
-                        await _sess.execute(text("SELECT set_config('app.current_user_phone', :phone, false)"), {"phone": phone_number})
-                        _ledger2 = _LS2(_sess)
-                        user_accounts = await _ledger2.get_accounts(phone_number)
+                    from backend.core.account_directory import best_matches, fold_query, get_directory
+                    async with user_session(phone_number) as _sess:
+                        # Diretório de contas em cache (LRU + Redis); a busca por nome é local
+                        user_accounts = await get_directory(_sess, phone_number)
 
                         if not user_accounts:
                             await _send_whatsapp(phone_number, "⚠️ Você não possui contas cadastradas. Acesse o painel web para criar uma conta antes de registrar transações.", message_id)
                             return
 
                         if account_name_raw:
-                            # Buscar todas as contas que correspondem ao nome (pode haver corrente + crédito com mesmo nome)
-                            candidates = await _ledger2.search_accounts_by_partial_name(phone_number, account_name_raw)
-                            exact_matches = [a for a in candidates if _strip_accents(a.name).lower() == _strip_accents(account_name_raw).lower()]
-                            # Se há exatamente 1 match exato, usar direto; se há múltiplos exatos (ex: Itaú corrente + Itaú crédito), desambiguar
-                            if len(exact_matches) == 1:
-                                data["account_name"] = exact_matches[0].name
-                                data["account_id"] = str(exact_matches[0].id)
-                                data["account_type"] = exact_matches[0].type
-                            elif len(exact_matches) > 1:
-                                candidate_list = [{"id": str(a.id), "name": a.name, "type": a.type} for a in exact_matches]
-                                new_state = {
-                                    "state": "pending_account_selection",
-                                    "pending_tx": data,
-                                    "account_candidates": candidate_list,
-                                    "last_tx_id": conv_state.get("last_tx_id"),
-                                }
-                                await _set_conv_state(phone_number, new_state)
-                                await _send_account_disambiguation(phone_number, exact_matches, message_id)
-                                return
-                            elif len(candidates) > 1:
-                                candidate_list = [{"id": str(a.id), "name": a.name, "type": a.type} for a in candidates]
+                            # Busca aproximada ranqueada: um vencedor claro é usado direto; contas empatadas
+                            # (ex: Itaú corrente + Itaú crédito) vão para a lista de desambiguação
+                            matches = best_matches(user_accounts, await fold_query(_sess, account_name_raw))
+                            if len(matches) == 1:
+                                data["account_name"] = matches[0].name
+                                data["account_id"] = str(matches[0].id)
+                                data["account_type"] = matches[0].type
+                            elif len(matches) > 1:
+                                candidate_list = [{"id": str(a.id), "name": a.name, "type": a.type} for a in matches]
                                 new_state = {
                                     "state": "pending_account_selection",
                                     "pending_tx": data,
@@ -839,13 +742,8 @@ async def process_whatsapp_message(message_body: str, phone_number: str, message
                                     "last_tx_id": conv_state.get("last_tx_id"),
                                 }
                                 await _set_conv_state(phone_number, new_state)
-                                await _send_account_disambiguation(phone_number, candidates, message_id)
+                                await _send_account_disambiguation(phone_number, matches, message_id)
                                 return
-                            elif len(candidates) == 1:
-                                # Só uma correspondência — usar diretamente
-                                data["account_name"] = candidates[0].name
-                                data["account_id"] = str(candidates[0].id)
-                                data["account_type"] = candidates[0].type
                             else:
                                 # Conta mencionada não existe — pedir ao usuário para escolher
                                 candidate_list = [{"id": str(a.id), "name": a.name, "type": a.type} for a in user_accounts]
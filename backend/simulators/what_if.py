@@ -6,13 +6,14 @@ Simulates the financial impact of hypothetical decisions
 import logging
 from datetime import datetime, timedelta
 from backend.analytics.forecasting import get_monthly_cashflow
-from backend.db.session import AsyncSessionLocal
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
 
 async def simulate_scenario(
+    session: AsyncSession,
     user_phone: str,
     description: str,
     total_amount: float,
@@ -23,6 +24,7 @@ async def simulate_scenario(
     Simulates a purchase/expense scenario and projects future balance.
 
     Args:
+        session: Session bound to the user (get_user_db / user_session)
         user_phone: User identifier
         description: What the user wants to buy
         total_amount: Total cost
@@ -35,7 +37,7 @@ async def simulate_scenario(
     monthly_payment = total_amount / installments
 
     # Get historical cashflow
-    cashflow = await get_monthly_cashflow(user_phone, months=6)
+    cashflow = await get_monthly_cashflow(session, user_phone, months=6)
 
     if len(cashflow) < 2:
         return {
@@ -47,16 +49,11 @@ async def simulate_scenario(
     avg_expense = sum(m["expenses"] for m in cashflow) / len(cashflow)
 
     # Get current balance
-    async with AsyncSessionLocal() as session:
-        await session.execute(
-            text("SELECT set_config('app.current_user_phone', :phone, false)"),
-            {"phone": user_phone}
-        )
-        result = await session.execute(
-            text("SELECT COALESCE(SUM(current_balance), 0) FROM accounts WHERE user_phone = :phone"),
-            {"phone": user_phone}
-        )
-        current_balance = float(result.scalar() or 0)
+    result = await session.execute(
+        text("SELECT COALESCE(SUM(current_balance), 0) FROM accounts WHERE user_phone = :phone"),
+        {"phone": user_phone}
+    )
+    current_balance = float(result.scalar() or 0)
 
     # Project WITHOUT the purchase
     baseline = []
@@ -0,0 +1,113 @@
+"""
+LLMClient Benchmark
+Drives LLMClient against the fake vLLM server to measure our own overhead and
+concurrency behavior independently of model speed.
+
+    python -m backend.tests.bench_llm_client --requests 200 --concurrency 20 --latency fixed:200
+    python -m backend.tests.bench_llm_client --base-url http://localhost:8001/v1   # external fake/real server
+
+Overhead = observed latency - latency injected by the fake server (fixed distributions only).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core.llm import LLMClient
+from backend.tests.fake_vllm import FakeConfig, FakeVLLM, run_in_thread
+
+MESSAGES = [
+    "oi",
+    "gastei 50 no almoço",
+    "quanto gastei esse mês?",
+    "muda a categoria pra Alimentação",
+    "recebi 5000 de salário",
+]
+
+
+def _pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _report(name: str, latencies: list[float], wall: float, injected_ms: float | None):
+    line = (
+        f"{name:<10} n={len(latencies):<5} wall={wall:6.2f}s  thr={len(latencies) / wall:7.1f} req/s  "
+        f"p50={_pct(latencies, 0.50):7.1f}ms  p95={_pct(latencies, 0.95):7.1f}ms  p99={_pct(latencies, 0.99):7.1f}ms"
+    )
+    if injected_ms is not None:
+        line += f"  overhead(p50)={statistics.median(latencies) - injected_ms:6.1f}ms"
+    print(line)
+
+
+async def _run(client: LLMClient, mode: str, total: int, concurrency: int) -> tuple[list[float], float]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int):
+        msg = MESSAGES[i % len(MESSAGES)]
+        async with sem:
+            started = time.perf_counter()
+            if mode == "route":
+                await client.route_message(msg, context_data="- Nubank: R$ 100.00")
+            elif mode == "full":
+                await client.process_message(msg, context_data="- Nubank: R$ 100.00")
+            else:
+                async for _ in client.stream_chat_completion([{"role": "user", "content": "UM insight por linha"}]):
+                    pass
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLMClient against the fake vLLM server")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", default="fixed:100", help="time-to-first-token distribution")
+    parser.add_argument("--token-latency", default="fixed:0", help="per-token delay distribution")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="fake server concurrency limit (429 beyond)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--base-url", help="use an already running server instead of the in-process fake")
+    parser.add_argument("--modes", default="full,route,stream")
+    args = parser.parse_args()
+
+    fake = server = None
+    client = LLMClient()
+    if args.base_url:
+        client.base_url = args.base_url
+    else:
+        fake, server = run_in_thread(FakeVLLM(FakeConfig(
+            latency=args.latency,
+            token_latency=args.token_latency,
+            max_concurrency=args.max_concurrency,
+            error_rate=args.error_rate,
+        )))
+        client.base_url = f"http://127.0.0.1:{server.config.port}/v1"
+    client.router_base_url = client.base_url
+
+    injected = None
+    if not args.base_url and args.latency.startswith("fixed:") and args.token_latency == "fixed:0":
+        injected = float(args.latency.split(":")[1])
+
+    try:
+        for mode in args.modes.split(","):
+            latencies, wall = asyncio.run(_run(client, mode, args.requests, args.concurrency))
+            _report(mode, latencies, wall, injected)
+        print("\nRouter tiers:", client.router_stats.snapshot())
+        if fake:
+            print("Fake server:", fake.stats)
+    finally:
+        if server:
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Response Serialization Benchmark
+Times the old response path (per-row dicts, jsonable_encoder, then Starlette's json.dumps) against
+backend/api/responses.py (read models straight to orjson) for /transactions, /investments and
+/investments/performance shaped payloads, and reports body sizes with and without gzip.
+Needs no database.
+
+    python -m backend.tests.bench_response_serialization --rows 100 --repeat 200
+"""
+import argparse
+import gzip
+import json
+import statistics
+import time
+import uuid
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fastapi.encoders import jsonable_encoder
+from backend.api.responses import dumps
+from backend.core.config import settings
+from backend.core.read_models import Holding, SeriesPoint, TransactionItem
+
+
+def _starlette_render(content) -> bytes:
+    """What JSONResponse did with an endpoint's dict before (after FastAPI's jsonable_encoder)."""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _transactions(rows: int) -> list[TransactionItem]:
+    now = datetime(2024, 3, 9, 14, 30, 5)
+    return [
+        TransactionItem(uuid.uuid4(), (i % 300) + 0.99, "Alimentação", f"Mercado Extra #{i}", "EXPENSE",
+                        uuid.uuid4(), now - timedelta(hours=i), i % 3 == 0, "2/10" if i % 3 == 0 else None, True)
+        for i in range(rows)
+    ]
+
+
+def _old_transaction(tx: TransactionItem) -> dict:
+    return {
+        "id": str(tx.id), "amount": tx.amount, "category": tx.category, "description": tx.description,
+        "type": tx.type, "account_id": str(tx.account_id) if tx.account_id else None,
+        "date": tx.date.isoformat() if tx.date else "", "is_installment": tx.is_installment,
+        "installment_info": tx.installment_info, "is_cleared": tx.is_cleared,
+    }
+
+
+def _holdings(rows: int) -> list[Holding]:
+    return [
+        Holding(uuid.uuid4(), f"TICK{i}", f"Ativo {i}", "STOCK", 10.0 + i, 25.5, 27.1, 271.0 + i,
+                16.0, 6.27, 0.85, None)
+        for i in range(rows)
+    ]
+
+
+def _old_holding(h: Holding) -> dict:
+    return {
+        "id": str(h.id), "ticker": h.ticker, "name": h.name, "type": h.type, "quantity": h.quantity,
+        "avg_price": h.avg_price, "current_price": h.current_price, "current_value": h.current_value,
+        "gain_loss": h.gain_loss, "gain_pct": h.gain_pct, "change_pct": h.change_pct,
+        "dividend_yield": h.dividend_yield,
+    }
+
+
+def _series(points: int) -> dict[str, list[SeriesPoint]]:
+    start = date(2023, 3, 9)
+    return {
+        name: [SeriesPoint(start + timedelta(days=d), round(d * 0.0137, 4)) for d in range(points)]
+        for name in ("portfolio", "IBOV", "CDI", "SP500")
+    }
+
+
+def _payloads(rows: int) -> dict:
+    """name -> (old path, new path), each a zero-argument callable producing the body bytes."""
+    txs, holdings, series = _transactions(rows), _holdings(max(rows // 4, 1)), _series(365)
+    meta = {"total": rows * 10, "page": 1, "limit": rows, "pages": 10}
+    return {
+        "transactions": (
+            lambda: _starlette_render({"data": [_old_transaction(tx) for tx in txs], "meta": meta}),
+            lambda: dumps({"data": txs, "meta": meta}),
+        ),
+        "investments": (
+            lambda: _starlette_render({"holdings": [_old_holding(h) for h in holdings], "total_value": 1.0}),
+            lambda: dumps({"holdings": holdings, "total_value": 1.0}),
+        ),
+        "performance": (
+            lambda: _starlette_render({"series": {name: [{"date": str(p.date), "value": p.value} for p in points]
+                                                  for name, points in series.items()}}),
+            lambda: dumps({"series": series}),
+        ),
+    }
+
+
+def _median_ms(render, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON response path")
+    parser.add_argument("--rows", type=int, default=100, help="transactions per page (holdings: rows / 4)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, (old, new) in _payloads(args.rows).items():
+        old_body, new_body = old(), new()
+        assert json.loads(old_body) == json.loads(new_body), f"{name}: payloads differ"
+        old_ms, new_ms = _median_ms(old, args.repeat), _median_ms(new, args.repeat)
+        gzipped = len(gzip.compress(new_body, compresslevel=settings.GZIP_COMPRESS_LEVEL))
+        print(f"{name:<13} old={old_ms:7.3f}ms  new={new_ms:7.3f}ms  speedup={old_ms / new_ms:5.1f}x  "
+              f"json={len(old_body):>7}B  orjson={len(new_body):>7}B  gzip={gzipped:>6}B")
+
+
+if __name__ == "__main__":
+    main()
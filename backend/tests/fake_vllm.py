@@ -0,0 +1,290 @@
+"""
+Fake vLLM Server
+Small OpenAI-compatible stand-in for the GPU vLLM service, used by tests and benchmarks.
+
+Implements /v1/models and /v1/chat/completions (streaming and non-streaming) with:
+- scripted responses keyed by regex patterns on the prompt (system + user messages)
+- injectable latency distributions (time-to-first-token and per-token delay)
+- rate limits (max concurrent requests, requests per second) answered with 429
+- failure modes (HTTP 500, hang until client timeout, malformed content, stream cut mid-way)
+
+Run standalone:
+    python -m backend.tests.fake_vllm --port 8001 --script scenario.json
+and point the app at it with LLM_BASE_URL=http://localhost:8001/v1.
+
+Scenario JSON (all keys optional):
+{
+    "model": "Qwen/Qwen2.5-7B-Instruct-AWQ",
+    "latency": "lognormal:5.5:0.4",      # ms to first token: fixed:N | uniform:A:B | normal:MU:SD | lognormal:MU:SIGMA
+    "token_latency": "fixed:15",          # ms between streamed tokens
+    "max_concurrency": 8,
+    "rate_limit_rps": 20,
+    "error_rate": 0.0, "hang_rate": 0.0, "malformed_rate": 0.0, "stream_cut_rate": 0.0,
+    "rules": [{"pattern": "gastei", "response": "{\\"action\\": \\"log_transaction\\", ...}"}],
+    "default_response": "{\\"action\\": \\"chat\\", \\"reply_text\\": \\"ok\\"}"
+}
+Runtime changes: POST /_fake/config with the same keys; GET /_fake/stats for counters.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_RULES = [
+    # Intent router (one-word answer)
+    {"pattern": r"Classifique a intenção", "response": "log"},
+    # Streaming insights (one per line)
+    {"pattern": r"UM insight por linha", "response": "💸 Gastos com Alimentação dominam o mês.\n🚗 Transporte subiu em relação à média.\n💡 Defina um orçamento para Lazer."},
+    # JSON insights
+    {"pattern": r"chave \"insights\"", "response": json.dumps({"insights": ["💸 Alimentação domina.", "🚗 Transporte subiu.", "💡 Defina um orçamento."]}, ensure_ascii=False)},
+    # Search filters
+    {"pattern": r"filtros JSON estruturados", "response": json.dumps({"keywords": ["uber"], "type": "EXPENSE"})},
+    # Log extraction
+    {"pattern": r"(?i)gastei|paguei|comprei|recebi", "response": json.dumps({
+        "action": "log_transaction",
+        "data": {"amount": 50.0, "type": "EXPENSE", "category": "Alimentação", "description": "Almoço",
+                 "account_name": None, "installments": None},
+        "reply_text": "Aguardando confirmação.",
+    }, ensure_ascii=False)},
+]
+DEFAULT_RESPONSE = json.dumps({"action": "chat", "reply_text": "Olá! Como posso ajudar?"}, ensure_ascii=False)
+
+
+def sample_ms(spec: str | None) -> float:
+    """Samples a delay in milliseconds from a distribution spec (see module docstring)."""
+    if not spec:
+        return 0.0
+    kind, *params = spec.split(":")
+    p = [float(x) for x in params]
+    if kind == "fixed":
+        return p[0]
+    if kind == "uniform":
+        return random.uniform(p[0], p[1])
+    if kind == "normal":
+        return max(0.0, random.gauss(p[0], p[1]))
+    if kind == "lognormal":
+        return random.lognormvariate(p[0], p[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+@dataclass
+class FakeConfig:
+    model: str = "Qwen/Qwen2.5-7B-Instruct-AWQ"
+    latency: str | None = None
+    token_latency: str | None = None
+    max_concurrency: int = 0  # 0 = unlimited
+    rate_limit_rps: float = 0.0  # 0 = unlimited
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    malformed_rate: float = 0.0
+    stream_cut_rate: float = 0.0
+    rules: list = field(default_factory=lambda: list(DEFAULT_RULES))
+    default_response: str = DEFAULT_RESPONSE
+
+    def update(self, values: dict):
+        for key, value in values.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+
+class FakeVLLM:
+    def __init__(self, config: FakeConfig = None):
+        self.config = config or FakeConfig()
+        self.active = 0
+        self.stats = {"requests": 0, "streamed": 0, "rate_limited": 0, "errors": 0,
+                      "hangs": 0, "malformed": 0, "stream_cuts": 0, "cancelled": 0,
+                      "completion_tokens": 0, "max_active": 0}
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.app = self._build_app()
+
+    # --- helpers ---
+    def _pick_response(self, messages: list) -> str:
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        for rule in self.config.rules:
+            if re.search(rule["pattern"], prompt):
+                return rule["response"]
+        return self.config.default_response
+
+    def _rate_limited(self) -> bool:
+        if self.config.max_concurrency and self.active >= self.config.max_concurrency:
+            return True
+        if self.config.rate_limit_rps:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_count = now, 0
+            if self._window_count >= self.config.rate_limit_rps:
+                return True
+            self._window_count += 1
+        return False
+
+    @staticmethod
+    def _tokens(content: str) -> list[str]:
+        # Whitespace-preserving pseudo-tokens; close enough for pacing and counting
+        return re.findall(r"\S+\s*|\s+", content)
+
+    def _usage(self, messages: list, content: str) -> dict:
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        completion_tokens = len(self._tokens(content))
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    # --- app ---
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake vLLM")
+
+        @app.get("/v1/models")
+        async def list_models():
+            return {"object": "list", "data": [
+                {"id": self.config.model, "object": "model", "owned_by": "fake-vllm", "max_model_len": 4096}
+            ]}
+
+        @app.get("/_fake/stats")
+        async def get_stats():
+            return {**self.stats, "active": self.active}
+
+        @app.post("/_fake/config")
+        async def set_config(request: Request):
+            self.config.update(await request.json())
+            return {"status": "ok"}
+
+        @app.post("/_fake/reset")
+        async def reset():
+            for key in self.stats:
+                self.stats[key] = 0
+            return {"status": "ok"}
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            self.stats["requests"] += 1
+
+            if self._rate_limited():
+                self.stats["rate_limited"] += 1
+                return JSONResponse(status_code=429, content={"error": {"message": "Rate limit exceeded", "type": "rate_limit"}})
+
+            messages = body.get("messages", [])
+            content = self._pick_response(messages)
+            max_tokens = body.get("max_tokens")
+            if max_tokens:
+                content = "".join(self._tokens(content)[:max_tokens])
+
+            roll = random.random()
+            cfg = self.config
+            if roll < cfg.error_rate:
+                self.stats["errors"] += 1
+                return JSONResponse(status_code=500, content={"error": {"message": "Injected failure", "type": "server_error"}})
+            roll -= cfg.error_rate
+            if roll < cfg.hang_rate:
+                self.stats["hangs"] += 1
+                await asyncio.sleep(3600)
+            roll -= cfg.hang_rate
+            if roll < cfg.malformed_rate:
+                self.stats["malformed"] += 1
+                content = content[: max(1, len(content) // 2)]
+            roll -= cfg.malformed_rate
+            cut_stream = roll < cfg.stream_cut_rate
+
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            created = int(time.time())
+            model = body.get("model") or cfg.model
+
+            if not body.get("stream"):
+                self.active += 1
+                self.stats["max_active"] = max(self.stats["max_active"], self.active)
+                try:
+                    tokens = self._tokens(content)
+                    delay = sample_ms(cfg.latency) + sum(sample_ms(cfg.token_latency) for _ in tokens)
+                    await asyncio.sleep(delay / 1000)
+                finally:
+                    self.active -= 1
+                self.stats["completion_tokens"] += len(tokens)
+                return {
+                    "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": self._usage(messages, content),
+                }
+
+            self.stats["streamed"] += 1
+
+            async def event_stream():
+                self.active += 1
+                self.stats["max_active"] = max(self.stats["max_active"], self.active)
+                try:
+                    await asyncio.sleep(sample_ms(cfg.latency) / 1000)
+                    tokens = self._tokens(content)
+                    cut_at = len(tokens) // 2 if cut_stream else None
+                    for i, token in enumerate(tokens):
+                        if cut_at is not None and i == cut_at:
+                            self.stats["stream_cuts"] += 1
+                            return
+                        chunk = {
+                            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                        }
+                        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                        self.stats["completion_tokens"] += 1
+                        await asyncio.sleep(sample_ms(cfg.token_latency) / 1000)
+                    final = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    }
+                    yield f"data: {json.dumps(final)}\n\n"
+                    yield "data: [DONE]\n\n"
+                except asyncio.CancelledError:
+                    # Client went away: this is what vLLM's abort looks like from our side
+                    self.stats["cancelled"] += 1
+                    raise
+                finally:
+                    self.active -= 1
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        return app
+
+
+def run_in_thread(fake: FakeVLLM = None, host: str = "127.0.0.1", port: int = 8011):
+    """
+    Starts the fake server in a daemon thread and waits until it accepts connections.
+    Returns (fake, server); call server.should_exit = True to stop it.
+    """
+    import uvicorn
+
+    fake = fake or FakeVLLM()
+    server = uvicorn.Server(uvicorn.Config(fake.app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Fake vLLM server did not start")
+        time.sleep(0.05)
+    return fake, server
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible vLLM server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--script", help="Scenario JSON file (see module docstring)")
+    args = parser.parse_args()
+
+    config = FakeConfig()
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    uvicorn.run(FakeVLLM(config).app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
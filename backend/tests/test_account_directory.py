@@ -0,0 +1,169 @@
+import sys
+import os
+import asyncio
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core import account_directory
+from backend.core.account_directory import (
+    DirectoryAccount, best_matches, get_directory, invalidate_directory, resolve_account,
+)
+
+ACCOUNTS = [
+    DirectoryAccount.build("1", "Itaú", "CHECKING", True),
+    DirectoryAccount.build("2", "Itaú", "CREDIT", False),
+    DirectoryAccount.build("3", "Nubank", "CHECKING", False),
+    DirectoryAccount.build("4", "Nubank Crédito", "CREDIT", False),
+    DirectoryAccount.build("5", "Carteira", "CASH", False),
+    DirectoryAccount.build("6", "Banco do Brasil", "CHECKING", False),
+]
+
+
+def _ids(query: str) -> list[str]:
+    return [a.id for a in best_matches(ACCOUNTS, query)]
+
+
+def test_exact_and_type_hinted_names():
+    assert _ids("itau") == ["1", "2"]  # same name, two types: ask
+    assert _ids("itaú crédito") == ["2"]
+    assert _ids("cartão de débito itau") == ["1"]
+    assert _ids("nubank credito") == ["4"]
+    assert _ids("nubank") == ["3"]
+    assert _ids("carteira") == ["5"]
+
+
+def test_aliases_prefixes_and_typos():
+    assert _ids("bb") == ["6"]
+    assert _ids("banco do brasil") == ["6"]
+    assert _ids("nu") == ["3", "4"]
+    assert _ids("nubnak") == ["3"]
+    assert _ids("nubnak cartao") == ["4"]
+    assert _ids("o itau corrente por favor") == ["1"]
+    assert _ids("bradesco") == []
+
+
+def test_only_a_type_word():
+    assert _ids("dinheiro") == ["5"]
+    assert set(_ids("cartão")) == {"2", "4"}
+
+
+class _NoQuerySession:
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("directory should have been served from cache")
+
+
+def test_directory_is_cached_and_invalidated():
+    async def _run():
+        original = account_directory.clients.redis_client
+        account_directory.clients.redis_client = None
+        try:
+            account_directory._remember("5511999999999", ACCOUNTS)
+            assert await get_directory(_NoQuerySession(), "5511999999999") is ACCOUNTS
+            await invalidate_directory("5511999999999")
+            assert "5511999999999" not in account_directory._local
+        finally:
+            account_directory.clients.redis_client = original
+    asyncio.run(_run())
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+
+class _Row:
+    def __init__(self, name):
+        self.id, self.name, self.type, self.is_default = "1", name, "CHECKING", True
+        self.normalized_name = name.lower()
+
+
+class _RacingSession:
+    """Returns `names` in turn; the first query sees the accounts change while it runs."""
+
+    def __init__(self, phone, *names):
+        self.phone, self.names, self.queries = phone, list(names), 0
+
+    async def execute(self, *args, **kwargs):
+        self.queries += 1
+        rows = [_Row(self.names.pop(0))]
+        if self.queries == 1:
+            await invalidate_directory(self.phone)
+
+        class _Result:
+            def fetchall(self):
+                return rows
+        return _Result()
+
+
+def test_directory_read_across_a_change_is_not_cached():
+    async def _run():
+        phone = "5511999999998"
+        original = account_directory.clients.redis_client
+        account_directory.clients.redis_client = _FakeRedis()
+        try:
+            session = _RacingSession(phone, "Velho", "Novo", "Outro")
+            assert [a.name for a in await get_directory(session, phone)] == ["Velho"]
+            # The stale list went to the old generation: the next read queries again
+            assert [a.name for a in await get_directory(session, phone)] == ["Novo"]
+            account_directory._local.pop(phone, None)
+            assert [a.tokens for a in await get_directory(session, phone)] == [["novo"]]
+            assert session.queries == 2
+        finally:
+            account_directory.clients.redis_client = original
+            account_directory._local.pop(phone, None)
+    asyncio.run(_run())
+
+
+class _UnaccentSession:
+    """Folds like unaccent does where NFD doesn't ("ø" -> "o"); counts the round trips."""
+
+    def __init__(self):
+        self.folds = 0
+
+    async def scalar(self, statement):
+        self.folds += 1
+        (query,) = statement.compile().params.values()
+        return query.lower().replace("ø", "o")
+
+
+def test_queries_are_folded_like_the_names():
+    async def _run():
+        phone = "5511999999997"
+        original = account_directory.clients.redis_client
+        account_directory.clients.redis_client = None
+        try:
+            # normalized_name as the trigger stores it for "Bjørn Bank"
+            account_directory._remember(phone, [DirectoryAccount.build("1", "Bjørn Bank", "CHECKING", True, "bjorn bank")])
+            session = _UnaccentSession()
+            assert [a.id for a in await resolve_account(session, phone, "Bjørn")] == ["1"]
+            assert [a.id for a in await resolve_account(session, phone, "Bjørn")] == ["1"]
+            assert session.folds == 1
+        finally:
+            account_directory.clients.redis_client = original
+            account_directory._local.pop(phone, None)
+            account_directory._folded_queries.pop("Bjørn", None)
+    asyncio.run(_run())
+
+
+def test_entries_round_trip_through_json_shape():
+    entry = ACCOUNTS[5]
+    assert DirectoryAccount(**entry.to_dict()).to_dict() == entry.to_dict()
+    assert "bb" in entry.aliases and entry.tokens == ["brasil"]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,63 @@
+"""
+Checks accent/case-insensitive account lookups on accounts.normalized_name (migration 021).
+Uses the same disposable Postgres as test_query_plans.py (TEST_DATABASE_URL; skipped otherwise).
+"""
+import sys
+import os
+import asyncio
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.ledger import LedgerService
+from test_query_plans import _engine, _prepare
+
+PHONE = "5511900000999"
+
+
+def test_lookups_ignore_accents_and_case():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with AsyncSession(engine) as session:
+                ledger = LedgerService(session)
+                checking = await ledger.create_account(PHONE, "Itaú Personnalité", "CHECKING")
+                credit = await ledger.create_account(PHONE, "ITAU personnalite", "CREDIT")
+                await ledger.create_account(PHONE, "Caixa_100%", "CASH")
+                await session.refresh(checking)
+                assert checking.normalized_name == "itau personnalite"
+
+                assert (await ledger.get_account_by_name(PHONE, " itau PERSONNALITÉ", "checking")).id == checking.id
+                assert {a.id for a in await ledger.find_accounts_by_name(PHONE, "Itaú personnalité")} == {checking.id, credit.id}
+                assert len(await ledger.search_accounts_by_partial_name(PHONE, "ITÁ")) == 2
+                assert len(await ledger.search_accounts_by_partial_name(PHONE, "")) == 3
+                # Wildcards in the term match literally
+                assert [a.name for a in await ledger.search_accounts_by_partial_name(PHONE, "_100%")] == ["Caixa_100%"]
+                assert await ledger.search_accounts_by_partial_name(PHONE, "%") == [await ledger.get_account_by_name(PHONE, "caixa_100%")]
+                assert await ledger.get_default_account(PHONE) is None
+
+                await session.execute(text("UPDATE accounts SET is_default = true WHERE id = :id"), {"id": credit.id})
+                assert (await ledger.get_default_account(PHONE)).id == credit.id
+
+                try:
+                    async with session.begin_nested():
+                        await ledger.create_account(PHONE, "itau personnalite", "CHECKING")
+                    assert False, "duplicate name within a type was accepted"
+                except IntegrityError:
+                    pass
+                await session.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
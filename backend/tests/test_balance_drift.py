@@ -0,0 +1,88 @@
+"""
+Checks the balance drift query and repair (backend/workers/balance_drift.py) and that the
+statement-level balance triggers (migration 020) leave no drift.
+Uses the same disposable Postgres as test_query_plans.py (TEST_DATABASE_URL; skipped otherwise).
+"""
+import sys
+import os
+import asyncio
+import uuid
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.workers.balance_drift import find_balance_drift, repair_balances
+from test_query_plans import PHONE, _engine, _prepare
+
+
+def test_drift_is_reported_and_repaired():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with AsyncSession(engine) as session:
+                await repair_balances(session, PHONE)
+                assert await find_balance_drift(session, [PHONE]) == []
+
+                account_id = await session.scalar(
+                    text("SELECT id FROM accounts WHERE user_phone = :phone AND type = 'CHECKING'"), {"phone": PHONE}
+                )
+                await session.execute(
+                    text("UPDATE accounts SET current_balance = current_balance + 1 WHERE id = :id"), {"id": account_id}
+                )
+                drift = await find_balance_drift(session, [PHONE])
+                assert [row["account_id"] for row in drift] == [account_id]
+                assert round(drift[0]["actual_balance"] - drift[0]["expected_balance"], 2) == 1
+
+                await repair_balances(session, PHONE)
+                assert await find_balance_drift(session, [PHONE]) == []
+                await session.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+def test_statement_triggers_track_bulk_writes():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with AsyncSession(engine) as session:
+                await repair_balances(session, PHONE)
+                accounts = dict((await session.execute(
+                    text("SELECT type, id FROM accounts WHERE user_phone = :phone"), {"phone": PHONE}
+                )).fetchall())
+                params = {"phone": PHONE, "checking": accounts["CHECKING"], "credit": accounts["CREDIT"],
+                          "transfer": uuid.uuid4()}
+                steps = [
+                    # Installments and a transfer in one statement each
+                    ("INSERT INTO transactions (id, user_phone, account_id, type, amount, date, is_cleared) "
+                     "SELECT gen_random_uuid(), :phone, :credit, 'EXPENSE', 10.01, now(), g % 2 = 0 "
+                     "FROM generate_series(1, 24) g"),
+                    ("INSERT INTO transactions (id, user_phone, account_id, destination_account_id, type, amount, date) "
+                     "VALUES (:transfer, :phone, :checking, :credit, 'TRANSFER', 300, now())"),
+                    "UPDATE transactions SET is_cleared = NOT is_cleared WHERE user_phone = :phone AND amount = 10.01",
+                    "UPDATE transactions SET amount = amount * 2, type = 'INCOME' WHERE user_phone = :phone AND category = 'Lazer'",
+                    "UPDATE transactions SET description = 'only text' WHERE user_phone = :phone",
+                    "UPDATE transactions SET account_id = :credit, destination_account_id = :checking WHERE id = :transfer",
+                    "UPDATE transactions SET account_id = NULL WHERE user_phone = :phone AND category = 'Moradia'",
+                    "DELETE FROM transactions WHERE user_phone = :phone AND category IN ('Saúde', 'Lazer')",
+                    "DELETE FROM transactions WHERE id = :transfer",
+                ]
+                for sql in steps:
+                    await session.execute(text(sql), params)
+                    assert await find_balance_drift(session, [PHONE]) == [], sql
+                await session.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
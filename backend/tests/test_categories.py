@@ -0,0 +1,100 @@
+"""
+Checks that the categories table (migration 022) tracks transaction writes and the
+category helpers. Uses the same disposable Postgres as test_query_plans.py
+(TEST_DATABASE_URL; skipped otherwise).
+"""
+import sys
+import os
+import asyncio
+import uuid
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core import categories
+from test_query_plans import _engine, _prepare
+
+PHONE = "5511900000998"
+
+# Rows whose usage_count disagrees with a fresh count over transactions
+DRIFT_SQL = """
+    SELECT c.name, c.usage_count, COUNT(t.id) AS expected
+    FROM categories c
+    LEFT JOIN transactions t ON t.user_phone = c.user_phone AND t.category = c.name
+    WHERE c.user_phone = :phone
+    GROUP BY c.name, c.usage_count
+    HAVING c.usage_count <> COUNT(t.id)
+"""
+
+
+async def _usage(session) -> dict:
+    result = await session.execute(
+        text("SELECT name, usage_count FROM categories WHERE user_phone = :phone"), {"phone": PHONE}
+    )
+    return dict(result.fetchall())
+
+
+def test_triggers_track_transaction_writes():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with AsyncSession(engine) as session:
+                ids = [uuid.uuid4() for _ in range(3)]
+                steps = [
+                    ("INSERT INTO transactions (id, user_phone, type, amount, category) "
+                     "SELECT id, :phone, 'EXPENSE', 10, 'Mercado' FROM unnest(CAST(:ids AS UUID[])) id"),
+                    "UPDATE transactions SET amount = 20 WHERE id = ANY(CAST(:ids AS UUID[]))",
+                    "UPDATE transactions SET category = 'Feira' WHERE id = CAST(:first AS UUID)",
+                    "UPDATE transactions SET category = NULL WHERE id = CAST(:first AS UUID)",
+                    "DELETE FROM transactions WHERE id = ANY(CAST(:ids AS UUID[])) AND category = 'Mercado'",
+                ]
+                for sql in steps:
+                    await session.execute(text(sql), {"phone": PHONE, "ids": ids, "first": ids[0]})
+                    drift = await session.execute(text(DRIFT_SQL), {"phone": PHONE})
+                    assert drift.fetchall() == [], sql
+
+                # Categories outlive their last transaction
+                assert await _usage(session) == {"Mercado": 0, "Feira": 0}
+                await session.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+def test_helpers_list_rank_and_find():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with AsyncSession(engine) as session:
+                await session.execute(
+                    text("INSERT INTO transactions (id, user_phone, type, amount, category) "
+                         "SELECT gen_random_uuid(), :phone, 'EXPENSE', 5, c "
+                         "FROM unnest(ARRAY['Alimentação', 'Alimentação', 'Lazer']) c"),
+                    {"phone": PHONE},
+                )
+                assert await categories.add_category(session, PHONE, "Vestuário")
+                assert not await categories.add_category(session, PHONE, "Lazer")
+
+                assert await categories.list_categories(session, PHONE) == ["Alimentação", "Lazer", "Vestuário"]
+                assert await categories.ranked_categories(session, PHONE) == ["Alimentação", "Lazer", "Vestuário"]
+                assert await categories.find_category(session, PHONE, "alimentacao") == "Alimentação"
+                assert await categories.find_category(session, PHONE, "Saúde") is None
+
+                await categories.remove_category(session, PHONE, "Vestuário")
+                assert "Vestuário" not in await _usage(session)
+                await session.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
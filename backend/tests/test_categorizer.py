@@ -0,0 +1,161 @@
+import asyncio
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.append(os.path.dirname(__file__))
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.categorizer import (
+    EMBEDDING_DIM, CategorySuggester, _to_pgvector, extract_simple_transaction, suggest_simple_transaction,
+)
+from backend.db.migrate import load_migrations, split_statements
+from test_query_plans import _engine
+
+
+class _FakeEmbedder:
+    available = True
+
+    async def aembed(self, texts, batch_size=64):
+        return [[0.0] * 384 for _ in texts]
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _FakeSession:
+    """Returns fixed (category, hits, similarity) neighbour rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, stmt, params=None):
+        return _FakeResult(self.rows)
+
+
+def _suggest(rows, description="uber"):
+    suggester = CategorySuggester(_FakeSession(rows), _FakeEmbedder())
+    return asyncio.run(suggester.suggest("5511999999999", description))
+
+
+def test_extracts_simple_expense_keeping_original_spelling():
+    data = extract_simple_transaction("paguei 30 de pão de queijo")
+    assert data["amount"] == 30.0
+    assert data["type"] == "EXPENSE"
+    assert data["description"] == "Pão de queijo"
+
+
+def test_extracts_income_and_thousands_separator():
+    data = extract_simple_transaction("recebi R$ 1.500,00 de reembolso")
+    assert data["amount"] == 1500.0
+    assert data["type"] == "INCOME"
+
+
+def test_complex_messages_fall_back_to_llm():
+    assert extract_simple_transaction("comprei celular 3x 100") is None
+    assert extract_simple_transaction("gastei 10 e 20 no mercado") is None
+    assert extract_simple_transaction("gastei 50 ontem no mercado") is None
+    assert extract_simple_transaction("gastei 50 no nubank", ["Nubank"]) is None
+    assert extract_simple_transaction("quanto gastei esse mês?") is None
+
+
+def test_close_unanimous_neighbours_are_confident():
+    result = _suggest([("Transporte", 3, 0.95), ("Transporte", 1, 0.91)])
+    assert result["category"] == "Transporte"
+    assert result["confident"]
+
+
+def test_split_vote_is_not_confident():
+    result = _suggest([("Transporte", 1, 0.93), ("Lazer", 1, 0.92), ("Lazer", 1, 0.90)])
+    assert not result["confident"]
+
+
+def test_distant_neighbours_give_no_suggestion():
+    assert _suggest([("Transporte", 5, 0.3)]) is None
+
+
+def test_fast_path_fills_category_only_when_confident():
+    confident = CategorySuggester(_FakeSession([("Transporte", 2, 0.97)]), _FakeEmbedder())
+    data, _ = asyncio.run(suggest_simple_transaction(confident, "5511999999999", "uber 25"))
+    assert data["category"] == "Transporte"
+
+    unsure = CategorySuggester(_FakeSession([("Transporte", 1, 0.7)]), _FakeEmbedder())
+    data, suggestion = asyncio.run(suggest_simple_transaction(unsure, "5511999999999", "uber 25"))
+    assert data is None and suggestion is not None
+
+
+
+def _unit(*head) -> list[float]:
+    vector = list(head) + [0.0] * (EMBEDDING_DIM - len(head))
+    norm = sum(x * x for x in vector) ** 0.5
+    return [x / norm for x in vector]
+
+
+class _FixedEmbedder:
+    available = True
+
+    async def aembed(self, texts, batch_size=64):
+        return [_unit(1.0) for _ in texts]
+
+
+def test_neighbours_are_found_among_a_crowd_of_other_users_vectors():
+    """Postgres + pgvector (TEST_DATABASE_URL): another user's closer vectors don't hide ours."""
+    async def _run():
+        engine = _engine()
+        try:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                if not await conn.scalar(text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")):
+                    pytest.skip("pgvector not available")
+                migration = next(m for m in load_migrations() if m.filename.startswith("016_"))
+                for statement in split_statements(migration.sql):
+                    await conn.exec_driver_sql(statement)
+
+            mine, crowd = "5511900000101", "5511900000102"
+            async with AsyncSession(engine) as session:
+                await session.execute(
+                    text("DELETE FROM category_learning WHERE user_phone IN (:mine, :crowd)"),
+                    {"mine": mine, "crowd": crowd},
+                )
+                rows = [{"phone": mine, "description": "uber", "category": "Transporte", "embedding": _unit(1.0, 0.3)}]
+                rows += [
+                    {"phone": crowd, "description": f"corrida {i}", "category": "Lazer",
+                     "embedding": _unit(1.0, 0.001 * (i + 1))}
+                    for i in range(500)
+                ]
+                await session.execute(
+                    text("""
+                        INSERT INTO category_learning (user_phone, original_description, corrected_category, embedding)
+                        VALUES (:phone, :description, :category, CAST(CAST(:embedding AS TEXT) AS vector))
+                    """),
+                    [{**row, "embedding": _to_pgvector(row["embedding"])} for row in rows],
+                )
+                await session.commit()
+                try:
+                    result = await CategorySuggester(session, _FixedEmbedder()).suggest(mine, "uber")
+                    assert result["category"] == "Transporte"
+                    assert result["similarity"] > 0.95
+                finally:
+                    await session.execute(
+                        text("DELETE FROM category_learning WHERE user_phone IN (:mine, :crowd)"),
+                        {"mine": mine, "crowd": crowd},
+                    )
+                    await session.commit()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
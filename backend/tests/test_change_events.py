@@ -0,0 +1,113 @@
+"""
+Checks the change events outbox (migration 023) and the event bus handlers.
+The outbox test uses the same disposable Postgres as test_query_plans.py
+(TEST_DATABASE_URL; skipped otherwise).
+"""
+import sys
+import os
+import asyncio
+import uuid
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core import account_directory, events
+from backend.workers.outbox_dispatcher import CLAIM_SQL
+from test_query_plans import _engine, _prepare
+
+PHONE = "5511900000997"
+
+
+def test_handlers_run_per_topic_and_survive_failures():
+    async def _run():
+        seen = []
+
+        async def _broken(event):
+            raise RuntimeError("boom")
+
+        async def _record(event):
+            seen.append(event["user_phone"])
+
+        events.subscribe("test_topic", _broken)
+        events.subscribe("test_topic", _record)
+        try:
+            await events.handle({"topic": "test_topic", "user_phone": PHONE})
+            await events.handle({"topic": "other_topic", "user_phone": "x"})
+        finally:
+            events._handlers.pop("test_topic")
+        assert seen == [PHONE]
+    asyncio.run(_run())
+
+
+def test_account_events_invalidate_the_directory():
+    async def _run():
+        original = account_directory.clients.redis_client
+        account_directory.clients.redis_client = None
+        try:
+            account_directory._remember(PHONE, [])
+            await events.handle({"topic": "accounts", "user_phone": PHONE, "operation": "UPDATE"})
+            assert PHONE not in account_directory._local
+        finally:
+            account_directory.clients.redis_client = original
+    asyncio.run(_run())
+
+
+def test_directory_copies_are_short_lived_without_a_connected_consumer():
+    try:
+        for connected, ttl in ((False, account_directory.DISCONNECTED_LOCAL_TTL), (True, account_directory.LOCAL_TTL)):
+            events._connected = connected
+            account_directory._remember(PHONE, [])
+            expires_at = account_directory._local[PHONE][0]
+            assert ttl - 1 < expires_at - account_directory.time.monotonic() <= ttl
+    finally:
+        events._connected = False
+        account_directory._local.pop(PHONE, None)
+
+
+def test_triggers_write_one_event_per_statement_and_user():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with AsyncSession(engine) as session:
+                await session.execute(text("DELETE FROM change_events_outbox"))
+                account_id = uuid.uuid4()
+                await session.execute(
+                    text("INSERT INTO accounts (id, user_phone, name, type, initial_balance, current_balance, "
+                         "is_active, is_default) VALUES (:id, :phone, 'Outbox', 'CHECKING', 0, 0, true, false)"),
+                    {"id": account_id, "phone": PHONE},
+                )
+                await session.execute(
+                    text("INSERT INTO transactions (id, user_phone, account_id, type, amount, category, is_cleared) "
+                         "SELECT gen_random_uuid(), :phone, :account, 'EXPENSE', 10, 'Outbox', true "
+                         "FROM generate_series(1, 24)"),
+                    {"phone": PHONE, "account": account_id},
+                )
+                result = await session.execute(text(CLAIM_SQL), {"batch_size": 100})
+                claimed = {(row.topic, row.operation): row.row_count for row in result.fetchall()}
+                # The balance and category usage the triggers moved are not events of their own
+                assert claimed == {
+                    ("accounts", "INSERT"): 1,
+                    ("transactions", "INSERT"): 24,
+                    ("categories", "INSERT"): 1,
+                }
+
+                await session.execute(text("UPDATE accounts SET name = 'Outbox 2' WHERE id = :id"), {"id": account_id})
+                await session.execute(text("UPDATE transactions SET amount = 11 WHERE account_id = :id"), {"id": account_id})
+                result = await session.execute(text(CLAIM_SQL), {"batch_size": 100})
+                claimed = {(row.topic, row.operation): row.row_count for row in result.fetchall()}
+                assert claimed == {("accounts", "UPDATE"): 1, ("transactions", "UPDATE"): 24}
+                await session.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
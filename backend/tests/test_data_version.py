@@ -0,0 +1,86 @@
+import sys
+import os
+import asyncio
+import uuid
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core import clients
+from backend.api import dashboard
+from backend.core.data_version import get_versioned, store_versioned
+
+
+class _MemoryRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def _with_redis(redis, coro_fn):
+    async def _run():
+        original = clients.redis_client
+        clients.redis_client = redis
+        try:
+            return await coro_fn()
+        finally:
+            clients.redis_client = original
+    return asyncio.run(_run())
+
+
+def test_payload_is_served_only_for_its_version_and_scope():
+    async def _run():
+        payload = {"id": uuid.uuid4(), "month_total_spent": 12.5}
+        await store_versioned("summary", "5511999999999", 3, payload, "2024-05-01")
+        hit = await get_versioned("summary", "5511999999999", 3, "2024-05-01")
+        assert hit == {"id": str(payload["id"]), "month_total_spent": 12.5}
+        assert await get_versioned("summary", "5511999999999", 4, "2024-05-01") is None
+        assert await get_versioned("summary", "5511999999999", 3, "2024-05-02") is None
+        assert await get_versioned("hud", "5511999999999", 3, "2024-05-01") is None
+    _with_redis(_MemoryRedis(), _run)
+
+
+def test_without_redis_everything_misses():
+    async def _run():
+        await store_versioned("hud", "5511999999999", 1, {"income": 1.0})
+        assert await get_versioned("hud", "5511999999999", 1) is None
+    _with_redis(None, _run)
+
+
+
+def test_cold_loads_fan_out_on_a_bounded_number_of_sessions():
+    opened, running, peak = [], 0, 0
+
+    class _Session:
+        async def __aenter__(self):
+            opened.append(self)
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    def query(value):
+        async def run(session):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return value
+        return run
+
+    results = asyncio.run(dashboard._gather_in_sessions(_Session, *(query(i) for i in range(5))))
+    assert results == [0, 1, 2, 3, 4]
+    assert len(opened) == peak == dashboard.MAX_FANOUT_SESSIONS
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,67 @@
+import sys
+import os
+import time
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import exc
+from backend.db.pool import PoolMetrics, _InstrumentedMixin
+
+
+class _FakePool:
+    """Stands in for a SQLAlchemy pool: a slow checkout, optionally timing out."""
+    fail = False
+
+    def connect(self):
+        time.sleep(0.02)
+        if self.fail:
+            raise exc.TimeoutError("QueuePool limit reached")
+        return "connection"
+
+    def status(self):
+        return "fake"
+
+    def size(self):
+        return 2
+
+    def checkedout(self):
+        return 1
+
+    def checkedin(self):
+        return 1
+
+    def overflow(self):
+        return -1
+
+
+def _pool():
+    return type("InstrumentedFake", (_InstrumentedMixin, _FakePool), {"metrics": PoolMetrics("test")})()
+
+
+def test_checkout_wait_is_recorded():
+    pool = _pool()
+    assert pool.connect() == "connection"
+    snap = pool.metrics.snapshot(pool)
+    assert snap["checkouts"] == 1
+    assert snap["avg_wait_ms"] >= 20
+    assert snap["in_use"] == 1 and snap["size"] == 2
+
+
+def test_timeouts_are_counted_and_reraised():
+    pool = _pool()
+    pool.fail = True
+    try:
+        pool.connect()
+        assert False, "expected TimeoutError"
+    except exc.TimeoutError:
+        pass
+    assert pool.metrics.timeouts == 1
+    assert pool.metrics.checkouts == 0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,61 @@
+import sys
+import os
+import asyncio
+import csv
+import io
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core import export
+
+Row = namedtuple("Row", [c.key for c in export.EXPORT_COLUMNS])
+
+
+async def _batches(total: int, size: int):
+    start = datetime(2024, 1, 1)
+    for offset in range(0, total, size):
+        yield [
+            Row(uuid.uuid4(), start + timedelta(days=i), f"Açaí {i}", "Lazer", i + 0.5, "EXPENSE", 1, 3, i % 2 == 0)
+            for i in range(offset, min(total, offset + size))
+        ]
+
+
+async def _collect(encoder, total: int, size: int) -> list[bytes]:
+    return [chunk async for chunk in encoder(_batches(total, size))]
+
+
+def test_csv_streams_one_chunk_per_batch():
+    chunks = asyncio.run(_collect(export._csv, 2500, 1000))
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+    assert rows[0] == export.HEADERS
+    assert len(rows) == 2501
+    assert rows[1][1:4] == ["2024-01-01", "Açaí 0", "Lazer"]
+    assert rows[1][6:] == ["1/3", "Cleared"]
+
+
+def test_csv_without_rows_still_has_header():
+    chunks = asyncio.run(_collect(export._csv, 0, 1000))
+    assert b"".join(chunks).decode("utf-8-sig").strip() == ",".join(export.HEADERS)
+
+
+def test_parquet_writes_a_row_group_per_batch():
+    if not export.HAS_PYARROW:
+        return
+    import pyarrow.parquet as pq
+    data = b"".join(asyncio.run(_collect(export._parquet, 2500, 1000)))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_rows == 2500
+    assert parquet.num_row_groups == 3
+    assert parquet.schema_arrow.field("amount").type.bit_width == 64
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
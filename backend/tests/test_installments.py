@@ -0,0 +1,68 @@
+import sys
+import os
+from datetime import datetime
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core.installments import installment_dates, invoice_due_dates, plan_installments, split_amount
+
+
+def test_split_amount_is_exact_to_the_cent():
+    assert split_amount(100, 3) == [33.34, 33.33, 33.33]
+    assert split_amount(0.05, 10) == [0.01] * 5 + [0.0] * 5
+    for amount, count in [(1999.99, 24), (10.01, 7), (123456.78, 18)]:
+        parts = split_amount(amount, count)
+        assert len(parts) == count
+        assert round(sum(parts), 2) == amount
+        assert max(parts) - min(parts) <= 0.0100001
+
+
+def test_dates_are_monthly_from_purchase():
+    purchase = datetime(2024, 1, 31, 15, 30)
+    assert installment_dates(purchase, 3) == [
+        datetime(2024, 1, 31, 15, 30), datetime(2024, 2, 29, 15, 30), datetime(2024, 3, 31, 15, 30),
+    ]
+
+
+def test_due_dates_follow_card_invoices():
+    assert invoice_due_dates(datetime(2024, 5, 2), 2) == [None, None]
+    # Closes on the 3rd, due on the 10th: before closing -> this month's invoice
+    assert invoice_due_dates(datetime(2024, 5, 2), 2, closing_day=3, due_day=10) == [
+        datetime(2024, 5, 10), datetime(2024, 6, 10),
+    ]
+    # On/after closing -> next invoice
+    assert invoice_due_dates(datetime(2024, 5, 3), 2, closing_day=3, due_day=10) == [
+        datetime(2024, 6, 10), datetime(2024, 7, 10),
+    ]
+    # Due day after the closing day -> same month as the closing, clamped to short months
+    assert invoice_due_dates(datetime(2024, 12, 20), 3, closing_day=25, due_day=31) == [
+        datetime(2024, 12, 31), datetime(2025, 1, 31), datetime(2025, 2, 28),
+    ]
+    # Due day before the closing day -> paid the month after closing
+    assert invoice_due_dates(datetime(2024, 12, 26), 2, closing_day=25, due_day=5) == [
+        datetime(2025, 2, 5), datetime(2025, 3, 5),
+    ]
+
+
+def test_plan_shares_group_and_numbers_installments():
+    rows = plan_installments("5511999999999", 100, 3, "TV", "Compras", datetime(2024, 5, 2))
+    assert [row["description"] for row in rows] == ["TV (1/3)", "TV (2/3)", "TV (3/3)"]
+    assert [row["installment_number"] for row in rows] == [1, 2, 3]
+    assert len({row["group_id"] for row in rows}) == 1
+    assert all("is_cleared" not in row for row in rows)
+
+
+def test_card_installments_keep_the_purchase_date():
+    # The first installment counts in the purchase month, like a single purchase on the card
+    rows = plan_installments("5511999999999", 1200, 12, "TV", "Compras", datetime(2024, 5, 20, 18),
+                             closing_day=15, due_day=25)
+    assert [row["date"] for row in rows[:2]] == [datetime(2024, 5, 20, 18), datetime(2024, 6, 20, 18)]
+    assert [row["due_date"] for row in rows[:2]] == [datetime(2024, 6, 25), datetime(2024, 7, 25)]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
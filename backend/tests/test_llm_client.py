@@ -0,0 +1,70 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core.llm import INTENT_CHITCHAT, INTENT_EDIT, INTENT_LOG, INTENT_QUESTION, LLMClient, classify_intent
+from backend.tests.fake_vllm import FakeConfig, FakeVLLM, run_in_thread
+
+_fake, _server = None, None
+
+
+def _client(**config) -> LLMClient:
+    """LLMClient pointed at a shared in-process fake vLLM, reconfigured per test."""
+    global _fake, _server
+    if _server is None:
+        _fake, _server = run_in_thread(FakeVLLM(), port=8012)
+    _fake.config = FakeConfig()
+    _fake.config.update(config)
+    client = LLMClient()
+    client.base_url = client.router_base_url = "http://127.0.0.1:8012/v1"
+    return client
+
+
+def test_process_message_returns_scripted_content():
+    client = _client()
+    content = asyncio.run(client.process_message("gastei 50 no almoço"))
+    assert json.loads(content)["action"] == "log_transaction"
+
+
+def test_route_message_uses_cheap_tier_for_chitchat():
+    client = _client(rules=[{"pattern": "assistente financeiro pessoal simpático", "response": '{"action": "chat", "reply_text": "Oi!"}'}])
+    content = asyncio.run(client.route_message("oi"))
+    assert json.loads(content)["reply_text"] == "Oi!"
+    assert client.router_stats.snapshot()["chitchat"]["calls"] == 1
+
+
+def test_stream_chat_completion_yields_all_tokens():
+    client = _client(rules=[{"pattern": ".", "response": "linha um\nlinha dois"}])
+
+    async def collect():
+        return "".join([d async for d in client.stream_chat_completion([{"role": "user", "content": "x"}])])
+
+    assert asyncio.run(collect()) == "linha um\nlinha dois"
+
+
+def test_server_error_maps_to_chat_fallback():
+    client = _client(error_rate=1.0)
+    content = asyncio.run(client.process_message("gastei 50"))
+    assert json.loads(content)["action"] == "chat"
+
+
+
+def test_classify_intent_keeps_amounts_on_the_full_prompt():
+    for message in ("me pagaram 200 de aluguel", "gastei 50 no mercado, ok?", "paguei 30 de uber?",
+                    "por 30 reais comprei pão", "quanto gastei no mercado?"):
+        assert classify_intent(message) == INTENT_LOG, message
+    assert classify_intent("quanto tenho de saldo?") == INTENT_QUESTION
+    assert classify_intent("me mostra o extrato") == INTENT_QUESTION
+    assert classify_intent("muda o último pra 40") == INTENT_EDIT
+    assert classify_intent("bom dia!") == INTENT_CHITCHAT
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,58 @@
+import sys
+import os
+import tempfile
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.db.migrate import BASELINE_BEFORE, Migration, _plan, load_migrations, split_statements
+
+
+def test_repo_migrations_load_in_filename_order():
+    names = [m.filename for m in load_migrations()]
+    assert names == sorted(names)
+    assert "007_recalculate_all_balances.sql" in names
+    # Hand-applied legacy files are exactly the ones before the baseline cut
+    assert all(n >= BASELINE_BEFORE for n in names if n.startswith(("006", "007", "015")))
+    assert all(n < BASELINE_BEFORE for n in names if n.startswith("001"))
+
+
+def test_plan_splits_pending_and_changed():
+    a, b, c = Migration("001_a.sql", "SELECT 1;"), Migration("002_b.sql", "SELECT 2;"), Migration("003_c.sql", "SELECT 3;")
+    applied = {"001_a.sql": a.checksum, "002_b.sql": "stale-checksum"}
+    pending, changed = _plan([a, b, c], applied)
+    assert [m.filename for m in pending] == ["003_c.sql"]
+    assert [m.filename for m in changed] == ["002_b.sql"]
+
+
+def test_no_transaction_marker_and_non_sql_files():
+    with tempfile.TemporaryDirectory() as d:
+        with open(os.path.join(d, "001_idx.sql"), "w") as f:
+            f.write("-- migrate:no-transaction\nCREATE INDEX CONCURRENTLY x ON t (c);\n")
+        with open(os.path.join(d, "README.md"), "w") as f:
+            f.write("not a migration")
+        migrations = load_migrations(d)
+    assert [m.filename for m in migrations] == ["001_idx.sql"]
+    assert not migrations[0].transactional
+
+
+def test_split_statements_respects_quotes_and_dollar_bodies():
+    sql = """
+        -- header; not a statement
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS i ON t (c);
+        DO $$ BEGIN PERFORM 1; END $$;
+        SELECT 'a;b', 'it''s';
+        /* trailing; comment */
+    """
+    statements = split_statements(sql)
+    assert len(statements) == 3
+    assert statements[0].endswith("ON t (c)")
+    assert statements[1] == "DO $$ BEGIN PERFORM 1; END $$"
+    assert statements[2] == "SELECT 'a;b', 'it''s'"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
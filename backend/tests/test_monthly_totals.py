@@ -0,0 +1,74 @@
+"""
+Checks that the monthly_category_totals trigger (migration 018) tracks every kind of write.
+Uses the same disposable Postgres as test_query_plans.py (TEST_DATABASE_URL; skipped otherwise).
+"""
+import sys
+import os
+import asyncio
+import uuid
+from datetime import datetime
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.analytics import monthly_totals
+from backend.workers.monthly_totals import DRIFT_SQL
+from test_query_plans import PHONE, _engine, _prepare
+
+
+async def _drift(session) -> list:
+    result = await session.execute(text(DRIFT_SQL), {"phone": PHONE})
+    return result.fetchall()
+
+
+def test_trigger_tracks_inserts_updates_and_deletes():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with AsyncSession(engine) as session:
+                assert await _drift(session) == []
+                month = datetime(2031, 5, 10)
+                tx_id = uuid.uuid4()
+                account_id = await session.scalar(
+                    text("SELECT id FROM accounts WHERE user_phone = :phone AND type = 'CREDIT'"), {"phone": PHONE}
+                )
+                steps = [
+                    ("INSERT INTO transactions (id, user_phone, account_id, type, amount, category, date, is_cleared) "
+                     "VALUES (:id, :phone, :account, 'EXPENSE', 10.10, 'Rollup', :date, FALSE)"),
+                    "UPDATE transactions SET amount = 20.25, category = 'Rollup 2' WHERE id = :id",
+                    "UPDATE transactions SET is_cleared = TRUE, date = date + INTERVAL '1 month' WHERE id = :id",
+                    "UPDATE transactions SET description = 'only text' WHERE id = :id",
+                    "UPDATE transactions SET account_id = NULL, type = 'INCOME' WHERE id = :id",
+                    "UPDATE transactions SET account_id = :account WHERE id = :id",
+                    "UPDATE accounts SET type = 'CHECKING' WHERE id = :account",
+                    "UPDATE accounts SET type = 'CREDIT' WHERE id = :account",
+                    "DELETE FROM transactions WHERE id = :id",
+                ]
+                for sql in steps:
+                    await session.execute(text(sql), {"id": tx_id, "phone": PHONE, "account": account_id, "date": month})
+                    assert await _drift(session) == [], sql
+
+                # Readers see the same numbers as the raw aggregate
+                await session.execute(
+                    text("INSERT INTO transactions (id, user_phone, account_id, type, amount, category, date) "
+                         "VALUES (:id, :phone, :account, 'EXPENSE', 99.99, 'Rollup', :date)"),
+                    {"id": uuid.uuid4(), "phone": PHONE, "account": account_id, "date": month}
+                )
+                by_category = await monthly_totals.totals_by_category(session, PHONE, month)
+                assert by_category == {"Rollup": 99.99}
+                assert await monthly_totals.sum_since(session, PHONE, month, account_type="CREDIT") == 99.99
+                await session.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
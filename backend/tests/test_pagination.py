@@ -0,0 +1,33 @@
+import sys
+import os
+import uuid
+from datetime import datetime
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core.repository import decode_cursor, encode_cursor
+from backend.db.models import Transaction
+
+
+def test_cursor_round_trip_is_opaque():
+    tx = Transaction(id=uuid.uuid4(), date=datetime(2024, 3, 9, 14, 30, 5, 120))
+    cursor = encode_cursor(tx)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == (tx.date, tx.id)
+
+
+def test_malformed_cursor_raises_value_error():
+    for bad in ["not-a-cursor", "", "eyJkIjoxfQ", encode_cursor(Transaction(id=uuid.uuid4(), date=datetime.now()))[:-4]]:
+        try:
+            decode_cursor(bad)
+            assert False, f"accepted {bad!r}"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
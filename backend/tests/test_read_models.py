@@ -0,0 +1,45 @@
+import sys
+import os
+import uuid
+from datetime import datetime
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import orjson
+from backend.core.read_models import TRANSACTION_ITEM_COLUMNS, TransactionItem
+from backend.core.repository import decode_cursor, encode_cursor
+
+
+def _row(**overrides) -> tuple:
+    values = {
+        "id": uuid.uuid4(), "amount": 42.5, "category": "Lazer", "description": "Cinema",
+        "type": "EXPENSE", "account_id": None, "date": datetime(2024, 3, 9, 14, 30, 5),
+        "installment_number": 2, "installments_count": 10, "is_cleared": False,
+    }
+    values.update(overrides)
+    return tuple(values[column.key] for column in TRANSACTION_ITEM_COLUMNS)
+
+
+def test_item_serializes_like_the_list_payload():
+    row = _row()
+    item = TransactionItem.from_row(row)
+    assert not hasattr(item, "__dict__")
+    assert orjson.loads(orjson.dumps(item)) == {
+        "id": str(row[0]), "amount": 42.5, "category": "Lazer", "description": "Cinema",
+        "type": "EXPENSE", "account_id": None, "date": "2024-03-09T14:30:05",
+        "is_installment": True, "installment_info": "2/10", "is_cleared": False,
+    }
+
+
+def test_single_installment_and_cursor():
+    item = TransactionItem.from_row(_row(installment_number=1, installments_count=1))
+    assert item.is_installment and item.installment_info is None
+    assert decode_cursor(encode_cursor(item)) == (item.date, item.id)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,103 @@
+"""
+Checks read routing between the replica and the primary (backend/db/replica.py):
+replica only when configured, fresh enough and the user hasn't just written.
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core import clients
+from backend.core.config import settings
+from backend.db import replica
+from backend.db import session as db_session
+
+PHONE = "5511900000996"
+
+
+def _route(replica_sessions, lag: float) -> str:
+    """Which database read_session_factory picks, with the given replica setup and a cached lag."""
+    async def _run():
+        originals = (db_session.ReplicaSessionLocal, replica._lag, clients.redis_client)
+        db_session.ReplicaSessionLocal = replica_sessions
+        replica._lag = (time.monotonic(), lag)
+        clients.redis_client = None
+        try:
+            new_session = await replica.read_session_factory(PHONE)
+            session = new_session()
+            await session.close()
+            return "replica" if session.info.get("replica") else "primary"
+        finally:
+            db_session.ReplicaSessionLocal, replica._lag, clients.redis_client = originals
+    return asyncio.run(_run())
+
+
+class _FakeReplicaSession:
+    def __init__(self, info):
+        self.info = {**info, "replica": True}
+
+    async def close(self):
+        pass
+
+
+def test_reads_use_the_replica_only_when_configured_and_fresh():
+    replica._recent_writes.pop(PHONE, None)
+    assert _route(None, 0.0) == "primary"
+    assert _route(_FakeReplicaSession, 0.0) == "replica"
+    assert _route(_FakeReplicaSession, settings.REPLICA_MAX_LAG_SECONDS + 1) == "primary"
+
+
+def test_own_writes_stick_to_the_primary():
+    replica.note_write(PHONE)
+    try:
+        assert _route(_FakeReplicaSession, 0.0) == "primary"
+        replica._recent_writes[PHONE] = time.monotonic() - 1
+        assert _route(_FakeReplicaSession, 0.0) == "replica"
+    finally:
+        replica._recent_writes.pop(PHONE, None)
+
+
+
+class _FakeReplicaEngine:
+    """connect() yields a connection whose LAG_SQL result is fixed."""
+
+    def __init__(self, lag):
+        self.lag = lag
+
+    def connect(self):
+        engine = self
+
+        class _Conn:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def scalar(self, statement):
+                return engine.lag
+
+        return _Conn()
+
+
+def test_stopped_wal_receiver_counts_as_infinite_lag():
+    async def _lag(value):
+        originals = (db_session.replica_engine, replica._lag)
+        db_session.replica_engine, replica._lag = _FakeReplicaEngine(value), (0.0, float("inf"))
+        try:
+            return await replica.replica_lag()
+        finally:
+            db_session.replica_engine, replica._lag = originals
+
+    assert asyncio.run(_lag(0)) == 0.0
+    assert asyncio.run(_lag(None)) == float("inf")
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
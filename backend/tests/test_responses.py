@@ -0,0 +1,89 @@
+import sys
+import os
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from backend.api.responses import CompressionMiddleware, FastJSONResponse, FastJSONRoute
+from backend.core.read_models import SeriesPoint
+
+TX_ID = uuid.uuid4()
+
+
+class Item(BaseModel):
+    name: str
+
+
+def _client() -> TestClient:
+    router = APIRouter(prefix="/t", route_class=FastJSONRoute)
+
+    @router.get("/mixed")
+    async def mixed():
+        return {"id": TX_ID, "at": datetime(2024, 3, 9, 14, 30), "amount": Decimal("10.50"),
+                "points": [SeriesPoint(datetime(2024, 3, 9).date(), 1.5)], "item": Item(name="x")}
+
+    @router.post("/created", status_code=201)
+    def created():
+        return {"ok": True}
+
+    @router.delete("/gone", status_code=204)
+    async def gone():
+        return None
+
+    @router.get("/validated", response_model=Item)
+    async def validated():
+        return {"name": "kept", "secret": "dropped"}
+
+    @router.get("/big")
+    async def big():
+        return {"rows": [{"description": "Mercado Extra", "amount": 12.5}] * 200}
+
+    @router.get("/stream")
+    async def stream():
+        return StreamingResponse(iter(["data: x\n\n"] * 200), media_type="text/event-stream")
+
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_endpoint_results_are_serialized_by_orjson():
+    client = _client()
+    assert client.get("/t/mixed").json() == {
+        "id": str(TX_ID), "at": "2024-03-09T14:30:00", "amount": 10.5,
+        "points": [{"date": "2024-03-09", "value": 1.5}], "item": {"name": "x"},
+    }
+    response = client.post("/t/created")
+    assert (response.status_code, response.json()) == (201, {"ok": True})
+    response = client.delete("/t/gone")
+    assert (response.status_code, response.content) == (204, b"")
+    assert client.get("/t/validated").json() == {"name": "kept"}
+
+
+def test_large_bodies_are_gzipped_except_streams():
+    client = _client()
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get("/t/big", headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["rows"]) == 200
+    assert "content-encoding" not in client.get("/t/created", headers=headers).headers
+    response = client.get("/t/stream", headers=headers)
+    assert "content-encoding" not in response.headers
+    assert response.text == "data: x\n\n" * 200
+    # Nothing compressed without Accept-Encoding
+    assert "content-encoding" not in client.get("/t/big", headers={"Accept-Encoding": "identity"}).headers
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
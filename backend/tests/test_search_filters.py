@@ -0,0 +1,41 @@
+import sys
+import os
+from datetime import date
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.core.search_filters import parse_search_query
+
+TODAY = date(2024, 3, 15)
+
+
+def test_amount_words_only_match_whole_words():
+    filters = parse_search_query("chocolate 30", TODAY)
+    assert filters["keywords"] == ["chocolate", "30"]
+    assert filters["max_amount"] is None
+    filters = parse_search_query("gastos ate 30 reais", TODAY)
+    assert (filters["type"], filters["max_amount"], filters["keywords"]) == ("EXPENSE", 30.0, None)
+    filters = parse_search_query("uber acima de R$ 1.500,50", TODAY)
+    assert (filters["min_amount"], filters["keywords"]) == (1500.5, ["uber"])
+    assert parse_search_query("mercado >100", TODAY)["min_amount"] == 100.0
+    filters = parse_search_query("entre 10 e 20", TODAY)
+    assert (filters["min_amount"], filters["max_amount"]) == (10.0, 20.0)
+
+
+def test_time_expressions_and_fallback():
+    filters = parse_search_query("comida mês passado", TODAY)
+    assert (filters["start_date"], filters["end_date"]) == ("2024-02-01", "2024-02-29T23:59:59")
+    assert "ifood" in filters["keywords"]
+    filters = parse_search_query("entradas nos últimos 7 dias", TODAY)
+    assert (filters["type"], filters["start_date"]) == ("INCOME", "2024-03-08")
+    assert parse_search_query("dezembro", TODAY)["start_date"] == "2023-12-01"
+    # Too many free words: left to the LLM
+    assert parse_search_query("presente de aniversario da minha tia querida", TODAY) is None
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
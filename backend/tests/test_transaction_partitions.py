@@ -0,0 +1,172 @@
+"""
+Checks the monthly partitions of transactions (migration 024): range queries only scan the
+partitions of their months, by-id statements only their row's partition (transaction_ids), ids stay
+unique across partitions, and rows written past the partition horizon move out of the default
+partition without touching balances or rollups.
+Uses the same disposable Postgres as test_query_plans.py (TEST_DATABASE_URL; skipped otherwise).
+"""
+import sys
+import os
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.append(os.path.dirname(__file__))
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.repository import TransactionRepository
+from test_query_plans import PHONE, _captured_plans, _engine, _prepare
+
+
+def _scanned_relations(node: dict) -> set[str]:
+    found = {node["Relation Name"]} if "Relation Name" in node else set()
+    for child in node.get("Plans", []):
+        found |= _scanned_relations(child)
+    return found
+
+
+def _partitions(start: datetime, end: datetime) -> set[str]:
+    """Partition names of the months from start to end (inclusive)."""
+    names, month = set(), datetime(start.year, start.month, 1)
+    while month <= end:
+        names.add(f"transactions_p{month:%Y_%m}")
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return names
+
+
+def test_partitions_cover_the_horizon():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with engine.connect() as conn:
+                kind = await conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = 'transactions'::regclass"))
+                result = await conn.execute(text(
+                    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = 'transactions'::regclass"
+                ))
+                names = {row[0] for row in result.fetchall()}
+        finally:
+            await engine.dispose()
+        now = datetime.now()
+        assert kind == "p"
+        assert "transactions_default" in names
+        # Seeded history (540 days back) and 36 months ahead
+        assert _partitions(now - timedelta(days=500), now + timedelta(days=30 * 35)) <= names
+    asyncio.run(_run())
+
+
+def test_by_id_statements_prune_to_their_partition_and_ids_stay_unique():
+    # A month inside the partition horizon
+    tx_id, date = uuid.uuid4(), (datetime.now() + timedelta(days=365)).replace(day=14, hour=0, minute=0, second=0, microsecond=0)
+
+    async def call(session):
+        assert await TransactionRepository(session).get_description(PHONE, tx_id) == "by id"
+
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            insert = text("INSERT INTO transactions (id, user_phone, type, amount, description, date) "
+                          "VALUES (:id, :phone, 'EXPENSE', 1.0, 'by id', :date)")
+            async with AsyncSession(engine) as session:
+                await session.execute(insert, {"id": tx_id, "phone": PHONE, "date": date})
+                await session.commit()
+            try:
+                plans = await _captured_plans(engine, call)
+                async with AsyncSession(engine) as session:
+                    with pytest.raises(IntegrityError):
+                        await session.execute(insert, {"id": tx_id, "phone": PHONE, "date": date + timedelta(days=60)})
+                    await session.rollback()
+                    # A date change moves the row and its transaction_ids entry
+                    await TransactionRepository(session).update_transaction(PHONE, str(tx_id), date=date + timedelta(days=60))
+                    moved = await session.scalar(text("SELECT date FROM transaction_ids WHERE id = :id"), {"id": tx_id})
+                    assert moved == date + timedelta(days=60)
+            finally:
+                async with AsyncSession(engine) as session:
+                    await TransactionRepository(session).delete_transactions(PHONE, [str(tx_id)])
+                    assert await session.scalar(
+                        text("SELECT COUNT(*) FROM transaction_ids WHERE id = :id"), {"id": tx_id}
+                    ) == 0
+        finally:
+            await engine.dispose()
+        for statement, plan in plans:
+            scanned = {name for name in _scanned_relations(plan) if name.startswith("transactions")}
+            assert scanned == _partitions(date, date), f"{statement}\nscanned {sorted(scanned)}"
+    asyncio.run(_run())
+
+
+def test_date_ranges_prune_partitions():
+    async def call(session):
+        repo = TransactionRepository(session)
+        now = datetime.now()
+        await repo.get_transactions(PHONE, start_date=datetime(now.year, now.month, 1), end_date=now)
+
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            plans = await _captured_plans(engine, call)
+        finally:
+            await engine.dispose()
+        now = datetime.now()
+        for statement, plan in plans:
+            scanned = {name for name in _scanned_relations(plan) if name.startswith("transactions")}
+            assert scanned == _partitions(now, now), f"{statement}\nscanned {sorted(scanned)}"
+    asyncio.run(_run())
+
+
+def test_rows_past_the_horizon_move_out_of_the_default_partition():
+    async def _run():
+        engine = _engine()
+        try:
+            await _prepare(engine)
+            async with AsyncSession(engine) as session:
+                account_id = await session.scalar(
+                    text("SELECT id FROM accounts WHERE user_phone = :phone AND type = 'CHECKING'"), {"phone": PHONE}
+                )
+                balance = await session.scalar(text("SELECT current_balance FROM accounts WHERE id = :id"), {"id": account_id})
+                tx_id = uuid.uuid4()
+                await session.execute(
+                    text("INSERT INTO transactions (id, user_phone, account_id, type, amount, category, date, is_cleared) "
+                         "VALUES (:id, :phone, :account, 'EXPENSE', 10, 'Parcela', '2090-01-15', TRUE)"),
+                    {"id": tx_id, "phone": PHONE, "account": account_id},
+                )
+                where = {"id": tx_id}
+                assert await session.scalar(
+                    text("SELECT tableoid::regclass::text FROM transactions WHERE id = :id"), where
+                ) == "transactions_default"
+
+                assert await session.scalar(text("SELECT ensure_transaction_partitions()")) >= 1
+                assert await session.scalar(
+                    text("SELECT tableoid::regclass::text FROM transactions WHERE id = :id"), where
+                ) == "transactions_p2090_01"
+                # The move is invisible to the balance and rollup triggers
+                assert await session.scalar(
+                    text("SELECT current_balance FROM accounts WHERE id = :id"), {"id": account_id}
+                ) == balance - 10
+                assert await session.scalar(
+                    text("SELECT tx_count FROM monthly_category_totals WHERE user_phone = :phone "
+                         "AND month = '2090-01-01' AND category = 'Parcela'"), {"phone": PHONE}
+                ) == 1
+
+                await session.execute(text("DELETE FROM transactions WHERE id = :id"), where)
+                assert await session.scalar(
+                    text("SELECT current_balance FROM accounts WHERE id = :id"), {"id": account_id}
+                ) == balance
+                await session.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
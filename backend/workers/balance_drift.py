@@ -0,0 +1,161 @@
+"""
+Balance Drift Worker
+The trg_update_balance_* triggers keep accounts.current_balance current incrementally, so writes
+no longer recompute balances. This job checks stored balances against a fresh aggregate of
+transactions, a batch of users at a time, reports mismatches and repairs the users that drifted.
+
+    python -m backend.workers.balance_drift [--repair] [--user PHONE]
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.config import settings
+from backend.core.ledger import LedgerService
+from backend.db.session import background_session, job_lock
+
+logger = logging.getLogger(__name__)
+
+# Differences under half a cent are float noise (balances are double precision), not drift
+BALANCE_TOLERANCE = 0.005
+
+USER_BATCH_SQL = """
+    SELECT DISTINCT user_phone
+    FROM accounts
+    WHERE user_phone > :after
+    ORDER BY user_phone
+    LIMIT :limit
+"""
+
+# Accounts whose current_balance disagrees with initial_balance + cleared movements.
+# One grouped pass over the batch's transactions instead of two subqueries per account.
+BALANCE_DRIFT_SQL = """
+    WITH batch AS (
+        SELECT id, user_phone, name, initial_balance, current_balance
+        FROM accounts
+        WHERE user_phone = ANY(CAST(:phones AS VARCHAR[]))
+    ),
+    movements AS (
+        SELECT t.account_id,
+               CASE
+                   WHEN t.type = 'INCOME' THEN t.amount
+                   WHEN t.type IN ('EXPENSE', 'TRANSFER') THEN -t.amount
+                   ELSE 0
+               END AS delta
+        FROM transactions t
+        JOIN batch b ON b.id = t.account_id
+        WHERE t.is_cleared = TRUE
+        UNION ALL
+        SELECT t.destination_account_id, t.amount
+        FROM transactions t
+        WHERE t.user_phone = ANY(CAST(:phones AS VARCHAR[]))
+          AND t.type = 'TRANSFER' AND t.is_cleared = TRUE
+          AND t.destination_account_id IS NOT NULL
+    ),
+    expected AS (
+        SELECT account_id, SUM(delta) AS delta
+        FROM movements
+        GROUP BY account_id
+    )
+    SELECT b.user_phone, b.id AS account_id, b.name,
+           b.current_balance AS actual_balance,
+           b.initial_balance + COALESCE(e.delta, 0) AS expected_balance
+    FROM batch b
+    LEFT JOIN expected e ON e.account_id = b.id
+    WHERE ABS(COALESCE(b.current_balance, 0) - (COALESCE(b.initial_balance, 0) + COALESCE(e.delta, 0))) > :tolerance
+    ORDER BY b.user_phone, b.name
+"""
+
+
+async def find_balance_drift(session: AsyncSession, phones: list[str]) -> list[dict]:
+    """Accounts of the given users whose stored balance disagrees with their transactions."""
+    result = await session.execute(
+        text(BALANCE_DRIFT_SQL), {"phones": list(phones), "tolerance": BALANCE_TOLERANCE}
+    )
+    return [dict(row._mapping) for row in result.fetchall()]
+
+
+async def repair_balances(session: AsyncSession, user_phone: str):
+    """
+    Recomputes one user's balances. The accounts are locked first: a concurrent write's trigger
+    waits for the lock and then applies its delta on top of the recomputed value.
+    """
+    await session.execute(
+        text("SELECT id FROM accounts WHERE user_phone = :phone FOR UPDATE"), {"phone": user_phone}
+    )
+    await LedgerService(session).recalculate_balances(user_phone)
+
+
+async def verify_balances(user_phone: str = None, repair: bool = False,
+                          batch_size: int = None) -> list[dict]:
+    """
+    Checks every user's balances (or one user's) in batches and returns the drifted accounts.
+    With repair=True, users with drift are recomputed.
+    """
+    batch_size = batch_size or settings.BALANCE_DRIFT_BATCH_USERS
+    drift, after, checked = [], "", 0
+    while True:
+        async with background_session() as session:
+            if user_phone:
+                phones = [user_phone]
+            else:
+                result = await session.execute(text(USER_BATCH_SQL), {"after": after, "limit": batch_size})
+                phones = [row[0] for row in result.fetchall()]
+            if not phones:
+                break
+            batch_drift = await find_balance_drift(session, phones)
+
+            if repair:
+                for phone in sorted({row["user_phone"] for row in batch_drift}):
+                    await repair_balances(session, phone)
+                await session.commit()
+
+        drift.extend(batch_drift)
+        checked += len(phones)
+        if user_phone or len(phones) < batch_size:
+            break
+        after = phones[-1]
+
+    if drift:
+        users = len({row["user_phone"] for row in drift})
+        logger.warning(f"⚠️ Balance drift: {len(drift)} accounts across {users} users "
+                       f"({checked} users checked){', repaired' if repair else ''}")
+    else:
+        logger.info(f"✅ Account balances match transactions ({checked} users checked)")
+    return drift
+
+
+async def run_balance_drift_checks():
+    """
+    Background loop (asyncio.create_task): verify and repair every BALANCE_DRIFT_INTERVAL_MINUTES.
+    Sleeps first, so boots and reloads don't scan transactions, and one process runs each cycle.
+    """
+    while True:
+        await asyncio.sleep(settings.BALANCE_DRIFT_INTERVAL_MINUTES * 60)
+        try:
+            async with job_lock("balance_drift_check") as acquired:
+                if acquired:
+                    await verify_balances(repair=True)
+        except Exception as e:
+            logger.error(f"Balance drift check failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Account balance drift check")
+    parser.add_argument("--repair", action="store_true", help="recompute balances of users that drifted")
+    parser.add_argument("--user", help="limit to one user_phone")
+    parser.add_argument("--batch-size", type=int, help="users per batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    drift = asyncio.run(verify_balances(args.user, repair=args.repair, batch_size=args.batch_size))
+    for row in drift:
+        print(f"{row['user_phone']} {row['name']} ({row['account_id']}): "
+              f"stored {row['actual_balance']:.2f}, expected {row['expected_balance']:.2f}")
+    if drift and not args.repair:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ Run daily; only inserts missing dates (idempotent).
 import logging
 from datetime import date, timedelta
 from sqlalchemy import text
-from backend.db.session import AsyncSessionLocal
+from backend.db.session import background_session
 
 logger = logging.getLogger(__name__)
 
@@ -99,7 +99,7 @@ async def _upsert_series(session, benchmark: str, series: list[tuple[date, float
 
 async def fetch_all_benchmarks():
     """Fetches IBOV, SP500, and CDI data and stores missing dates."""
-    async with AsyncSessionLocal() as session:
+    async with background_session() as session:
         # IBOV
         ibov = await _fetch_yfinance_history("^BVSP", TWO_YEARS_AGO)
         await _upsert_series(session, "IBOV", ibov)
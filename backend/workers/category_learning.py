@@ -0,0 +1,88 @@
+"""
+Category Learning Worker
+Feeds confirmed transactions into category_learning (see backend/core/categorizer.py):
+per-transaction learning off the request path, plus a batched backfill from history.
+
+    python -m backend.workers.category_learning --backfill [--batch-size 256]
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import text
+from backend.core import clients
+from backend.core.categorizer import CategoryEmbedder, CategorySuggester
+from backend.db.session import background_session
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 256
+
+
+async def learn_from_transaction(user_phone: str, description: str, category: str):
+    """
+    Records a confirmed (description, category) pair. Meant to run via asyncio.create_task
+    so embedding never delays the reply; failures are logged and dropped.
+    """
+    embedder = clients.category_embedder
+    if not embedder or not embedder.available or not description or not category:
+        return
+    try:
+        async with background_session(user_phone) as session:
+            await CategorySuggester(session, embedder).learn(user_phone, description, category)
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Failed to learn category for {user_phone}: {e}")
+
+
+async def backfill_category_learning(embedder: CategoryEmbedder, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Embeds every user's historical (description, category) pairs in batches.
+    Idempotent for new pairs; re-running adds hits to pairs already learned.
+    """
+    async with background_session() as session:
+        result = await session.execute(text("SELECT DISTINCT user_phone FROM transactions"))
+        phones = [row[0] for row in result.fetchall()]
+
+    total = 0
+    for phone in phones:
+        async with background_session(phone) as session:
+            result = await session.execute(
+                text("""
+                    SELECT description, category
+                    FROM transactions
+                    WHERE user_phone = :phone
+                      AND description IS NOT NULL AND description <> ''
+                      AND category IS NOT NULL AND category <> ''
+                """),
+                {"phone": phone}
+            )
+            pairs = [(row[0], row[1]) for row in result.fetchall()]
+            suggester = CategorySuggester(session, embedder)
+            learned = 0
+            for start in range(0, len(pairs), batch_size):
+                learned += await suggester.learn_many(phone, pairs[start:start + batch_size])
+            await session.commit()
+        total += learned
+        logger.info(f"🏷️ Category learning backfill: {learned} pairs for {phone}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Category learning maintenance")
+    parser.add_argument("--backfill", action="store_true", help="embed historical transactions")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.backfill:
+        parser.print_help()
+        return
+    embedder = CategoryEmbedder()
+    if not embedder.available:
+        raise SystemExit("Embedding model unavailable (is sentence-transformers installed?)")
+    total = asyncio.run(backfill_category_learning(embedder, args.batch_size))
+    print(f"Learned {total} (description, category) pairs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Insights Cache
+Stores the LLM dashboard insights per user in Redis, keyed by a fingerprint of the
+user's transactions (count, max(created_at) and a checksum of the analyzed rows).
+Insights are served from cache until the fingerprint changes; stale entries are
+refreshed in the background, off the request path.
+"""
+import json
+import logging
+from datetime import datetime
+from backend.core import clients
+from backend.core.repository import TransactionRepository
+from backend.db.session import background_session
+
+logger = logging.getLogger(__name__)
+
+INSIGHTS_TX_LIMIT = 50
+INSIGHTS_CACHE_TTL = 7 * 86400
+REFRESH_LOCK_TTL = 120
+
+
+def _cache_key(user_phone: str) -> str:
+    return f"insights:{user_phone}"
+
+
+def format_insights_context(recent_txs) -> str:
+    """Formats recent transactions as the LLM context used by the insights endpoints."""
+    context = "Histórico Financeiro Recente:\n"
+    for tx in recent_txs:
+        d_str = tx.date.strftime('%d/%m') if tx.date else ""
+        context += f"- {d_str}: R$ {tx.amount} ({tx.category}) - {tx.description}\n"
+    return context
+
+
+async def build_insights(recent_txs) -> list[str]:
+    """
+    Asks the LLM for 3 insights about the given transactions.
+    Raises on LLM/parsing failure so callers never cache a fallback message.
+    """
+    prompt = f"""
+    Analise os seguintes dados financeiros do usuário e forneça 3 insights curtos e acionáveis.
+    Foque em: Padrões de gastos, categorias dominantes e dicas de economia.
+    Seja direto, amigável e use emojis.
+
+    {format_insights_context(recent_txs)}
+
+    Retorne APENAS um JSON com a chave "insights" contendo uma lista de strings.
+    Exemplo: {{ "insights": ["Gasto alto em Uber", "Parabéns por economizar", "Sugestão..."] }}
+    """
+
+    response = await clients.llm_client.process_message(prompt, context_data="")
+    logger.info(f"LLM Response received: {response[:100]}...")
+
+    # Simple cleanup if LLM returns markdown code blocks
+    clean_response = response.replace("```json", "").replace("```", "").strip()
+    data = json.loads(clean_response)
+
+    if not isinstance(data, dict) or not isinstance(data.get("insights"), list):
+        raise ValueError(f"LLM response missing 'insights' key: {data}")
+    return data["insights"]
+
+
+async def get_cached_insights(user_phone: str) -> dict | None:
+    """Returns {"fingerprint", "insights", "generated_at"} or None."""
+    if not clients.redis_client:
+        return None
+    try:
+        raw = await clients.redis_client.get(_cache_key(user_phone))
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        logger.warning(f"Insights cache read failed for {user_phone}: {e}")
+        return None
+
+
+async def store_insights(user_phone: str, fingerprint: str, insights: list[str]):
+    if not clients.redis_client or not insights:
+        return
+    entry = {
+        "fingerprint": fingerprint,
+        "insights": insights,
+        "generated_at": datetime.utcnow().isoformat(),
+    }
+    try:
+        await clients.redis_client.set(_cache_key(user_phone), json.dumps(entry), ex=INSIGHTS_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Insights cache write failed for {user_phone}: {e}")
+
+
+async def refresh_insights(user_phone: str) -> bool:
+    """
+    Regenerates and caches a user's insights. Meant to run via asyncio.create_task.
+    A short Redis lock keeps concurrent dashboard loads from queuing duplicate LLM calls.
+    """
+    lock_key = f"insights_lock:{user_phone}"
+    if clients.redis_client:
+        try:
+            if not await clients.redis_client.set(lock_key, "1", nx=True, ex=REFRESH_LOCK_TTL):
+                return False
+        except Exception:
+            pass
+
+    try:
+        if not clients.llm_client:
+            return False
+        async with background_session(user_phone) as session:
+            repo = TransactionRepository(session)
+            # Fingerprint first: a transaction arriving mid-refresh just triggers another refresh
+            fingerprint = await repo.get_transactions_fingerprint(user_phone, limit=INSIGHTS_TX_LIMIT)
+            recent_txs = await repo.get_recent_transactions(user_phone, limit=INSIGHTS_TX_LIMIT)
+
+        if not recent_txs:
+            return False
+        insights = await build_insights(recent_txs)
+        await store_insights(user_phone, fingerprint, insights)
+        logger.info(f"Insights refreshed in background for {user_phone}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to refresh insights for {user_phone}: {e}", exc_info=True)
+        return False
+    finally:
+        if clients.redis_client:
+            try:
+                await clients.redis_client.delete(lock_key)
+            except Exception:
+                pass
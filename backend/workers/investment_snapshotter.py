@@ -5,7 +5,7 @@ Called after any add/sell/delete asset operation, and can be scheduled daily.
 """
 import logging
 from sqlalchemy import text
-from backend.db.session import AsyncSessionLocal
+from backend.db.session import background_session
 from backend.integrations.market_scrapers import get_user_portfolio_value
 
 logger = logging.getLogger(__name__)
@@ -17,22 +17,22 @@ async def take_daily_snapshot(user_phone: str) -> bool:
     Returns True on success.
     """
     try:
-        portfolio = await get_user_portfolio_value(user_phone)
+        async with background_session(user_phone) as session:
+            portfolio = await get_user_portfolio_value(session, user_phone)
 
-        stocks_value = sum(
-            h["current_value"] for h in portfolio["holdings"] if h["type"] == "STOCK"
-        )
-        fii_value = sum(
-            h["current_value"] for h in portfolio["holdings"] if h["type"] == "FII"
-        )
-        crypto_value = sum(
-            h["current_value"] for h in portfolio["holdings"] if h["type"] == "CRYPTO"
-        )
-        fixed_income_value = sum(
-            h["current_value"] for h in portfolio["holdings"] if h["type"] == "FIXED_INCOME"
-        )
+            stocks_value = sum(
+                h.current_value for h in portfolio["holdings"] if h.type == "STOCK"
+            )
+            fii_value = sum(
+                h.current_value for h in portfolio["holdings"] if h.type == "FII"
+            )
+            crypto_value = sum(
+                h.current_value for h in portfolio["holdings"] if h.type == "CRYPTO"
+            )
+            fixed_income_value = sum(
+                h.current_value for h in portfolio["holdings"] if h.type == "FIXED_INCOME"
+            )
 
-        async with AsyncSessionLocal() as session:
             await session.execute(
                 text("""
                     INSERT INTO investment_snapshots
@@ -0,0 +1,124 @@
+"""
+Monthly Totals Worker
+Backfills and verifies monthly_category_totals (migration 018) against transactions.
+The trigger keeps the rollup current; this catches drift (e.g. writes made with triggers
+disabled or a restored dump) and rebuilds only the users that disagree.
+
+    python -m backend.workers.monthly_totals --verify [--repair] [--user PHONE]
+    python -m backend.workers.monthly_totals --backfill [--user PHONE]
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import text
+from backend.core.config import settings
+from backend.db.session import background_session, job_lock
+
+logger = logging.getLogger(__name__)
+
+# Buckets that differ between the rollup and a fresh aggregate of transactions
+DRIFT_SQL = """
+    WITH expected AS (
+        SELECT t.user_phone,
+               DATE_TRUNC('month', t.date)::date AS month,
+               COALESCE(t.type, '') AS type,
+               COALESCE(t.category, '') AS category,
+               COALESCE(a.type, '') AS account_type,
+               COALESCE(t.is_cleared, TRUE) AS is_cleared,
+               SUM(ROUND(COALESCE(t.amount, 0)::numeric, 2)) AS total,
+               COUNT(*) AS tx_count
+        FROM transactions t
+        LEFT JOIN accounts a ON a.id = t.account_id
+        WHERE t.date IS NOT NULL
+          AND (CAST(:phone AS VARCHAR) IS NULL OR t.user_phone = :phone)
+        GROUP BY 1, 2, 3, 4, 5, 6
+    ),
+    actual AS (
+        SELECT user_phone, month, type, category, account_type, is_cleared, total, tx_count
+        FROM monthly_category_totals
+        WHERE (tx_count <> 0 OR total <> 0)
+          AND (CAST(:phone AS VARCHAR) IS NULL OR user_phone = :phone)
+    )
+    SELECT user_phone, month, type, category, account_type, is_cleared,
+           e.total AS expected_total, a.total AS actual_total,
+           e.tx_count AS expected_count, a.tx_count AS actual_count
+    FROM expected e
+    FULL OUTER JOIN actual a USING (user_phone, month, type, category, account_type, is_cleared)
+    WHERE e.total IS DISTINCT FROM a.total OR e.tx_count IS DISTINCT FROM a.tx_count
+    ORDER BY user_phone, month
+"""
+
+
+async def rebuild_monthly_totals(user_phone: str = None) -> int:
+    """Recomputes the rollup for one user (or everyone). Returns the number of buckets written."""
+    async with background_session() as session:
+        buckets = await session.scalar(
+            text("SELECT rebuild_monthly_totals(CAST(:phone AS VARCHAR))"), {"phone": user_phone}
+        )
+        await session.commit()
+    logger.info(f"📊 Monthly totals rebuilt for {user_phone or 'all users'}: {buckets} buckets")
+    return buckets
+
+
+async def verify_monthly_totals(user_phone: str = None, repair: bool = False) -> list[dict]:
+    """
+    Compares the rollup with transactions and returns the mismatching buckets.
+    With repair=True, users with mismatches are rebuilt.
+    """
+    async with background_session() as session:
+        result = await session.execute(text(DRIFT_SQL), {"phone": user_phone})
+        drift = [dict(row._mapping) for row in result.fetchall()]
+
+    if not drift:
+        logger.info("✅ Monthly totals match transactions")
+        return drift
+
+    users = sorted({row["user_phone"] for row in drift})
+    logger.warning(f"⚠️ Monthly totals drift: {len(drift)} buckets across {len(users)} users")
+    if repair:
+        for phone in users:
+            await rebuild_monthly_totals(phone)
+    return drift
+
+
+async def run_monthly_totals_checks():
+    """
+    Background loop (asyncio.create_task): verify and repair every MONTHLY_TOTALS_CHECK_INTERVAL_MINUTES.
+    Sleeps first, so boots and reloads don't scan transactions, and one process runs each cycle.
+    """
+    while True:
+        await asyncio.sleep(settings.MONTHLY_TOTALS_CHECK_INTERVAL_MINUTES * 60)
+        try:
+            async with job_lock("monthly_totals_check") as acquired:
+                if acquired:
+                    await verify_monthly_totals(repair=True)
+        except Exception as e:
+            logger.error(f"Monthly totals check failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly totals rollup maintenance")
+    parser.add_argument("--verify", action="store_true", help="compare the rollup with transactions")
+    parser.add_argument("--repair", action="store_true", help="with --verify, rebuild users that drifted")
+    parser.add_argument("--backfill", action="store_true", help="rebuild the rollup from transactions")
+    parser.add_argument("--user", help="limit to one user_phone")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.backfill:
+        asyncio.run(rebuild_monthly_totals(args.user))
+    elif args.verify:
+        drift = asyncio.run(verify_monthly_totals(args.user, repair=args.repair))
+        for row in drift:
+            print(f"{row['user_phone']} {row['month']} {row['type']}/{row['category'] or '-'}/"
+                  f"{row['account_type'] or '-'} cleared={row['is_cleared']}: "
+                  f"expected {row['expected_total']} ({row['expected_count']}), "
+                  f"rollup {row['actual_total']} ({row['actual_count']})")
+        if drift and not args.repair:
+            raise SystemExit(1)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
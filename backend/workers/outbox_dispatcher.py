@@ -0,0 +1,100 @@
+"""
+Outbox Dispatcher
+Moves change events from change_events_outbox (migration 023) to the Redis stream read by
+backend/core/events.py. Rows are claimed with FOR UPDATE SKIP LOCKED and deleted in the same
+transaction that publishes them, so several app processes can dispatch concurrently and an
+event is only dropped from the outbox once Redis accepted it (delivery is at-least-once).
+
+    python -m backend.workers.outbox_dispatcher [--once]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import redis.asyncio as redis
+from sqlalchemy import text
+from backend.core import clients, events
+from backend.core.config import settings
+from backend.db.session import background_session
+
+logger = logging.getLogger(__name__)
+
+CLAIM_SQL = """
+    DELETE FROM change_events_outbox
+    WHERE id IN (
+        SELECT id FROM change_events_outbox
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, topic, user_phone, operation, row_count
+"""
+
+
+async def dispatch_batch(batch_size: int = None) -> int:
+    """Publishes up to batch_size pending events. Returns how many were published."""
+    async with background_session() as session:
+        result = await session.execute(
+            text(CLAIM_SQL), {"batch_size": batch_size or settings.OUTBOX_BATCH_SIZE}
+        )
+        rows = sorted(result.fetchall(), key=lambda row: row.id)
+        if not rows:
+            await session.rollback()
+            return 0
+        try:
+            await events.publish([
+                {
+                    "topic": row.topic,
+                    "user_phone": row.user_phone,
+                    "operation": row.operation,
+                    "row_count": row.row_count,
+                    "outbox_id": row.id,
+                }
+                for row in rows
+            ])
+        except Exception:
+            # The claimed rows stay in the outbox for the next attempt
+            await session.rollback()
+            raise
+        await session.commit()
+    return len(rows)
+
+
+async def drain_outbox(batch_size: int = None) -> int:
+    """Dispatches until the outbox is empty. Returns the number of events published."""
+    total = 0
+    while True:
+        published = await dispatch_batch(batch_size)
+        total += published
+        if not published:
+            return total
+
+
+async def run_outbox_dispatcher():
+    """Background loop (asyncio.create_task): drain the outbox every OUTBOX_DISPATCH_INTERVAL_SECONDS."""
+    while True:
+        try:
+            await drain_outbox()
+        except Exception as e:
+            logger.warning(f"Outbox dispatch failed: {e}")
+        await asyncio.sleep(settings.OUTBOX_DISPATCH_INTERVAL_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Change events outbox dispatcher")
+    parser.add_argument("--once", action="store_true", help="drain the outbox once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    clients.redis_client = redis.from_url(
+        os.getenv("REDIS_URL", "redis://redis:6379/0"), encoding="utf-8", decode_responses=True
+    )
+    if args.once:
+        published = asyncio.run(drain_outbox())
+        print(f"{published} events published")
+    else:
+        asyncio.run(run_outbox_dispatcher())
+
+
+if __name__ == "__main__":
+    main()
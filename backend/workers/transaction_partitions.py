@@ -0,0 +1,53 @@
+"""
+Transaction Partitions Worker
+transactions is range-partitioned by month on `date` (migration 024). This job keeps
+TRANSACTION_PARTITION_MONTHS_AHEAD months of partitions ready and moves dated rows that landed in
+transactions_default (dates past the horizon when written) into partitions of their own.
+
+    python -m backend.workers.transaction_partitions [--months-ahead N]
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import text
+from backend.core.config import settings
+from backend.db.session import background_session
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_partitions(months_ahead: int = None) -> int:
+    """Creates the missing monthly partitions. Returns how many were created."""
+    async with background_session() as session:
+        created = await session.scalar(
+            text("SELECT ensure_transaction_partitions(:months_ahead)"),
+            {"months_ahead": months_ahead or settings.TRANSACTION_PARTITION_MONTHS_AHEAD},
+        )
+        await session.commit()
+    if created:
+        logger.info(f"🗂️ Transaction partitions created: {created}")
+    return created
+
+
+async def run_partition_maintenance():
+    """Background loop (asyncio.create_task): ensure partitions every PARTITION_MAINTENANCE_INTERVAL_HOURS."""
+    while True:
+        try:
+            await ensure_partitions()
+        except Exception as e:
+            logger.error(f"Transaction partition maintenance failed: {e}")
+        await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL_HOURS * 3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly transaction partition maintenance")
+    parser.add_argument("--months-ahead", type=int, help="months of future partitions to keep ready")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    created = asyncio.run(ensure_partitions(args.months_ahead))
+    print(f"{created} partitions created")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@ interface Transaction {
     description: string;
     type: 'INCOME' | 'EXPENSE' | 'TRANSFER';
     account_id: string | null;
-    date: string;
+    date: string | null;
     is_installment: boolean;
     installment_info: string | null;
     is_cleared: boolean;
@@ -215,8 +215,13 @@ export default function TransactionsPage() {
 
     const handleExport = async () => {
         try {
+            const params: Record<string, string> = { format: 'csv' };
+            if (category && category !== 'Todas') params.category = category;
+            if (accountFilter) params.account_id = accountFilter;
+            if (normalQuery.trim()) params.search = normalQuery.trim();
+
             const res = await api.get('/api/dashboard/transactions/export', {
-                params: { category: category && category !== 'Todas' ? category : undefined },
+                params,
                 responseType: 'blob'
             });
             const url = window.URL.createObjectURL(new Blob([res.data]));
@@ -237,7 +242,7 @@ export default function TransactionsPage() {
             description: tx.description,
             category: tx.category,
             amount: Math.abs(tx.amount).toString(),
-            date: tx.date.split('T')[0],
+            date: tx.date ? tx.date.split('T')[0] : '',
             account_id: tx.account_id || ''
         });
     };
@@ -607,7 +612,7 @@ export default function TransactionsPage() {
                                                     />
                                                 </td>
                                                 <td className="py-4 px-4 border-b border-graphite-border text-[11px] font-bold text-slate-low tracking-tight">
-                                                    {new Date(tx.date).toLocaleDateString('pt-BR').toUpperCase()}
+                                                    {tx.date ? new Date(tx.date).toLocaleDateString('pt-BR').toUpperCase() : '—'}
                                                 </td>
                                                 <td className="py-4 px-4 border-b border-graphite-border">
                                                     <div className="flex items-center gap-3">
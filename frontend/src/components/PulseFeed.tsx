@@ -1,12 +1,9 @@
 'use client';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
+import Cookies from 'js-cookie';
 import api from '@/lib/api';
 
-interface InsightResponse {
-    insights: string[];
-}
-
 const INSIGHT_ICONS = ['savings', 'warning', 'bolt', 'lightbulb', 'trending_up'];
 const INSIGHT_COLORS = [
     'text-royal-purple',
@@ -19,21 +16,61 @@ const INSIGHT_COLORS = [
 export default function PulseFeed() {
     const [insights, setInsights] = useState<string[]>([]);
     const [loading, setLoading] = useState(false);
+    const abortRef = useRef<AbortController | null>(null);
 
+    // Reads the SSE stream from /insights/stream and appends each insight as it arrives.
+    // Aborting the fetch closes the connection, which stops generation on the server.
     const generateInsights = async () => {
+        abortRef.current?.abort();
+        const controller = new AbortController();
+        abortRef.current = controller;
+
         setLoading(true);
+        setInsights([]);
         try {
-            const res = await api.post('/api/dashboard/insights');
-            setInsights(res.data.insights || []);
+            const token = Cookies.get('token');
+            const res = await fetch(`${api.defaults.baseURL}/api/dashboard/insights/stream`, {
+                method: 'POST',
+                headers: token ? { Authorization: `Bearer ${token}` } : {},
+                signal: controller.signal,
+            });
+            if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let sep;
+                while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                    const raw = buffer.slice(0, sep);
+                    buffer = buffer.slice(sep + 2);
+                    const event = raw.match(/^event: (.*)$/m)?.[1];
+                    const data = raw.match(/^data: (.*)$/m)?.[1];
+                    if (!data) continue;
+                    const parsed = JSON.parse(data);
+                    if (event === 'error') {
+                        setInsights(prev => [...prev, parsed.message]);
+                    } else if (!event && parsed.insight) {
+                        setInsights(prev => [...prev, parsed.insight]);
+                        setLoading(false);
+                    }
+                }
+            }
         } catch (error) {
-            console.error("Failed to generate insights", error);
+            if ((error as Error).name !== 'AbortError') {
+                console.error("Failed to generate insights", error);
+            }
         } finally {
-            setLoading(false);
+            if (abortRef.current === controller) setLoading(false);
         }
     };
 
     useEffect(() => {
         generateInsights();
+        return () => abortRef.current?.abort();
     }, []);
 
     return (